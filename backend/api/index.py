@@ -2,6 +2,12 @@
 
 This file exposes the FastAPI `app` for Vercel Serverless Functions.
 """
+import os
+
+# Every cold start pays for startup work, so restore the ledger on first use
+# instead; pandas-backed services load with the first route that needs them
+os.environ.setdefault("PAYFLOW_LAZY_STARTUP", "true")
+
 from app.main import app as fastapi_app
 
 # Vercel expects a callable named `app`
@@ -0,0 +1,91 @@
+"""
+API routers for PayFlow.
+
+Each module holds one group of endpoints as an ``APIRouter``:
+
+- health: ``/`` and ``/metrics``
+- payroll: uploads, background imports and the payroll diff
+- employees: employee lookups, the paginated roster and bulk exports
+- ewa: EWA recompute and withdrawals
+- ai: AI chat, analysis, recommendations, insights and CSV validation
+- system: LAN IP, AI, cache, tenant and profiling status
+
+Services backed by pandas (employee store, ledger, ingest, ...) are
+imported inside the endpoints that use them, never at module level, so
+mounting a router costs almost nothing and a cold start only loads
+pandas once a request needs it. ``health``, ``system`` and the AI chat
+endpoints never do.
+
+Environment Variables:
+- PAYFLOW_ROUTERS: Comma-separated routers to mount (default: all of them)
+"""
+
+from typing import TYPE_CHECKING, Any, Callable, List, Optional
+import importlib
+import os
+
+from fastapi import APIRouter, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.services.executor import ExecutorBusyError, TenantBusyError, get_executor
+from app.services.metrics import span
+
+if TYPE_CHECKING:
+    from app.services.employees import EmployeeStore
+
+ROUTERS = ("health", "payroll", "employees", "ewa", "ai", "system")
+
+
+def load_routers(names: Optional[List[str]] = None) -> List[APIRouter]:
+    """
+    Import the named routers (default: ``PAYFLOW_ROUTERS``, else all).
+    
+    Raises:
+        ValueError: For a name not in ``ROUTERS``
+    """
+    if names is None:
+        value = os.getenv("PAYFLOW_ROUTERS", "")
+        names = [name.strip() for name in value.split(",") if name.strip()] or list(ROUTERS)
+    unknown = sorted(set(names) - set(ROUTERS))
+    if unknown:
+        raise ValueError(f"Unknown routers: {', '.join(unknown)} (choose from {', '.join(ROUTERS)})")
+    return [importlib.import_module(f"app.routers.{name}").router for name in names]
+
+
+async def run_job(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a CPU-bound job on the shared executor.
+    
+    Raises 429 with Retry-After when the employer has its quota of jobs in
+    flight, and 503 when the executor as a whole is full.
+    """
+    try:
+        with span(f"job.{fn.__name__}"):
+            return await get_executor().submit(fn, *args, **kwargs)
+    except TenantBusyError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many payroll jobs running for this employer. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ExecutorBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other uploads. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def employee_store() -> "EmployeeStore":
+    """
+    The current employer's employee store, with its recorded withdrawals
+    re-applied.
+    
+    Goes through the ledger so balances are right even when the ledger was
+    not restored at startup (``PAYFLOW_LAZY_STARTUP``, other tenants). The
+    first call per tenant reads the ledger from disk, hence the thread.
+    """
+    from app.services.ledger import get_withdrawal_ledger
+    
+    ledger = await run_in_threadpool(get_withdrawal_ledger)
+    return ledger.store
@@ -0,0 +1,210 @@
+"""AI chat, analysis, recommendation, insight and CSV validation endpoints."""
+from fastapi import APIRouter, File, UploadFile, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+import json
+import os
+from typing import Dict, Any, Optional
+from app.routers import employee_store, run_job
+from app.services.ai import get_ai_service
+from app.services.ai_client import ProviderUnavailableError
+from app.services.cache import get_response_cache
+
+router = APIRouter()
+
+
+# AI Agent Endpoints
+def chat_context() -> Dict[str, Any]:
+    """Context for AI chat (would come from actual user data)."""
+    return {
+        "available": 2500.00,
+        "earned": 8450.00,
+        "next_payday": "2024-12-16"
+    }
+
+
+@router.post("/api/v1/ai/chat")
+async def ai_chat(message: Dict[str, str]) -> Dict[str, Any]:
+    """
+    AI chat assistant for payroll questions.
+    
+    Uses AI service for intelligent responses.
+    """
+    user_message = message.get("message", "")
+    
+    # Get AI service instance
+    ai_service = get_ai_service()
+    
+    # Context for AI
+    context = chat_context()
+    
+    # Call AI service for response
+    response = await ai_service.chat_completion(user_message, context)
+    
+    return {
+        "success": True,
+        "response": response,
+        "context": context
+    }
+
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/api/v1/ai/chat/stream")
+async def ai_chat_stream(message: Dict[str, str]) -> StreamingResponse:
+    """
+    Streaming AI chat assistant (server-sent events).
+    
+    Emits one ``data: {"token": ...}`` event per fragment as the answer is
+    generated, then an ``event: done`` carrying the full response and
+    context, or an ``event: error`` if the provider fails mid-answer.
+    When the client disconnects, Starlette cancels the stream and the
+    upstream request is closed.
+    """
+    user_message = message.get("message", "")
+    context = chat_context()
+    
+    async def events():
+        tokens = get_ai_service().stream_chat_completion(user_message, context)
+        parts = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield _sse({"token": token})
+            yield _sse({"success": True, "response": "".join(parts), "context": context}, "done")
+        except ProviderUnavailableError:
+            yield _sse({"success": False, "message": "AI provider became unavailable"}, "error")
+        finally:
+            # Runs on disconnect too, releasing the provider connection promptly
+            await tokens.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/api/v1/ai/analyze")
+async def ai_analyze_spending(request: Request) -> Response:
+    """
+    AI spending pattern analysis.
+    
+    Uses AI service for predictive analytics. Cached with ETags.
+    """
+    async def produce() -> Dict[str, Any]:
+        ai_service = get_ai_service()
+        
+        # Mock transaction data (would come from database)
+        transactions = [
+            {"amount": 1000, "date": "2024-12-05", "type": "withdrawal"},
+            {"amount": 500, "date": "2024-12-03", "type": "withdrawal"}
+        ]
+        
+        employee_data = {
+            "earned": 8450.00,
+            "available": 2500.00
+        }
+        
+        return await ai_service.analyze_spending(transactions, employee_data)
+    
+    return await get_response_cache().respond(
+        request, "/api/v1/ai/analyze", produce, tags=("payroll", "ewa")
+    )
+
+
+@router.post("/api/v1/ai/recommend")
+async def ai_recommend(request: Request) -> Response:
+    """
+    AI financial recommendations.
+    
+    Uses AI service for personalized advice. Cached with ETags.
+    """
+    async def produce() -> Dict[str, Any]:
+        ai_service = get_ai_service()
+        
+        employee_data = {"earned": 8450.00, "available": 2500.00}
+        spending_patterns = {"withdrawal_frequency": "weekly"}
+        
+        recommendations = await ai_service.generate_recommendations(
+            employee_data, 
+            spending_patterns
+        )
+        
+        return {
+            "success": True,
+            "recommendations": recommendations,
+            "total_potential_savings": sum(r.get("potential_savings", 0) for r in recommendations)
+        }
+    
+    return await get_response_cache().respond(
+        request, "/api/v1/ai/recommend", produce, tags=("payroll", "ewa")
+    )
+
+
+@router.post("/api/v1/ai/payroll-insights")
+async def ai_payroll_insights(request: Request) -> Response:
+    """
+    Employer payroll insights.
+    
+    Reads the employee store's cached totals, the rolling withdrawal
+    aggregates and the cached liquidity forecast, so the cost is the same
+    for any payroll size. Cached with ETags.
+    """
+    from app.services.aggregates import get_withdrawal_aggregates
+    from app.services.ewa import accrual_date
+    from app.services.forecast import get_forecast_engine
+    
+    async def produce() -> Dict[str, Any]:
+        aggregates = get_withdrawal_aggregates()
+        # Fitted for all series in one batched job, then cached
+        forecast = await get_forecast_engine().latest(aggregates.daily, accrual_date(), aggregates.window_days)
+        payroll_data = {
+            "totals": (await employee_store()).snapshot.totals(),
+            "withdrawals": aggregates.summary(),
+            "forecast": forecast.summary()
+        }
+        return await get_ai_service().payroll_insights(payroll_data)
+    
+    return await get_response_cache().respond(
+        request, "/api/v1/ai/payroll-insights", produce, tags=("payroll", "roster", "ewa")
+    )
+
+
+@router.post("/api/v1/ai/csv-validate")
+async def ai_validate_csv(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """
+    Validate a payroll CSV before import.
+    
+    Rule checks (schema, duplicate IDs, dates, salary outliers) run
+    column-wise on the job executor; only the flagged rows are passed to
+    the AI service for review.
+    """
+    from app.services.ewa import accrual_date
+    from app.services.ingest import spool_upload
+    from app.services.validation import validate_csv_file
+    
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Please upload a CSV file."
+        )
+    
+    path = await spool_upload(file)
+    try:
+        report = await run_job(validate_csv_file, path, accrual_date())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing CSV: {str(e)}"
+        )
+    finally:
+        os.unlink(path)
+    
+    result = await get_ai_service().validate_csv(report=report)
+    return {"filename": file.filename, **result}
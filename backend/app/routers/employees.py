@@ -0,0 +1,163 @@
+"""Employee lookup, roster and export endpoints."""
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, Optional
+from app.routers import employee_store
+from app.services.cache import get_response_cache
+from app.services.serialization import (
+    ARROW_MEDIA_TYPE, FAST_JSON, NDJSON_MEDIA_TYPE, arrow_available, encode_frame, negotiate_export
+)
+
+router = APIRouter()
+
+
+@router.get("/api/v1/employee/me")
+async def get_employee_data(request: Request, employee_id: Optional[str] = None) -> Response:
+    """
+    Get current employee's payroll data.
+    
+    Returns the demo profile unless an ``employee_id`` is given, in which
+    case the employee is looked up in the store. Cached with ETags.
+    """
+    from app.services.employees import DEMO_PROFILE
+    
+    async def produce() -> Dict[str, Any]:
+        if employee_id is None:
+            return {"success": True, "employee": DEMO_PROFILE}
+    
+        snapshot = (await employee_store()).snapshot
+        employee = snapshot.get(employee_id)
+        if employee is None:
+            raise HTTPException(status_code=404, detail="Employee not found")
+    
+        return {
+            "success": True,
+            "employee": {
+                "name": employee["name"],
+                "employee_id": employee["employee_id"],
+                "earned_this_period": employee["earned_this_period"],
+                "available_for_withdrawal": employee["available_ewa"],
+                "currency": DEMO_PROFILE["currency"],
+                "pay_period": snapshot.period.label(),
+                "next_payday": snapshot.period.payday_label()
+            }
+        }
+    
+    return await get_response_cache().respond(
+        request,
+        "/api/v1/employee/me",
+        produce,
+        tags=("payroll", "ewa", f"employee:{employee_id}"),
+        params={"employee_id": employee_id}
+    )
+
+
+@router.get("/api/v1/employees")
+async def get_employees(
+    request: Request,
+    page: int = 1,
+    per_page: int = 10,
+    cursor: Optional[str] = None,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    sort_by: str = "employee_id",
+    order: str = "asc",
+    include_total: bool = True
+) -> Response:
+    """
+    Get paginated list of employees for the HR dashboard.
+    
+    Supports filtering by department/status and sorting by employee_id,
+    earned_this_period or available_ewa. Pass the returned
+    ``next_cursor`` as ``cursor`` to page with a keyset instead of an
+    offset; deep pages then cost the same as the first and do not drift
+    while data changes. Set ``include_total=false`` to skip counting.
+    Cached with ETags.
+    """
+    if page < 1 or not 1 <= per_page <= 1000:
+        raise HTTPException(status_code=400, detail="page must be >= 1 and per_page 1-1000")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    
+    async def produce() -> Dict[str, Any]:
+        snapshot = (await employee_store()).snapshot
+        try:
+            employees, next_cursor = snapshot.query(
+                per_page,
+                offset=(page - 1) * per_page,
+                cursor=cursor,
+                sort_by=sort_by,
+                descending=order == "desc",
+                department=department,
+                status=status,
+                as_json=FAST_JSON
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+        pagination: Dict[str, Any] = {"per_page": per_page, "next_cursor": next_cursor}
+        if cursor is None:
+            pagination["page"] = page
+        if include_total:
+            total = snapshot.count(department, status)
+            pagination["total"] = total
+            pagination["total_pages"] = (total + per_page - 1) // per_page
+    
+        return {
+            "success": True,
+            "employees": employees,
+            "pagination": pagination
+        }
+    
+    return await get_response_cache().respond(
+        request,
+        "/api/v1/employees",
+        produce,
+        tags=("payroll", "roster", "ewa"),
+        params=dict(request.query_params)
+    )
+
+
+EXPORT_EXTENSIONS = {"application/json": "json", NDJSON_MEDIA_TYPE: "ndjson", ARROW_MEDIA_TYPE: "arrow"}
+
+
+@router.get("/api/v1/employees/export")
+async def export_employees(
+    request: Request,
+    department: Optional[str] = None,
+    status: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Export every employee matching the filters in one streamed response.
+    
+    The format follows the Accept header: NDJSON (default), a JSON array,
+    or an Arrow IPC stream (``application/vnd.apache.arrow.stream``, when
+    pyarrow is installed). Rows are encoded column-wise in chunks on a
+    worker thread, never as per-row dicts.
+    """
+    media_type = negotiate_export(request.headers.get("accept"))
+    if media_type is None or (media_type == ARROW_MEDIA_TYPE and not arrow_available()):
+        supported = [t for t in EXPORT_EXTENSIONS if t != ARROW_MEDIA_TYPE or arrow_available()]
+        raise HTTPException(
+            status_code=406,
+            detail=f"Supported export formats: {', '.join(supported)}"
+        )
+    
+    rows = (await employee_store()).snapshot.rows(department, status)
+    return StreamingResponse(
+        encode_frame(rows, media_type),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="employees.{EXPORT_EXTENSIONS[media_type]}"',
+            "Vary": "Accept"
+        }
+    )
+
+
+@router.get("/api/v1/employees/{employee_id}")
+async def get_employee(employee_id: str) -> Dict[str, Any]:
+    """Look up a single employee by ID."""
+    employee = (await employee_store()).snapshot.get(employee_id)
+    if employee is None:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return {"success": True, "employee": employee}
@@ -0,0 +1,98 @@
+"""EWA recompute and withdrawal endpoints."""
+from fastapi import APIRouter, Header, HTTPException
+from starlette.concurrency import run_in_threadpool
+import math
+import time
+from typing import Dict, Any, Optional
+from app.services.cache import on_ewa_changed
+
+router = APIRouter()
+
+
+@router.post("/api/v1/ewa/recompute")
+async def recompute_ewa(as_of: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Recompute accrued and withdrawable wages for the whole payroll.
+    
+    Run on payday morning (or whenever the accrual date moves). Uses the
+    vectorized EWA engine, so it covers every employee in one pass.
+    """
+    from app.services.ewa import accrual_date
+    from app.services.ledger import get_withdrawal_ledger
+    
+    try:
+        day = accrual_date(as_of)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="as_of must be YYYY-MM-DD")
+    
+    start = time.perf_counter()
+    ledger = await run_in_threadpool(get_withdrawal_ledger)
+    store = ledger.store
+    # Mutates the in-memory store, so it runs on a thread, never a process pool;
+    # a new pay period reloads its withdrawals from the ledger
+    recomputed = await run_in_threadpool(ledger.recompute_ewa, day)
+    await on_ewa_changed()
+    
+    return {
+        "success": True,
+        "as_of": day.isoformat(),
+        "pay_period": store.snapshot.period.label(),
+        "employees_recomputed": recomputed,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+@router.post("/api/v1/ewa/withdrawals", status_code=201)
+async def create_withdrawal(
+    body: Dict[str, Any],
+    idempotency_key: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """
+    Cash out part of an employee's available EWA balance.
+    
+    The withdrawal is appended to the ledger (group-committed) before it
+    is confirmed. Retries carrying the same ``Idempotency-Key`` header get
+    the original withdrawal back instead of a second one.
+    """
+    from app.services.ledger import (
+        IdempotencyConflictError, InsufficientBalanceError, UnknownEmployeeError, get_withdrawal_ledger
+    )
+    
+    employee_id = body.get("employee_id")
+    try:
+        amount = float(body.get("amount"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="amount must be a number")
+    if not math.isfinite(amount):
+        raise HTTPException(status_code=400, detail="amount must be a finite number")
+    if not isinstance(employee_id, str) or not employee_id:
+        raise HTTPException(status_code=400, detail="employee_id is required")
+    
+    # The first call per tenant opens its ledger and restores balances
+    ledger = await run_in_threadpool(get_withdrawal_ledger)
+    try:
+        withdrawal = await ledger.withdraw(employee_id, amount, idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownEmployeeError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InsufficientBalanceError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if not withdrawal["replayed"]:
+        await on_ewa_changed(employee_id)
+    return {"success": True, "withdrawal": withdrawal}
+
+
+@router.get("/api/v1/ewa/withdrawals")
+async def list_withdrawals(employee_id: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    """Most recent withdrawals, optionally for one employee."""
+    from app.services.ledger import get_withdrawal_ledger
+    
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    ledger = await run_in_threadpool(get_withdrawal_ledger)
+    withdrawals = await ledger.recent(employee_id, limit)
+    return {"success": True, "withdrawals": withdrawals}
@@ -0,0 +1,22 @@
+"""Health check and metrics endpoints."""
+from fastapi import APIRouter, Response
+
+from app.services.metrics import CONTENT_TYPE, get_metrics
+
+router = APIRouter()
+
+
+@router.get("/")
+async def root():
+    """Root endpoint - API health check."""
+    return {
+        "service": "PayFlow API",
+        "status": "operational",
+        "version": "1.0.0"
+    }
+
+
+@router.get("/metrics")
+async def metrics() -> Response:
+    """Request, span and event loop metrics in the Prometheus text format."""
+    return Response(get_metrics().render(), media_type=CONTENT_TYPE)
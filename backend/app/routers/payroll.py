@@ -0,0 +1,235 @@
+"""Payroll upload, background import and diff endpoints."""
+from fastapi import APIRouter, File, UploadFile, HTTPException, Response
+from starlette.concurrency import run_in_threadpool
+import os
+from typing import Dict, Any, Optional
+from app.routers import employee_store, run_job
+from app.services.cache import on_payroll_changed, on_payroll_loaded
+from app.services.serialization import FAST_JSON, FastJSONResponse
+
+router = APIRouter()
+
+
+@router.post("/api/v1/upload")
+async def upload_csv(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """
+    Upload and parse payroll CSV.
+    
+    The file is streamed to disk and parsed in chunks, so memory stays
+    bounded regardless of file size. Returns the first 5 rows as JSON for
+    preview along with the row count and per-column statistics. Files with
+    an ``employee_id`` column replace the employee store, unless their
+    changed rows fail validation: then the upload is refused with 422 and
+    the report, and the current data is kept.
+    """
+    import numpy as np
+    from app.services.diff import get_payroll_differ
+    from app.services.employees import StaleSnapshotError, payroll_to_employees
+    from app.services.ewa import accrual_date
+    from app.services.ingest import spool_upload, summarize_csv
+    from app.services.ledger import get_withdrawal_ledger
+    from app.services.snapshot import SNAPSHOT_ENABLED, get_snapshot_store
+    from app.services.validation import delta_positions, validate_delta
+    
+    # Validate file type
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Please upload a CSV file."
+        )
+    
+    path = await spool_upload(file)
+    try:
+        try:
+            # Parse off the event loop so other requests keep flowing
+            summary = await run_job(summarize_csv, path, collect=payroll_to_employees)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error processing CSV: {str(e)}"
+            )
+        
+        frame = summary.pop("frame")
+        loaded = 0
+        changes = None
+        validation = None
+        if frame is not None:
+            store = await employee_store()
+            # One upload per employer at a time: the diff below must still
+            # describe the snapshot being replaced when the load swaps it
+            async with store.upload_lock:
+                # Diff against the rows currently served; only the delta is
+                # recomputed, validated and invalidated
+                differ = get_payroll_differ()
+                diff = await run_in_threadpool(differ.compare, frame, store.snapshot.fingerprints)
+                previous = store.snapshot
+                day = accrual_date()
+                # The raw text of the changed rows, checked by the csv-validate
+                # rules before anything goes live
+                positions, repeated = delta_positions(frame, diff.delta_ids)
+                validation = await run_job(
+                    validate_delta, path, positions, day, repeated, frame["salary"].to_numpy()
+                )
+                if not validation["is_valid"]:
+                    raise HTTPException(
+                        status_code=422,
+                        detail={
+                            "message": "The payroll has errors; the current data was kept.",
+                            "validation": validation
+                        }
+                    )
+                try:
+                    snapshot = await run_in_threadpool(store.load, frame, day, diff)
+                except StaleSnapshotError as e:
+                    raise HTTPException(status_code=409, detail=str(e))
+                loaded = len(snapshot)
+                if SNAPSHOT_ENABLED and snapshot is not previous:
+                    # Later restarts (and other workers) map this instead of re-parsing
+                    await run_in_threadpool(
+                        get_snapshot_store().save, snapshot.frame, snapshot.as_of, snapshot.fingerprints
+                    )
+                # Live now: the next upload diffs against it, the Migration Studio shows it
+                await run_in_threadpool(differ.save, diff, file.filename)
+                if not diff.incremental or snapshot.period.start != previous.period.start:
+                    # A fresh load or a new pay period starts from zero withdrawals; the ledger has them
+                    await run_in_threadpool(get_withdrawal_ledger().restore_balances, snapshot.as_of)
+                if diff.incremental:
+                    await on_payroll_changed(np.concatenate([diff.delta_ids, diff.removed]).tolist())
+                else:
+                    await on_payroll_loaded()
+                changes = {"incremental": diff.incremental, **diff.counts()}
+    finally:
+        os.unlink(path)
+    
+    return {
+        "success": True,
+        "filename": file.filename,
+        **summary,
+        "employees_loaded": loaded,
+        "changes": changes,
+        "validation": validation
+    }
+
+
+@router.post("/api/v1/imports", status_code=202)
+async def create_import(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """
+    Start a background payroll import.
+    
+    Returns a job id immediately; poll the job for progress and fetch
+    parsed rows page by page once chunks are ready.
+    """
+    from app.services.imports import get_import_manager
+    from app.services.ingest import spool_upload
+    
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Please upload a CSV file."
+        )
+    
+    manager = get_import_manager()
+    path = await spool_upload(file, directory=manager.root)
+    manifest = manager.create(file.filename, path)
+    manager.start(manifest["job_id"])
+    
+    return {
+        "success": True,
+        "job_id": manifest["job_id"],
+        "status": manifest["status"],
+        "status_url": f"/api/v1/imports/{manifest['job_id']}"
+    }
+
+
+@router.get("/api/v1/imports/{job_id}")
+async def get_import(job_id: str) -> Dict[str, Any]:
+    """
+    Get import job status.
+    
+    Reports rows processed, throughput, ETA and the validation issues
+    found so far, plus the parse summary (columns, preview, column stats)
+    once the job has completed.
+    """
+    from app.services.imports import ImportNotFoundError, get_import_manager
+    
+    try:
+        return {"success": True, **get_import_manager().status(job_id)}
+    except ImportNotFoundError:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+
+@router.get("/api/v1/imports/{job_id}/rows")
+async def get_import_rows(job_id: str, page: int = 1, per_page: int = 100) -> Response:
+    """
+    Get a page of parsed rows from an import job.
+    
+    Served from the stored chunks, so the CSV is never re-parsed.
+    """
+    from app.services.imports import ImportNotFoundError, get_import_manager
+    
+    if page < 1 or not 1 <= per_page <= 1000:
+        raise HTTPException(status_code=400, detail="page must be >= 1 and per_page 1-1000")
+    
+    try:
+        rows, total, complete = get_import_manager().rows(job_id, page, per_page, as_json=FAST_JSON)
+    except ImportNotFoundError:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    
+    # Returned as a response so pre-encoded rows skip jsonable_encoder
+    return FastJSONResponse({
+        "success": True,
+        "job_id": job_id,
+        "rows": rows,
+        "pagination": {
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "total_pages": (total + per_page - 1) // per_page,
+            "complete": complete
+        }
+    })
+
+
+@router.post("/api/v1/imports/{job_id}/retry", status_code=202)
+async def retry_import(job_id: str) -> Dict[str, Any]:
+    """
+    Resume a failed or interrupted import from its last completed chunk.
+    
+    The original upload is kept on the server, so nothing is re-sent.
+    """
+    from app.services.imports import ImportNotFoundError, ImportStateError, get_import_manager
+    
+    manager = get_import_manager()
+    try:
+        return {"success": True, **manager.retry(job_id)}
+    except ImportNotFoundError:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    except ImportStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/api/v1/payroll/diff")
+async def get_payroll_diff(
+    kind: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Changes introduced by the latest payroll upload.
+    
+    Returns counts of added, removed, changed and unchanged employees,
+    plus a page of employee IDs per kind for the Migration Studio.
+    """
+    from app.services.diff import DIFF_KINDS, get_payroll_differ
+    
+    if kind is not None and kind not in DIFF_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(DIFF_KINDS)}")
+    if offset < 0 or not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit 1-1000")
+    
+    diff = await run_in_threadpool(get_payroll_differ().last_diff, kind, offset, limit)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="No payroll has been uploaded yet")
+    return {"success": True, **diff}
@@ -0,0 +1,100 @@
+"""LAN IP, AI, cache, tenant and profiling status endpoints."""
+from fastapi import APIRouter, HTTPException
+from typing import Dict, Any
+from app.utils import get_lan_ip
+from app.services.ai import get_ai_service
+from app.services.cache import get_response_cache
+from app.services.executor import get_executor
+from app.services.metrics import get_request_profiler
+from app.services.tenants import (
+    current_tenant, get_tenant_rate_limiter, get_tenant_registry, get_tenant_router, loaded_tenants
+)
+
+router = APIRouter()
+
+
+@router.get("/api/v1/system/ip")
+async def get_system_ip() -> Dict[str, str]:
+    """
+    Get the server's LAN IP address.
+    
+    Used by frontend to generate QR codes for mobile demo handoff.
+    """
+    lan_ip = get_lan_ip()
+    return {
+        "ip": lan_ip,
+        "frontend_url": f"http://{lan_ip}:3000"
+    }
+
+
+@router.get("/api/v1/system/ai")
+async def get_ai_status() -> Dict[str, Any]:
+    """AI provider status: breaker state, call and batching counters."""
+    service = get_ai_service()
+    client = service.client
+    return {
+        "success": True,
+        "enabled": client is not None,
+        "provider": client.status() if client is not None else None,
+        "batching": service.batch_report()
+    }
+
+
+@router.get("/api/v1/system/cache")
+async def get_cache_stats() -> Dict[str, Any]:
+    """Response cache and AI chat cache hit/miss counters."""
+    chat_cache = get_ai_service().chat_cache
+    return {
+        "success": True,
+        "cache": get_response_cache().stats(),
+        "chat_cache": chat_cache.report() if chat_cache is not None else None
+    }
+
+
+@router.get("/api/v1/system/tenants")
+async def get_tenants() -> Dict[str, Any]:
+    """
+    Tenant routing and quotas as seen by this worker.
+    
+    Reports the worker owning the requesting employer, the tenants with
+    data loaded here, which tenants are admitted, and per-tenant rate
+    limiting and job counts.
+    """
+    tenant = current_tenant()
+    tenant_router = get_tenant_router()
+    executor = get_executor().stats()
+    return {
+        "success": True,
+        "tenant": tenant,
+        "owner": tenant_router.owner(tenant),
+        "routing": tenant_router.status(),
+        "loaded": loaded_tenants(),
+        "registry": get_tenant_registry().status(),
+        "rate_limit": get_tenant_rate_limiter().status(),
+        "jobs": {
+            "max_per_tenant": executor["max_per_tenant"],
+            "inflight_by_tenant": executor["inflight_by_tenant"]
+        }
+    }
+
+
+@router.get("/api/v1/system/profiling")
+async def get_profiling() -> Dict[str, Any]:
+    """Request profiler sample rate and the newest profile dumps."""
+    return {"success": True, "profiling": get_request_profiler().status()}
+
+
+@router.post("/api/v1/system/profiling")
+async def set_profiling(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Change the share of requests profiled with cProfile at runtime.
+    
+    Send ``{"sample_rate": 0.01}`` to profile 1% of requests, ``0`` to
+    stop. Dumps are listed by ``GET /api/v1/system/profiling``.
+    """
+    profiler = get_request_profiler()
+    try:
+        profiler.configure(float(body.get("sample_rate")))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="sample_rate must be a number between 0 and 1")
+    return {"success": True, "profiling": profiler.status()}
@@ -0,0 +1,261 @@
+"""
+Withdrawal Aggregates for PayFlow
+
+The employer dashboard's insights (withdrawal rate, average withdrawal,
+peak day, per-department usage) are read far more often than
+withdrawals happen. ``WithdrawalAggregates`` therefore keeps running
+totals that every withdrawal updates in O(1):
+
+- per department and per weekday: withdrawal count and amount over a
+  rolling window of the last ``window_days`` days
+- per pay period: the distinct employees who withdrew, and those who have
+  drawn at least ``HEAVY_SHARE`` of their allowance
+
+The window is held as one bucket per day; when the window moves past a
+day, its bucket is subtracted from the running totals, so history is
+never rescanned. Amounts are kept in integer centavos so additions and
+subtractions cancel exactly.
+
+``aggregate_withdrawals`` recomputes the same summary from scratch with
+vectorized pandas, to verify the running totals.
+
+Environment Variables:
+- PAYFLOW_INSIGHTS_WINDOW_DAYS: Days covered by the rolling aggregates (default 28)
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Any, Optional, Set
+import calendar
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.services.ewa import accrual_date, get_pay_calendar
+from app.services.tenants import TenantScoped
+
+WINDOW_DAYS = int(os.getenv("PAYFLOW_INSIGHTS_WINDOW_DAYS", "28"))
+# Share of an employee's period allowance that counts as heavy use
+HEAVY_SHARE = 0.9
+WEEKDAYS = list(calendar.day_name)
+
+
+def _cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def _figures(count: int, cents: int) -> Dict[str, Any]:
+    amount = cents / 100
+    return {
+        "withdrawals": count,
+        "amount": amount,
+        "average": round(amount / count, 2) if count else 0.0
+    }
+
+
+def _summary(
+    as_of: Optional[date],
+    window_days: int,
+    departments: Dict[str, List[int]],
+    weekdays: List[List[int]],
+    period_start: Optional[date],
+    withdrawers: int,
+    heavy: int
+) -> Dict[str, Any]:
+    """Shape running or recomputed totals into the summary both paths return."""
+    count, cents = sum(n for n, _ in weekdays), sum(c for _, c in weekdays)
+    peak = WEEKDAYS[max(range(7), key=lambda day: weekdays[day][0])] if count else None
+    return {
+        "as_of": as_of.isoformat() if as_of else None,
+        "window_days": window_days,
+        **_figures(count, cents),
+        "by_department": {
+            name: _figures(int(n), int(c))
+            for name, (n, c) in sorted(departments.items()) if n
+        },
+        "by_weekday": {
+            WEEKDAYS[day]: _figures(int(n), int(c)) for day, (n, c) in enumerate(weekdays)
+        },
+        "peak_withdrawal_day": peak,
+        "period": {
+            "start": period_start.isoformat() if period_start else None,
+            "withdrawers": withdrawers,
+            "heavy_withdrawers": heavy
+        }
+    }
+
+
+class WithdrawalAggregates:
+    """Rolling withdrawal totals, updated per withdrawal and read in O(1)."""
+
+    def __init__(self, window_days: int = WINDOW_DAYS):
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        # day -> department -> [count, centavos]
+        self._days: Dict[date, Dict[str, List[int]]] = {}
+        self._departments: Dict[str, List[int]] = {}
+        # weekday -> [count, centavos]
+        self._weekdays = [[0, 0] for _ in range(7)]
+        self._latest: Optional[date] = None
+        self._period_start: Optional[date] = None
+        self._withdrawers: Set[str] = set()
+        self._heavy: Set[str] = set()
+        self._cached: Optional[Dict[str, Any]] = None
+
+    def _advance(self, day: date) -> None:
+        """Move the window end to ``day``, expiring buckets that fall out."""
+        if self._latest is not None and day <= self._latest:
+            return
+        self._latest = day
+        cutoff = day - timedelta(days=self.window_days)
+        for expired in [d for d in self._days if d <= cutoff]:
+            weekday = self._weekdays[expired.weekday()]
+            for name, (count, cents) in self._days.pop(expired).items():
+                totals = self._departments[name]
+                totals[0] -= count
+                totals[1] -= cents
+                weekday[0] -= count
+                weekday[1] -= cents
+        start = get_pay_calendar().period_for(day).start
+        if start != self._period_start:
+            self._period_start = start
+            self._withdrawers = set()
+            self._heavy = set()
+        self._cached = None
+
+    def record(
+        self,
+        employee_id: str,
+        department: str,
+        amount: float,
+        day: date,
+        share: Optional[float] = None
+    ) -> bool:
+        """
+        Add one withdrawal.
+
+        Args:
+            employee_id: Who withdrew
+            department: Their department
+            amount: Amount withdrawn in pesos
+            day: Date of the withdrawal
+            share: Fraction of the employee's period allowance drawn so
+                far, this withdrawal included, if known
+
+        Returns:
+            False if the withdrawal is older than the window and was ignored
+        """
+        cents = _cents(amount)
+        with self._lock:
+            self._advance(day)
+            if day <= self._latest - timedelta(days=self.window_days):
+                return False
+            bucket = self._days.setdefault(day, {}).setdefault(department, [0, 0])
+            bucket[0] += 1
+            bucket[1] += cents
+            totals = self._departments.setdefault(department, [0, 0])
+            totals[0] += 1
+            totals[1] += cents
+            weekday = self._weekdays[day.weekday()]
+            weekday[0] += 1
+            weekday[1] += cents
+            if day >= self._period_start:
+                self._withdrawers.add(employee_id)
+                if share is not None and share >= HEAVY_SHARE:
+                    self._heavy.add(employee_id)
+            self._cached = None
+        return True
+
+    def summary(self, as_of: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Current totals.
+
+        Args:
+            as_of: End of the window (default: the accrual date); the
+                window never moves back before the latest withdrawal
+
+        Returns:
+            Dictionary with totals, by_department, by_weekday,
+            peak_withdrawal_day and the current period's withdrawers
+        """
+        with self._lock:
+            self._advance(as_of or accrual_date())
+            if self._cached is None:
+                self._cached = _summary(
+                    self._latest, self.window_days, self._departments, self._weekdays,
+                    self._period_start, len(self._withdrawers), len(self._heavy)
+                )
+            return self._cached
+
+
+    def daily(self) -> pd.DataFrame:
+        """
+        Withdrawal amounts per day and department within the window, the
+        history the liquidity forecast is fitted on.
+
+        Returns:
+            DataFrame with department, day and amount (pesos)
+        """
+        with self._lock:
+            rows = [
+                (name, day, cents / 100)
+                for day, bucket in self._days.items()
+                for name, (_, cents) in bucket.items()
+            ]
+        return pd.DataFrame(rows, columns=["department", "day", "amount"])
+
+
+def aggregate_withdrawals(
+    events: pd.DataFrame,
+    as_of: Optional[date] = None,
+    window_days: int = WINDOW_DAYS
+) -> Dict[str, Any]:
+    """
+    Recompute the ``WithdrawalAggregates`` summary from the full history.
+
+    Args:
+        events: One row per withdrawal with employee_id, department,
+            amount, day (date or datetime64) and optionally share
+        as_of: End of the window (default: the accrual date); as with the
+            running totals, never before the latest withdrawal
+        window_days: Days covered
+
+    Returns:
+        The same structure as ``WithdrawalAggregates.summary``
+    """
+    days = pd.to_datetime(events["day"]).dt.normalize()
+    end = pd.Timestamp(as_of or accrual_date())
+    if len(days):
+        end = max(end, days.max())
+    in_window = (days > end - pd.Timedelta(days=window_days)).to_numpy()
+    window = events[in_window]
+    cents = (window["amount"].to_numpy(dtype="float64") * 100).round().astype(np.int64)
+    grouped = pd.DataFrame({
+        "department": window["department"].astype(str).to_numpy(),
+        "weekday": days[in_window].dt.weekday.to_numpy(),
+        "cents": cents
+    })
+    by_department = grouped.groupby("department")["cents"].agg(["count", "sum"])
+    by_weekday = grouped.groupby("weekday")["cents"].agg(["count", "sum"]).reindex(range(7), fill_value=0)
+
+    period_start = get_pay_calendar().period_for(end.date()).start
+    current = (days >= pd.Timestamp(period_start)).to_numpy() & in_window
+    withdrawers = events["employee_id"][current]
+    heavy = 0
+    if "share" in events.columns:
+        heavy = withdrawers[(events["share"][current] >= HEAVY_SHARE).to_numpy()].nunique()
+    return _summary(
+        end.date(), window_days,
+        {name: [row["count"], row["sum"]] for name, row in by_department.iterrows()},
+        by_weekday[["count", "sum"]].to_numpy(dtype=np.int64).tolist(),
+        period_start, withdrawers.nunique(), heavy
+    )
+
+
+# Instances per tenant
+_withdrawal_aggregates = TenantScoped(lambda tenant: WithdrawalAggregates())
+
+def get_withdrawal_aggregates(tenant: Optional[str] = None) -> WithdrawalAggregates:
+    """Get or create the withdrawal aggregates of a tenant (default: the current one)"""
+    return _withdrawal_aggregates.get(tenant)
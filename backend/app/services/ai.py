@@ -8,30 +8,182 @@ Environment Variables:
 - OPENAI_API_KEY: Your OpenAI API key
 - ANTHROPIC_API_KEY: Your Anthropic API key
 - GOOGLE_API_KEY: Your Google AI API key
+- AI_ENABLED: "true" to call the provider configured in ai_client.py;
+  otherwise every method returns its mock response
+- AI_BATCH_ENABLED: "false" sends one provider call per analysis or
+  recommendation request (default true)
+- AI_BATCH_MAX_SIZE: Most requests combined into one provider call (default 16)
+- AI_BATCH_MAX_WAIT_MS: How long the first request waits for others (default 20)
+- AI_MOCK_STREAM_DELAY_MS: Delay between words when streaming a mock
+  answer, to imitate a real model's token rate (default 0)
 """
 
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, AsyncIterator, Optional, Tuple, Union
+import asyncio
+import json
 import os
+import re
+
+from app.services.ai_client import ProviderClient, ProviderUnavailableError
+from app.services.batching import MicroBatcher
+from app.services.chat_cache import ChatCache
+from app.services.metrics import timed
+from app.services.tenants import current_tenant
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Batched prompts carry their inputs as one JSON line after this marker
+BATCH_MARKER = "Employees (JSON):"
+
+# Mock answers are streamed one word (plus its trailing space) at a time
+_MOCK_TOKENS = re.compile(r"\S+\s*")
 
 
 class AIService:
     """
     AI Service for PayFlow platform.
     
-    Replace the placeholder methods with actual AI provider calls.
+    Calls an OpenAI-compatible provider through ProviderClient when
+    AI_ENABLED=true; otherwise, or whenever the provider is unavailable,
+    methods return the mock responses below.
     """
     
-    def __init__(self):
-        # Initialize AI client here
-        # Example for OpenAI:
-        # import openai
-        # self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    def __init__(
+        self,
+        client: Optional[ProviderClient] = None,
+        chat_cache: Optional[ChatCache] = None,
+        batching: Optional[bool] = None
+    ):
+        # Provider client (OpenAI-compatible API). When AI is disabled, or
+        # the provider is unavailable, methods fall back to mock responses.
+        if client is None and os.getenv("AI_ENABLED", "false").lower() == "true":
+            client = ProviderClient.from_env()
+        self.client = client
+        
+        # Answers to repeated questions within a pay period
+        if chat_cache is None and os.getenv("AI_CHAT_CACHE_ENABLED", "true").lower() == "true":
+            chat_cache = ChatCache.from_env()
+        self.chat_cache = chat_cache
         
-        # Example for Anthropic:
-        # import anthropic
-        # self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
-        pass
+        # Concurrent analysis and recommendation requests share one provider
+        # call. Mocks cost nothing, so batching only applies with a provider.
+        # Batchers are per tenant, so one prompt never mixes two employers'
+        # employees.
+        if batching is None:
+            batching = os.getenv("AI_BATCH_ENABLED", "true").lower() == "true"
+        self.batching = self.client is not None and batching
+        self._batch_max_size = int(os.getenv("AI_BATCH_MAX_SIZE", "16"))
+        self._batch_max_wait_ms = float(os.getenv("AI_BATCH_MAX_WAIT_MS", "20"))
+        # Batchers per tenant: (analysis, recommendations)
+        self._batchers: Dict[str, Tuple[MicroBatcher, MicroBatcher]] = {}
+    
+    async def aclose(self) -> None:
+        """Release pooled provider connections."""
+        if self.client is not None:
+            await self.client.aclose()
+    
+    def _system_prompt(self, context: Optional[Dict[str, Any]]) -> str:
+        context = context or {}
+        return f"""You are PayFlow AI, a helpful assistant for employees.
+
+Context:
+- Available for withdrawal: ₱{context.get('available', 0):,.2f}
+- Total earned: ₱{context.get('earned', 0):,.2f}
+- Next payday: {context.get('next_payday', 'Unknown')}
+
+Answer questions about payroll, earnings, and withdrawals. Be helpful,
+concise, and use Philippine Peso (₱) formatting."""
+    
+    async def _chat_json(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Ask the provider for a JSON object; None if unavailable or unparseable."""
+        try:
+            content = await self.client.chat(
+                [{"role": "user", "content": prompt}], json_mode=True
+            )
+            result = json.loads(content)
+        except (ProviderUnavailableError, TypeError, ValueError):
+            return None
+        return result if isinstance(result, dict) else None
+    
+    async def _chat_json_batch(self, prompt: str, count: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        Ask for a JSON ``results`` array with one object per batched input.
+
+        Returns ``count`` entries; all are None if the provider is
+        unavailable or answered with the wrong number of results, since
+        results can then no longer be matched to inputs.
+        """
+        result = await self._chat_json(prompt)
+        entries = result.get("results") if result is not None else None
+        if not isinstance(entries, list) or len(entries) != count:
+            return [None] * count
+        return [entry if isinstance(entry, dict) else None for entry in entries]
+    
+    async def _analyze_batch(
+        self,
+        items: List[Tuple[List[Dict[str, Any]], Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        employees = [{"transactions": t, "employee_data": e} for t, e in items]
+        entries = await self._chat_json_batch(f"""Analyze the spending pattern of each employee below.
+
+{BATCH_MARKER} {json.dumps(employees)}
+
+Return JSON with:
+- results: array with one entry per employee, in the same order, each with
+  - insights: array of {{"type", "title", "description", "severity"}}
+  - score: 0-100
+  - savings_potential: number
+
+Be specific and actionable.""", len(items))
+        return [
+            {"success": True, **entry} if entry is not None and "insights" in entry
+            else self._mock_spending_analysis()
+            for entry in entries
+        ]
+    
+    async def _recommend_batch(
+        self,
+        items: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[List[Dict[str, Any]]]:
+        employees = [{"employee_data": e, "spending_patterns": p} for e, p in items]
+        entries = await self._chat_json_batch(f"""Suggest personal finance recommendations for each employee below.
+
+{BATCH_MARKER} {json.dumps(employees)}
+
+Return JSON with:
+- results: array with one entry per employee, in the same order, each with
+  - recommendations: array of {{"title", "description", "priority", "potential_savings"}}""", len(items))
+        return [
+            entry["recommendations"]
+            if entry is not None and isinstance(entry.get("recommendations"), list)
+            else self._mock_recommendations()
+            for entry in entries
+        ]
+    
+    def _tenant_batchers(self) -> Tuple[MicroBatcher, MicroBatcher]:
+        """The current tenant's analysis and recommendation batchers."""
+        tenant = current_tenant()
+        batchers = self._batchers.get(tenant)
+        if batchers is None:
+            batchers = (
+                MicroBatcher(self._analyze_batch, self._batch_max_size, self._batch_max_wait_ms),
+                MicroBatcher(self._recommend_batch, self._batch_max_size, self._batch_max_wait_ms)
+            )
+            self._batchers[tenant] = batchers
+        return batchers
+    
+    def batch_report(self) -> Optional[Dict[str, Any]]:
+        """The current tenant's micro-batching counters, or None when batching is off."""
+        if not self.batching:
+            return None
+        analysis, recommendations = self._tenant_batchers()
+        return {
+            "analysis": analysis.report(),
+            "recommendations": recommendations.report()
+        }
     
+    @timed("ai.chat_completion")
     async def chat_completion(
         self, 
         message: str, 
@@ -47,19 +199,95 @@ class AIService:
         Returns:
             AI-generated response string
             
-        Example Integration (OpenAI):
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a PayFlow assistant..."},
+        Cached answers are returned without a provider call. Otherwise the
+        question goes to ``ProviderClient.chat``, which retries transient
+        failures with backoff (AI_MAX_RETRIES) and raises
+        ProviderUnavailableError once they are exhausted or while its
+        circuit breaker is open after repeated failures
+        (AI_BREAKER_FAILURES, AI_BREAKER_RESET_SECONDS). The mock answer is
+        returned in that case, and is not cached.
+        """
+        if self.chat_cache is not None:
+            cached = self.chat_cache.get(message, context)
+            if cached is not None:
+                return cached
+        
+        if self.client is None:
+            response = self._mock_chat_response(message, context)
+        else:
+            try:
+                response = await self.client.chat([
+                    {"role": "system", "content": self._system_prompt(context)},
                     {"role": "user", "content": message}
-                ]
-            )
-            return response.choices[0].message.content
+                ])
+            except ProviderUnavailableError:
+                # Outage fallbacks are not cached, so real answers resume on recovery
+                return self._mock_chat_response(message, context)
+        
+        if self.chat_cache is not None:
+            self.chat_cache.put(message, context, response)
+        return response
+    
+    @timed("ai.stream_chat_completion")
+    async def stream_chat_completion(
+        self,
+        message: str,
+        context: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
         """
-        # Placeholder - implement actual AI call
-        return self._mock_chat_response(message, context)
+        Stream an AI chat response as it is generated.
+        
+        Yields text fragments whose concatenation is the same answer
+        ``chat_completion`` would return. Cached answers arrive as a single
+        fragment; mock answers are streamed word by word.
+        
+        Args:
+            message: User's message
+            context: Employee data context (earnings, balance, etc.)
+            
+        Raises:
+            ProviderUnavailableError: If the provider fails after part of
+                the answer was already streamed
+        """
+        if self.chat_cache is not None:
+            cached = self.chat_cache.get(message, context)
+            if cached is not None:
+                yield cached
+                return
+        
+        if self.client is None:
+            response = self._mock_chat_response(message, context)
+            async for token in self._stream_mock(response):
+                yield token
+        else:
+            parts: List[str] = []
+            try:
+                async for token in self.client.stream_chat([
+                    {"role": "system", "content": self._system_prompt(context)},
+                    {"role": "user", "content": message}
+                ]):
+                    parts.append(token)
+                    yield token
+            except ProviderUnavailableError:
+                if parts:
+                    raise
+                # Nothing sent yet, so the mock can still stand in (uncached)
+                async for token in self._stream_mock(self._mock_chat_response(message, context)):
+                    yield token
+                return
+            response = "".join(parts)
+        
+        if self.chat_cache is not None:
+            self.chat_cache.put(message, context, response)
+    
+    async def _stream_mock(self, response: str) -> AsyncIterator[str]:
+        delay = float(os.getenv("AI_MOCK_STREAM_DELAY_MS", "0")) / 1000
+        for token in _MOCK_TOKENS.findall(response):
+            if delay:
+                await asyncio.sleep(delay)
+            yield token
     
+    @timed("ai.analyze_spending")
     async def analyze_spending(
         self, 
         transactions: List[Dict[str, Any]],
@@ -75,14 +303,32 @@ class AIService:
         Returns:
             Dictionary with insights, patterns, and recommendations
             
-        Example Integration:
-            prompt = f"Analyze spending: {transactions}"
-            response = await self.client.generate(prompt)
-            return parse_insights(response)
+        The provider is asked for a JSON object through
+        ``ProviderClient.chat``, batched with concurrent requests of the
+        same tenant when batching is on. The mock analysis is returned if
+        the provider is unavailable or its answer cannot be parsed.
         """
-        # Placeholder - implement actual AI analysis
-        return self._mock_spending_analysis()
+        if self.client is None:
+            return self._mock_spending_analysis()
+        if self.batching:
+            return await self._tenant_batchers()[0].submit((transactions, employee_data))
+        
+        result = await self._chat_json(f"""Analyze this employee's spending pattern:
+
+Transactions: {json.dumps(transactions)}
+Employee data: {json.dumps(employee_data)}
+
+Return JSON with:
+- insights: array of {{"type", "title", "description", "severity"}}
+- score: 0-100
+- savings_potential: number
+
+Be specific and actionable.""")
+        if result is None or "insights" not in result:
+            return self._mock_spending_analysis()
+        return {"success": True, **result}
     
+    @timed("ai.generate_recommendations")
     async def generate_recommendations(
         self,
         employee_data: Dict[str, Any],
@@ -98,40 +344,140 @@ class AIService:
         Returns:
             List of recommendation objects
         """
-        # Placeholder - implement actual AI recommendations
-        return self._mock_recommendations()
+        if self.client is None:
+            return self._mock_recommendations()
+        if self.batching:
+            return await self._tenant_batchers()[1].submit((employee_data, spending_patterns))
+        
+        result = await self._chat_json(f"""Suggest personal finance recommendations for this employee:
+
+Employee data: {json.dumps(employee_data)}
+Spending patterns: {json.dumps(spending_patterns)}
+
+Return JSON with:
+- recommendations: array of {{"title", "description", "priority", "potential_savings"}}""")
+        if result is None or not isinstance(result.get("recommendations"), list):
+            return self._mock_recommendations()
+        return result["recommendations"]
     
+    @timed("ai.validate_csv")
     async def validate_csv(
         self,
-        csv_data: List[Dict[str, Any]]
+        csv_data: Optional[Union[List[Dict[str, Any]], "pd.DataFrame"]] = None,
+        report: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         AI-powered CSV validation and error detection.
         
+        Rule checks run column-wise in ``validation.py``; only the rows
+        they flag are sent to the provider, which adds suggestions.
+        
         Args:
-            csv_data: Parsed CSV rows
+            csv_data: Parsed CSV as a DataFrame (rows are converted once)
+            report: ``validate_payroll`` result computed elsewhere, e.g. on
+                the job executor; ``csv_data`` is then not needed
             
         Returns:
             Validation results with errors, warnings, suggestions
         """
-        # Placeholder - implement actual AI validation
-        return self._mock_csv_validation()
+        if report is None:
+            import pandas as pd
+            from app.services.validation import validate_payroll
+            
+            frame = csv_data if isinstance(csv_data, pd.DataFrame) else pd.DataFrame(csv_data or [])
+            report = validate_payroll(frame)
+        
+        validation = dict(report)
+        flagged = validation.pop("flagged_sample", [])
+        if self.client is not None and flagged:
+            result = await self._chat_json(f"""Review these payroll rows flagged by automatic checks:
+
+Rule counts: {json.dumps(validation["counts"])}
+Flagged rows: {json.dumps(flagged, default=str)}
+
+Return JSON with:
+- suggestions: array of short strings telling the employer how to fix the data""")
+            if result is not None and isinstance(result.get("suggestions"), list):
+                validation["suggestions"] = validation["suggestions"] + [str(s) for s in result["suggestions"]]
+        return {"success": True, "validation": validation}
     
+    @timed("ai.payroll_insights")
     async def payroll_insights(
         self,
-        payroll_data: List[Dict[str, Any]]
+        payroll_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """
         Generate employer-facing payroll insights.
         
+        Built from precomputed aggregates only, so the cost does not grow
+        with the number of employees or withdrawals.
+        
         Args:
-            payroll_data: Aggregated payroll data
+            payroll_data: ``totals`` (``EmployeeSnapshot.totals``),
+                ``withdrawals`` (``WithdrawalAggregates.summary``) and
+                optionally ``forecast`` (``Forecast.summary``)
             
         Returns:
             Insights, predictions, and anomaly detection results
         """
-        # Placeholder - implement actual AI insights
-        return self._mock_payroll_insights()
+        totals = payroll_data["totals"]
+        withdrawals = payroll_data["withdrawals"]
+        forecast = payroll_data.get("forecast")
+        employees = totals["employees"]
+        period = withdrawals["period"]
+        overall_rate = withdrawals["withdrawals"] / employees if employees else 0.0
+        
+        departments = {}
+        anomalies = []
+        for name, figures in withdrawals["by_department"].items():
+            headcount = totals["departments"].get(name, 0)
+            rate = figures["withdrawals"] / headcount if headcount else 0.0
+            departments[name] = {**figures, "headcount": headcount, "withdrawals_per_employee": round(rate, 2)}
+            if figures["withdrawals"] >= 10 and rate > 2 * overall_rate:
+                anomalies.append({
+                    "type": "department_spike",
+                    "description": f"{name} withdraws {rate / overall_rate:.1f}x as often per employee as the company average",
+                    "severity": "medium"
+                })
+        if period["heavy_withdrawers"]:
+            heavy_share = period["heavy_withdrawers"] / employees if employees else 0.0
+            anomalies.append({
+                "type": "unusual_pattern",
+                "description": f"{period['heavy_withdrawers']} employees withdrew 90%+ of available funds this pay period",
+                "severity": "medium" if heavy_share >= 0.01 else "low"
+            })
+        
+        if forecast is not None:
+            predictions = {
+                "next_week_withdrawals": forecast["next_week_withdrawals"],
+                "liquidity_needed": forecast["liquidity_needed"],
+                "by_department": forecast["by_department"],
+                "model": "seasonal"
+            }
+        else:
+            predictions = {
+                # Daily run rate of the rolling window
+                "next_week_withdrawals": round(withdrawals["amount"] / withdrawals["window_days"] * 7, 2),
+                # Everything employees could draw right now
+                "liquidity_needed": totals["available"],
+                "model": "run_rate"
+            }
+        
+        return {
+            "success": True,
+            "insights": {
+                "total_employees": employees,
+                "early_withdrawal_rate": round(period["withdrawers"] / employees * 100, 1) if employees else 0.0,
+                "average_withdrawal": withdrawals["average"],
+                "peak_withdrawal_day": withdrawals["peak_withdrawal_day"],
+                "anomalies": anomalies,
+                "predictions": predictions,
+                "by_department": departments,
+                "by_weekday": withdrawals["by_weekday"],
+                "window_days": withdrawals["window_days"],
+                "as_of": withdrawals["as_of"]
+            }
+        }
     
     # Mock methods for placeholder functionality
     def _mock_chat_response(self, message: str, context: Optional[Dict] = None) -> str:
@@ -197,51 +543,6 @@ class AIService:
                 "potential_savings": 75.00
             }
         ]
-    
-    def _mock_csv_validation(self) -> Dict[str, Any]:
-        """Mock CSV validation - replace with actual AI"""
-        return {
-            "success": True,
-            "validation": {
-                "is_valid": True,
-                "errors": [],
-                "warnings": [
-                    {
-                        "row": 5,
-                        "column": "salary",
-                        "message": "Salary of ₱150,000 is significantly higher than average. Please verify.",
-                        "severity": "warning"
-                    }
-                ],
-                "suggestions": [
-                    "Consider adding 'department' column for better analytics",
-                    "Date format should be YYYY-MM-DD for consistency"
-                ]
-            }
-        }
-    
-    def _mock_payroll_insights(self) -> Dict[str, Any]:
-        """Mock payroll insights - replace with actual AI"""
-        return {
-            "success": True,
-            "insights": {
-                "total_employees": 1247,
-                "early_withdrawal_rate": 68.5,
-                "average_withdrawal": 2345.00,
-                "peak_withdrawal_day": "Wednesday",
-                "anomalies": [
-                    {
-                        "type": "unusual_pattern",
-                        "description": "15 employees withdrew 90%+ of available funds this week",
-                        "severity": "medium"
-                    }
-                ],
-                "predictions": {
-                    "next_week_withdrawals": 850000.00,
-                    "liquidity_needed": 950000.00
-                }
-            }
-        }
 
 
 # Singleton instance
@@ -0,0 +1,328 @@
+"""
+AI Provider Client for PayFlow
+
+Async HTTP client for OpenAI-compatible chat completion APIs (OpenAI,
+Azure OpenAI, vLLM, Ollama, or the offline fake provider in
+``benchmarks/fake_provider.py``). One pooled connection set is shared per
+process, concurrent upstream calls are capped with a semaphore, and every
+call gets a timeout, jittered retries and a circuit breaker. When the
+breaker is open or retries are exhausted, callers receive
+``ProviderUnavailableError`` and fall back to the mock responses.
+Streamed completions (server-sent events) are retried only until the
+first token has been delivered.
+
+Environment Variables:
+- AI_BASE_URL: API root (default https://api.openai.com/v1)
+- AI_API_KEY: Bearer token (falls back to OPENAI_API_KEY)
+- AI_MODEL: Model name (falls back to OPENAI_MODEL, then gpt-4)
+- AI_TIMEOUT_SECONDS: Per-attempt timeout (default 30)
+- AI_MAX_CONCURRENCY: Concurrent upstream calls per process (default 16)
+- AI_MAX_RETRIES: Retries after the first attempt (default 2)
+- AI_BREAKER_FAILURES: Consecutive failed calls that open the breaker (default 5)
+- AI_BREAKER_RESET_SECONDS: How long the breaker stays open (default 30)
+
+Requires ``httpx`` (see requirements-ai.txt).
+"""
+
+from typing import Dict, List, Any, AsyncIterator, Optional
+import asyncio
+import json
+import os
+import random
+import time
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class ProviderUnavailableError(Exception):
+    """Raised when the provider cannot serve a call (breaker open or retries exhausted)."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Opens after ``failure_threshold`` failed calls in a row. While open,
+    calls are rejected without touching the network; after
+    ``reset_timeout`` one trial call is let through (half-open), and its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def abandon(self) -> None:
+        """Release a half-open trial whose outcome will never be known."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ProviderClient:
+    """Pooled, rate-capped client for an OpenAI-compatible API."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        timeout: float = 30.0,
+        max_concurrency: int = 16,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_cap: float = 4.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http = None
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    @classmethod
+    def from_env(cls) -> "ProviderClient":
+        """Build a client from the AI_* environment variables."""
+        return cls(
+            base_url=os.getenv("AI_BASE_URL", "https://api.openai.com/v1"),
+            api_key=os.getenv("AI_API_KEY") or os.getenv("OPENAI_API_KEY"),
+            model=os.getenv("AI_MODEL") or os.getenv("OPENAI_MODEL", "gpt-4"),
+            timeout=float(os.getenv("AI_TIMEOUT_SECONDS", "30")),
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", "16")),
+            max_retries=int(os.getenv("AI_MAX_RETRIES", "2")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("AI_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("AI_BREAKER_RESET_SECONDS", "30"))
+            )
+        )
+
+    def _client(self):
+        # One connection pool per process, created on first use
+        if self._http is None:
+            import httpx
+
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self._http
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spreads retries from many callers after a shared failure
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a JSON payload with retries, returning the decoded response.
+
+        Raises:
+            ProviderUnavailableError: If the breaker is open or all attempts fail
+        """
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise ProviderUnavailableError("Circuit breaker is open")
+
+        self.stats["calls"] += 1
+        try:
+            return await self._post_with_retries(path, payload)
+        except asyncio.CancelledError:
+            # The caller went away; don't leave a half-open trial hanging
+            self.breaker.abandon()
+            raise
+
+    async def _post_with_retries(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import httpx
+
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                async with self._semaphore:
+                    response = await self._client().post(path, json=payload)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                last_error = e
+                continue
+
+            if response.status_code in RETRYABLE_STATUS:
+                last_error = httpx.HTTPStatusError(
+                    f"Provider returned {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+                continue
+            if response.is_error:
+                # Client errors (bad request, auth) will not improve on retry
+                last_error = httpx.HTTPStatusError(
+                    f"Provider returned {response.status_code}",
+                    request=response.request,
+                    response=response
+                )
+                break
+
+            try:
+                data = response.json()
+            except ValueError as e:
+                last_error = e
+                break
+            self.breaker.record_success()
+            return data
+
+        self.stats["failures"] += 1
+        self.breaker.record_failure()
+        raise ProviderUnavailableError(str(last_error)) from last_error
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        json_mode: bool = False,
+        **options: Any
+    ) -> str:
+        """
+        Run a chat completion and return the message content.
+
+        Args:
+            messages: OpenAI-style role/content messages
+            json_mode: Ask the provider for a JSON object response
+            options: Extra request fields (temperature, max_tokens, ...)
+        """
+        payload: Dict[str, Any] = {"model": self.model, "messages": messages, **options}
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        data = await self.post("/chat/completions", payload)
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ProviderUnavailableError("Malformed provider response")
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        **options: Any
+    ) -> AsyncIterator[str]:
+        """
+        Run a streamed chat completion, yielding content deltas as they arrive.
+
+        The concurrency slot is held for the whole stream. Closing the
+        generator early (client disconnected) closes the upstream request.
+
+        Raises:
+            ProviderUnavailableError: If the breaker is open, all attempts
+                fail before the first token, or the stream breaks midway
+        """
+        import httpx
+
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise ProviderUnavailableError("Circuit breaker is open")
+
+        self.stats["calls"] += 1
+        payload = {"model": self.model, "messages": messages, "stream": True, **options}
+        last_error: Optional[BaseException] = None
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self._backoff(attempt - 1))
+                delivered = False
+                try:
+                    async with self._semaphore:
+                        async with self._client().stream("POST", "/chat/completions", json=payload) as response:
+                            if response.is_error:
+                                last_error = httpx.HTTPStatusError(
+                                    f"Provider returned {response.status_code}",
+                                    request=response.request,
+                                    response=response
+                                )
+                                if response.status_code in RETRYABLE_STATUS:
+                                    continue
+                                break
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                try:
+                                    delta = json.loads(data)["choices"][0]["delta"].get("content")
+                                except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+                                    continue
+                                if delta:
+                                    delivered = True
+                                    yield delta
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    last_error = e
+                    if delivered:
+                        # Tokens already reached the caller; a retry would repeat them
+                        break
+                    continue
+                self.breaker.record_success()
+                return
+        except (GeneratorExit, asyncio.CancelledError):
+            # The caller went away mid-stream; don't leave a half-open trial hanging
+            self.breaker.abandon()
+            raise
+
+        self.stats["failures"] += 1
+        self.breaker.record_failure()
+        raise ProviderUnavailableError(str(last_error)) from last_error
+
+    def status(self) -> Dict[str, Any]:
+        """Breaker state and call counters."""
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "breaker": self.breaker.state,
+            "max_concurrency": self.max_concurrency,
+            **self.stats
+        }
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
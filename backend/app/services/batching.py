@@ -0,0 +1,93 @@
+"""
+Request Micro-Batching for PayFlow
+
+On payday thousands of employees open the AI Insights tab within
+minutes. ``MicroBatcher`` collects concurrent requests for a short
+window (or until the batch is full), runs them through one batched call,
+and fans the results back out to the waiting coroutines. One upstream
+round trip then serves many employees.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+import asyncio
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesce concurrent calls into batches.
+
+    Args:
+        batch_fn: Coroutine taking a list of items and returning one
+            result per item, in order
+        max_batch_size: Flush as soon as this many items are waiting
+        max_wait_ms: Flush this long after the first item arrived
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 20.0
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self.stats = {"items": 0, "batches": 0, "largest_batch": 0}
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Hold a reference so the task isn't garbage-collected mid-flight
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        self.stats["items"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Waiters that were cancelled (client disconnected) are skipped
+            if not future.done():
+                future.set_result(result)
+
+    def report(self) -> Dict[str, Any]:
+        """Batch counters and mean batch size."""
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "mean_batch_size": round(self.stats["items"] / batches, 2) if batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
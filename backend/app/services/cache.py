@@ -0,0 +1,313 @@
+"""
+Response Cache for PayFlow
+
+Read endpoints polled by the mobile PWA around payday serve identical
+payloads many times over. This module caches their serialized bodies
+behind a pluggable backend:
+
+- MemoryCache: in-process LRU with per-entry TTL (default)
+- RedisCache: any Redis-compatible server (Redis, Valkey, KeyDB, ...),
+  shared by all workers; needs the ``redis`` package
+
+Invalidation uses generation counters per tag. Every cache key embeds the
+current generation of its tags, so bumping a tag (new payroll upload,
+EWA withdrawal) makes all dependent entries unreachable at once, and the
+stale ones simply age out. Tags in use: ``payroll`` (any employee data),
+``roster`` (responses spanning many employees), ``ewa`` (EWA figures) and
+``employee:<id>`` (one employee). Responses carry an ETag and requests with a
+matching ``If-None-Match`` get a 304.
+
+Keys and tags are namespaced by the current tenant: employers share the
+backend and its capacity, but never each other's entries, and an upload
+invalidates only its own employer's responses.
+
+Environment Variables:
+- PAYFLOW_CACHE_URL: redis://host:port/db to use RedisCache (default: in-process)
+- PAYFLOW_CACHE_MAX_ENTRIES: MemoryCache capacity (default 10000)
+- PAYFLOW_CACHE_TTL: Default entry TTL in seconds (default 30)
+"""
+
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Iterable, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+
+from app.services.serialization import dumps
+from app.services.tenants import current_tenant
+
+CACHE_TTL = float(os.getenv("PAYFLOW_CACHE_TTL", "30"))
+
+
+class CacheBackend:
+    """
+    Key/value interface a cache backend must implement.
+
+    Values are bytes. Counters live alongside entries but are never
+    evicted, because losing one would resurrect invalidated entries.
+    """
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.get_nowait(key)
+
+    def get_nowait(self, key: str) -> Optional[bytes]:
+        """Synchronous ``get`` for callers outside the event loop."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.set_nowait(key, value, ttl)
+
+    def set_nowait(self, key: str, value: Any, ttl: float) -> None:
+        """Synchronous ``set`` for callers outside the event loop."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    async def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache(CacheBackend):
+    """Cache backed by a Redis-compatible server via ``redis.asyncio``."""
+
+    def __init__(self, client: Any, namespace: str = "payflow"):
+        self.client = client
+        self.namespace = namespace
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        import redis.asyncio as redis
+        return cls(redis.from_url(url))
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self._key(key), value, px=max(int(ttl * 1000), 1))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+
+    async def counter(self, key: str) -> int:
+        value = await self.client.get(self._key(key))
+        return int(value) if value is not None else 0
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(self._key(key))
+
+    async def clear(self) -> None:
+        cursor = 0
+        while True:
+            cursor, keys = await self.client.scan(cursor, match=f"{self.namespace}:*")
+            if keys:
+                await self.client.delete(*keys)
+            if cursor == 0:
+                break
+
+
+class ResponseCache:
+    """
+    Per-route JSON response cache with ETags and tag invalidation.
+
+    Entries are stored as ``<etag> <body>`` so one backend read serves
+    both full responses and 304s.
+    """
+
+    def __init__(self, backend: CacheBackend, default_ttl: float = CACHE_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.route_stats: Dict[str, Dict[str, int]] = {}
+        self.invalidations: Dict[str, int] = {}
+
+    def _count(self, route: str, outcome: str) -> None:
+        stats = self.route_stats.setdefault(route, {"hits": 0, "misses": 0, "not_modified": 0})
+        stats[outcome] += 1
+
+    @staticmethod
+    def _tag(tenant: str, tag: str) -> str:
+        return f"gen:{tenant}:{tag}"
+
+    async def _key(self, route: str, params: Dict[str, Any], tags: Iterable[str]) -> str:
+        tenant = current_tenant()
+        generations = [f"{tag}={await self.backend.counter(self._tag(tenant, tag))}" for tag in sorted(tags)]
+        raw = json.dumps([tenant, route, sorted(params.items()), generations], default=str)
+        return "resp:" + hashlib.sha1(raw.encode()).hexdigest()
+
+    async def respond(
+        self,
+        request: Request,
+        route: str,
+        producer: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = ("payroll",),
+        params: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None
+    ) -> Response:
+        """
+        Serve a cached JSON response, producing and storing it on a miss.
+
+        Args:
+            request: Incoming request (for If-None-Match)
+            route: Cache namespace, usually the route path
+            producer: Coroutine function returning the payload
+            tags: Invalidation tags the payload depends on
+            params: Request parameters that select the payload
+            ttl: Entry lifetime in seconds (default ``PAYFLOW_CACHE_TTL``)
+
+        Returns:
+            200 with the body, or 304 when the client's ETag is current
+        """
+        key = await self._key(route, params or {}, tags)
+        entry = await self.backend.get(key)
+        outcome = "hits"
+        if entry is None:
+            outcome = "misses"
+            body = dumps(await producer())
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            await self.backend.set(key, etag.encode() + b" " + body, ttl or self.default_ttl)
+        else:
+            raw_etag, _, body = entry.partition(b" ")
+            etag = raw_etag.decode()
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Cache": "HIT" if outcome == "hits" else "MISS"}
+        if etag in request.headers.get("if-none-match", ""):
+            self._count(route, "not_modified")
+            return Response(status_code=304, headers=headers)
+        self._count(route, outcome)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *tags: str, tenant: Optional[str] = None) -> None:
+        """
+        Make every entry depending on any of ``tags`` unreachable, for
+        ``tenant`` only (default: the current one).
+        """
+        tenant = tenant or current_tenant()
+        for tag in tags:
+            await self.backend.incr(self._tag(tenant, tag))
+            self.invalidations[tag] = self.invalidations.get(tag, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per route and overall."""
+        hits = sum(s["hits"] + s["not_modified"] for s in self.route_stats.values())
+        misses = sum(s["misses"] for s in self.route_stats.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "routes": self.route_stats,
+            "invalidations": self.invalidations
+        }
+
+
+async def on_payroll_loaded() -> None:
+    """Invalidation hook: a new payroll replaced the employee data."""
+    await get_response_cache().invalidate("payroll")
+
+
+async def on_payroll_changed(employee_ids: Iterable[str], limit: int = 1000) -> None:
+    """
+    Invalidation hook: an upload changed only some employees.
+
+    Drops roster-wide responses and those of the affected employees; a
+    larger delta than ``limit`` invalidates everything instead.
+
+    Args:
+        employee_ids: Employees added, removed or changed
+        limit: Most per-employee tags bumped individually
+    """
+    employee_ids = list(employee_ids)
+    if not employee_ids:
+        return
+    if len(employee_ids) > limit:
+        await on_payroll_loaded()
+        return
+    await get_response_cache().invalidate("roster", *(f"employee:{i}" for i in employee_ids))
+
+
+async def on_ewa_changed(*employee_ids: str) -> None:
+    """
+    Invalidation hook: EWA figures changed (withdrawal or recompute).
+
+    Args:
+        employee_ids: Employees affected; none means everyone
+    """
+    await get_response_cache().invalidate("ewa", *(f"employee:{i}" for i in employee_ids))
+
+
+# Singleton instance
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the response cache configured from the environment"""
+    global _response_cache
+    if _response_cache is None:
+        url = os.getenv("PAYFLOW_CACHE_URL")
+        backend = RedisCache.from_url(url) if url else MemoryCache(
+            int(os.getenv("PAYFLOW_CACHE_MAX_ENTRIES", "10000"))
+        )
+        _response_cache = ResponseCache(backend)
+    return _response_cache
@@ -0,0 +1,246 @@
+"""
+Chat Completion Cache for PayFlow
+
+Employees ask the same few questions over and over ("how much can I
+withdraw", "when is payday"), and within a pay period the answer only
+depends on the question's intent and a few context fields. This cache
+sits in front of ``AIService.chat_completion``:
+
+- Messages are normalized (case, punctuation, whitespace). Rephrasings
+  of a few stock questions ("how much can I withdraw?", "when's the next
+  payday?"), whose answer does not depend on the wording, share one
+  intent key plus ``available``, ``earned`` and ``next_payday``; every
+  other message is keyed by its normalized text plus that context, so
+  "why was my withdrawal rejected?" never gets the balance answer.
+- Entries live in a size-bounded LRU and expire at the next payday.
+- Optionally, a miss is retried against a local index of hashed
+  character-trigram embeddings to catch near-duplicate phrasings.
+- Keys and near-duplicate matches are scoped to the current tenant, so
+  employers never see each other's answers.
+
+Environment Variables:
+- AI_CHAT_CACHE_ENABLED: "false" disables the cache (default true)
+- AI_CHAT_CACHE_MAX_ENTRIES: Capacity (default 5000)
+- AI_CHAT_CACHE_TTL: Fallback TTL in seconds when payday is unknown or past (default 3600)
+- AI_CHAT_CACHE_SEMANTIC: "true" enables near-duplicate matching (default false)
+- AI_CHAT_CACHE_SIMILARITY: Cosine threshold for near-duplicates (default 0.9)
+"""
+
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+import os
+import re
+import time
+import zlib
+
+from app.services.cache import MemoryCache
+from app.services.tenants import current_tenant
+
+MAX_TTL_SECONDS = 16 * 24 * 3600
+EMBEDDING_DIM = 512
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+# Words dropped before comparing a message with the stock questions
+FILLER_WORDS = frozenset((
+    "a", "am", "an", "can", "did", "do", "have", "i", "is", "me", "my", "next", "now", "please",
+    "s", "so", "far", "the", "today"
+))
+# Questions answered from the context alone, whatever their wording
+INTENT_QUESTIONS = {
+    "withdraw": ("How much can I withdraw?", "How much can I cash out?"),
+    "payday": ("When is payday?", "When is my next payday?"),
+    "earnings": ("How much have I earned?", "How much did I earn?", "How much do I earn?")
+}
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", message.lower())).strip()
+
+
+def _core(normalized: str) -> str:
+    return " ".join(word for word in normalized.split() if word not in FILLER_WORDS)
+
+
+_STOCK_QUESTIONS = {
+    _core(normalize_message(question)): intent
+    for intent, questions in INTENT_QUESTIONS.items()
+    for question in questions
+}
+
+
+def classify_intent(normalized: str) -> Optional[str]:
+    """
+    Map a normalized message to the intent of the stock question it
+    rephrases, if any.
+
+    Only filler words may differ ("how much can I withdraw" and "how much
+    can i withdraw now" match); a message that mentions withdrawals but
+    asks something else has no intent and is cached by its own text.
+    """
+    return _STOCK_QUESTIONS.get(_core(normalized))
+
+
+def _embed(text: str) -> Any:
+    """Hashed character-trigram embedding, L2-normalized."""
+    import numpy as np
+
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    padded = f"  {text} "
+    for i in range(len(padded) - 2):
+        vector[zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_DIM] += 1.0
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class SemanticIndex:
+    """
+    Bounded near-duplicate index over cached messages.
+
+    One ring buffer of ``capacity`` vectors is shared by every context
+    signature, so memory stays fixed however many tenants and contexts
+    are seen. A lookup is one matrix-vector product, masked to the slots
+    with the same signature.
+    """
+
+    def __init__(self, capacity: int, threshold: float):
+        import numpy as np
+
+        self.capacity = capacity
+        self.threshold = threshold
+        self._vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        # Hash of each slot's signature, for the lookup mask
+        self._owners = np.zeros(capacity, dtype=np.int64)
+        self._signatures: List[Optional[str]] = [None] * capacity
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._slots: Dict[str, int] = {}
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, signature: str, text: str, key: str) -> None:
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._cursor % self.capacity
+            self._cursor += 1
+            self.discard(self._keys[slot])
+            self._slots[key] = slot
+        self._vectors[slot] = _embed(text)
+        self._owners[slot] = hash(signature)
+        self._signatures[slot] = signature
+        self._keys[slot] = key
+
+    def discard(self, key: Optional[str]) -> None:
+        """Forget the vector of a key whose cache entry is gone."""
+        slot = self._slots.pop(key, None) if key is not None else None
+        if slot is not None:
+            self._signatures[slot] = None
+            self._keys[slot] = None
+
+    def nearest(self, signature: str, text: str) -> Optional[str]:
+        """Key of the most similar cached message above the threshold."""
+        import numpy as np
+
+        used = min(self._cursor, self.capacity)
+        candidates = np.flatnonzero(self._owners[:used] == hash(signature))
+        candidates = [slot for slot in candidates if self._signatures[slot] == signature]
+        if not candidates:
+            return None
+        scores = self._vectors[candidates] @ _embed(text)
+        best = int(scores.argmax())
+        return self._keys[candidates[best]] if scores[best] >= self.threshold else None
+
+
+class ChatCache:
+    """Intent- and context-keyed cache of chat answers."""
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        fallback_ttl: float = 3600.0,
+        semantic: bool = False,
+        similarity: float = 0.9
+    ):
+        self.fallback_ttl = fallback_ttl
+        self._entries = MemoryCache(max_entries)
+        self._index = SemanticIndex(max_entries, similarity) if semantic else None
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0}
+        self._lookup_seconds = 0.0
+        self._lookups = 0
+
+    @classmethod
+    def from_env(cls) -> "ChatCache":
+        """Build a cache from the AI_CHAT_CACHE_* environment variables."""
+        return cls(
+            max_entries=int(os.getenv("AI_CHAT_CACHE_MAX_ENTRIES", "5000")),
+            fallback_ttl=float(os.getenv("AI_CHAT_CACHE_TTL", "3600")),
+            semantic=os.getenv("AI_CHAT_CACHE_SEMANTIC", "false").lower() == "true",
+            similarity=float(os.getenv("AI_CHAT_CACHE_SIMILARITY", "0.9"))
+        )
+
+    @staticmethod
+    def _signature(context: Optional[Dict[str, Any]]) -> str:
+        context = context or {}
+        return f"{current_tenant()}|{context.get('available')}|{context.get('earned')}|{context.get('next_payday')}"
+
+    def _key(self, message: str, context: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+        normalized = normalize_message(message)
+        intent = classify_intent(normalized)
+        signature = self._signature(context)
+        subject = f"intent:{intent}" if intent else f"text:{normalized}"
+        return f"{subject}|{signature}", normalized, signature
+
+    def _ttl(self, context: Optional[Dict[str, Any]]) -> float:
+        """Seconds until the next payday, so answers expire with the pay period."""
+        payday = (context or {}).get("next_payday")
+        try:
+            remaining = datetime.fromisoformat(str(payday)).timestamp() - time.time()
+        except ValueError:
+            return self.fallback_ttl
+        return min(remaining, MAX_TTL_SECONDS) if remaining > 0 else self.fallback_ttl
+
+    def get(self, message: str, context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Cached answer for the message in this context, if any."""
+        start = time.perf_counter()
+        key, normalized, signature = self._key(message, context)
+        answer = self._entries.get_nowait(key)
+        if answer is not None:
+            self.stats["hits"] += 1
+        elif self._index is not None:
+            similar = self._index.nearest(signature, normalized)
+            while similar is not None:
+                answer = self._entries.get_nowait(similar)
+                if answer is not None:
+                    self.stats["semantic_hits"] += 1
+                    break
+                # Its entry was evicted or expired; try the next best
+                self._index.discard(similar)
+                similar = self._index.nearest(signature, normalized)
+        if answer is None:
+            self.stats["misses"] += 1
+        self._lookup_seconds += time.perf_counter() - start
+        self._lookups += 1
+        return answer
+
+    def put(self, message: str, context: Optional[Dict[str, Any]], answer: str) -> None:
+        """Store an answer until the context's next payday."""
+        key, normalized, signature = self._key(message, context)
+        self._entries.set_nowait(key, answer, self._ttl(context))
+        if self._index is not None and not key.startswith("intent:"):
+            self._index.add(signature, normalized, key)
+        self.stats["stores"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        """Hit rate, size and mean lookup latency."""
+        hits = self.stats["hits"] + self.stats["semantic_hits"]
+        total = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "evictions": self._entries.evictions,
+            "semantic": self._index is not None,
+            "semantic_vectors": len(self._index) if self._index is not None else 0,
+            "mean_lookup_us": round(self._lookup_seconds / self._lookups * 1e6, 2) if self._lookups else 0.0
+        }
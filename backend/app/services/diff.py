@@ -0,0 +1,262 @@
+"""
+Incremental Payroll Diffing for PayFlow
+
+Employers re-upload nearly the same payroll every pay period. Each
+upload's employee rows are fingerprinted (one 64-bit hash per row over
+the payroll columns, keyed by employee_id) and compared with the previous
+upload's fingerprints, yielding the added, removed and changed employees.
+EWA recompute, validation and cache invalidation then only touch that
+delta, and the Migration Studio can show it.
+
+The latest fingerprints and diff are stored under the data directory:
+
+    <data dir>/payroll/
+        fingerprints.npz   employee IDs and row hashes of the last upload
+        last-diff.npz      added / removed / changed employee IDs
+        last-diff.json     filename, timestamp and counts
+"""
+
+from typing import Dict, List, Any, Optional
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.tenants import TenantScoped, tenant_data_dir
+from app.utils import get_data_dir
+
+# Columns an upload contributes to the employee schema besides the
+# employee_id key; computed EWA columns are excluded so a recompute never
+# shows up as a change
+FINGERPRINT_COLUMNS = ("name", "department", "status", "salary", "hire_date")
+FINGERPRINT_FILE = "fingerprints.npz"
+DIFF_FILE = "last-diff.npz"
+DIFF_META_FILE = "last-diff.json"
+DIFF_KINDS = ("added", "removed", "changed")
+
+
+def fingerprint(frame: pd.DataFrame) -> pd.Series:
+    """
+    Hash each employee row.
+
+    Args:
+        frame: Employee-schema frame (see ``payroll_to_employees``)
+
+    Returns:
+        uint64 hashes indexed by employee_id; rows without an ID are
+        skipped and for duplicate IDs the last row wins, as in the
+        employee store
+    """
+    ids = frame["employee_id"]
+    present = ids.notna() & (ids.astype(str).str.strip() != "")
+    if not present.all():
+        frame = frame[present]
+    columns = [c for c in FINGERPRINT_COLUMNS if c in frame.columns]
+    hashes = pd.Series(
+        pd.util.hash_pandas_object(frame[columns], index=False).to_numpy(),
+        index=pd.Index(frame["employee_id"].astype(str).to_numpy())
+    )
+    if not hashes.index.is_unique:
+        hashes = hashes[~hashes.index.duplicated(keep="last")]
+    return hashes
+
+
+class PayrollDiff:
+    """
+    Employees added, removed and changed between two uploads.
+
+    Attributes:
+        added, removed, changed: Employee ID arrays, in upload order
+            (removed: in the previous upload's order)
+        unchanged: Number of employees present in both with the same hash
+        fingerprints: Hashes of the new upload
+        incremental: True when the baseline was the store's current data,
+            so downstream work may be limited to the delta
+        source: Per new fingerprint, its position among the previous
+            fingerprints (-1 if added)
+        same: Per new fingerprint, whether its hash is unchanged
+    """
+
+    def __init__(
+        self,
+        added: np.ndarray,
+        removed: np.ndarray,
+        changed: np.ndarray,
+        unchanged: int,
+        fingerprints: Optional[pd.Series] = None,
+        incremental: bool = False,
+        source: Optional[np.ndarray] = None,
+        same: Optional[np.ndarray] = None
+    ):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.unchanged = unchanged
+        self.fingerprints = fingerprints
+        self.incremental = incremental
+        self.source = source
+        self.same = same
+
+    @property
+    def delta_ids(self) -> np.ndarray:
+        """Employees whose rows need processing: added plus changed."""
+        return np.concatenate([self.added, self.changed])
+
+    @property
+    def unmodified(self) -> bool:
+        """True when the upload matches the previous one exactly."""
+        return not (len(self.added) or len(self.removed) or len(self.changed))
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "changed": len(self.changed),
+            "unchanged": self.unchanged
+        }
+
+
+def diff_fingerprints(
+    previous: Optional[pd.Series],
+    current: pd.Series,
+    incremental: bool = False
+) -> PayrollDiff:
+    """
+    Compare two fingerprint series.
+
+    One hash join of the current IDs against the previous index; the
+    previous index's hash table is reused when the same series is the
+    baseline again. With no previous fingerprints every current employee
+    counts as added.
+    """
+    ids = current.index
+    if previous is None:
+        empty = np.array([], dtype=str)
+        return PayrollDiff(ids.to_numpy(dtype=str), empty, empty, 0, current, incremental)
+
+    source = previous.index.get_indexer(current.index)
+    found = source >= 0
+    same = found.copy()
+    same[found] = previous.to_numpy()[source[found]] == current.to_numpy()[found]
+    gone = np.ones(len(previous), dtype=bool)
+    gone[source[found]] = False
+    return PayrollDiff(
+        added=ids[~found].to_numpy(dtype=str),
+        removed=previous.index[gone].to_numpy(dtype=str),
+        changed=ids[found & ~same].to_numpy(dtype=str),
+        unchanged=int(same.sum()),
+        fingerprints=current,
+        incremental=incremental,
+        source=source,
+        same=same
+    )
+
+
+class PayrollDiffer:
+    """Diffs each upload against the last one and persists applied ones."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_data_dir("payroll")
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _save_npz(self, name: str, **arrays: np.ndarray) -> None:
+        # np.savez appends .npz to names without it, so keep the suffix on the temp file
+        tmp_path = self._path(f".{os.getpid()}.{name}")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self._path(name))
+
+    def stored_fingerprints(self) -> Optional[pd.Series]:
+        """Fingerprints of the last upload, if any."""
+        try:
+            with np.load(self._path(FINGERPRINT_FILE)) as data:
+                return pd.Series(data["hashes"], index=data["ids"])
+        except FileNotFoundError:
+            return None
+
+    def compare(
+        self,
+        frame: pd.DataFrame,
+        baseline: Optional[pd.Series] = None
+    ) -> PayrollDiff:
+        """
+        Fingerprint an upload and diff it. Nothing is stored until the
+        upload goes live and ``save`` is called.
+
+        Args:
+            frame: Employee-schema frame of the new upload
+            baseline: Fingerprints of the data currently in the employee
+                store; when omitted the stored fingerprints are used and
+                the diff is informational only (not ``incremental``)
+        """
+        current = fingerprint(frame)
+        incremental = baseline is not None
+        if not incremental:
+            with self._lock:
+                baseline = self.stored_fingerprints()
+        return diff_fingerprints(baseline, current, incremental)
+
+    def save(self, diff: PayrollDiff, filename: str) -> None:
+        """
+        Store an applied upload's fingerprints as the new baseline and its
+        diff as the latest one.
+
+        Args:
+            diff: Result of ``compare`` for the upload
+            filename: Upload name, for the Migration Studio
+        """
+        with self._lock:
+            self._save_npz(
+                FINGERPRINT_FILE,
+                ids=diff.fingerprints.index.to_numpy(dtype=str),
+                hashes=diff.fingerprints.to_numpy()
+            )
+            self._save_npz(DIFF_FILE, added=diff.added, removed=diff.removed, changed=diff.changed)
+            meta = {"filename": filename, "created_at": time.time(), "counts": diff.counts()}
+            tmp_path = self._path(f".{DIFF_META_FILE}.{os.getpid()}")
+            with open(tmp_path, "w") as handle:
+                json.dump(meta, handle)
+            os.replace(tmp_path, self._path(DIFF_META_FILE))
+
+    def last_diff(
+        self,
+        kind: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 100
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The most recent diff, with a page of employee IDs per kind.
+
+        Args:
+            kind: Only list this kind (added, removed or changed)
+            offset: IDs to skip in each listed kind
+            limit: Most IDs listed per kind
+
+        Returns:
+            filename, created_at, counts and the ID pages; None if no
+            upload has been diffed yet
+        """
+        try:
+            with open(self._path(DIFF_META_FILE)) as handle:
+                meta = json.load(handle)
+            with np.load(self._path(DIFF_FILE)) as data:
+                ids: Dict[str, List[str]] = {
+                    name: data[name][offset:offset + limit].tolist()
+                    for name in DIFF_KINDS if kind in (None, name)
+                }
+        except FileNotFoundError:
+            return None
+        return {**meta, **ids}
+
+
+# Instances per tenant
+_payroll_differs = TenantScoped(lambda tenant: PayrollDiffer(tenant_data_dir(tenant, "payroll")))
+
+def get_payroll_differ(tenant: Optional[str] = None) -> PayrollDiffer:
+    """Get or create the payroll differ of a tenant (default: the current one)"""
+    return _payroll_differs.get(tenant)
@@ -0,0 +1,791 @@
+"""
+Employee Repository for PayFlow
+
+Employees are held in one columnar, typed pandas frame instead of a list
+of dicts, with hash indexes on ``employee_id`` and ``department``. Pages,
+single-employee lookups and department filters only materialize the rows
+they return, so per-request cost does not grow with the tenant size.
+
+Listing supports keyset pagination: a cursor encodes the (sort key,
+employee_id) of the last row served, and the next page starts with a
+binary search into a sorted index, so deep pages cost the same as the
+first one and do not drift when rows are added or removed.
+
+Each load builds a new ``EmployeeSnapshot`` and swaps it in with one
+reference assignment, so readers never see a half-built dataset. The only
+in-place writes are EWA recomputes, which touch the earned/available
+columns of the affected rows and drop their cached sort indexes.
+Demo data (superhero alter egos) is loaded once, on first use; uploading
+a payroll CSV replaces it through the same store. Uploads are also
+written as columnar snapshots (snapshot.py), and when one exists the
+store starts from it, memory-mapped, instead of the demo data.
+"""
+
+from datetime import date
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+import asyncio
+import base64
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.services.diff import PayrollDiff
+from app.services.ewa import PayPeriod, compute_ewa, get_pay_calendar, accrual_date
+from app.services.metrics import span
+from app.services.serialization import RawJSON, frame_records
+from app.services.snapshot import SNAPSHOT_ENABLED, Snapshot, get_snapshot_store
+from app.services.tenants import TenantScoped
+
+PUBLIC_COLUMNS = [
+    "employee_id", "name", "department", "earned_this_period", "available_ewa", "status"
+]
+DEFAULT_DEPARTMENT = "Unassigned"
+DEFAULT_STATUS = "active"
+SORT_KEYS = ("employee_id", "earned_this_period", "available_ewa")
+FILTER_CACHE_SIZE = 64
+
+# Superhero alter ego employees - 50 employees for realistic pagination
+SEED_EMPLOYEES = [
+    {"employee_id": "HC-2024-001", "name": "Bruce Wayne", "department": "Executive", "earned_this_period": 45000, "available_ewa": 13500, "status": "active"},
+    {"employee_id": "HC-2024-002", "name": "Clark Kent", "department": "Media Relations", "earned_this_period": 32000, "available_ewa": 9600, "status": "active"},
+    {"employee_id": "HC-2024-003", "name": "Diana Prince", "department": "Legal", "earned_this_period": 38000, "available_ewa": 11400, "status": "active"},
+    {"employee_id": "HC-2024-004", "name": "Peter Parker", "department": "Research", "earned_this_period": 28000, "available_ewa": 8400, "status": "active"},
+    {"employee_id": "HC-2024-005", "name": "Tony Stark", "department": "Engineering", "earned_this_period": 52000, "available_ewa": 15600, "status": "active"},
+    {"employee_id": "HC-2024-006", "name": "Natasha Romanoff", "department": "Security", "earned_this_period": 35000, "available_ewa": 10500, "status": "active"},
+    {"employee_id": "HC-2024-007", "name": "Steve Rogers", "department": "Operations", "earned_this_period": 33000, "available_ewa": 9900, "status": "active"},
+    {"employee_id": "HC-2024-008", "name": "Wanda Maximoff", "department": "HR", "earned_this_period": 29000, "available_ewa": 8700, "status": "active"},
+    {"employee_id": "HC-2024-009", "name": "Stephen Strange", "department": "Consulting", "earned_this_period": 48000, "available_ewa": 14400, "status": "active"},
+    {"employee_id": "HC-2024-010", "name": "Carol Danvers", "department": "Aviation", "earned_this_period": 42000, "available_ewa": 12600, "status": "active"},
+    {"employee_id": "HC-2024-011", "name": "T'Challa", "department": "International Relations", "earned_this_period": 46000, "available_ewa": 13800, "status": "active"},
+    {"employee_id": "HC-2024-012", "name": "Scott Lang", "department": "IT", "earned_this_period": 27000, "available_ewa": 8100, "status": "active"},
+    {"employee_id": "HC-2024-013", "name": "Barry Allen", "department": "Logistics", "earned_this_period": 30000, "available_ewa": 9000, "status": "active"},
+    {"employee_id": "HC-2024-014", "name": "Hal Jordan", "department": "Aerospace", "earned_this_period": 39000, "available_ewa": 11700, "status": "active"},
+    {"employee_id": "HC-2024-015", "name": "Arthur Curry", "department": "Marine Operations", "earned_this_period": 34000, "available_ewa": 10200, "status": "active"},
+    {"employee_id": "HC-2024-016", "name": "Oliver Queen", "department": "Finance", "earned_this_period": 44000, "available_ewa": 13200, "status": "active"},
+    {"employee_id": "HC-2024-017", "name": "Selina Kyle", "department": "Asset Recovery", "earned_this_period": 31000, "available_ewa": 9300, "status": "active"},
+    {"employee_id": "HC-2024-018", "name": "Matt Murdock", "department": "Legal", "earned_this_period": 37000, "available_ewa": 11100, "status": "active"},
+    {"employee_id": "HC-2024-019", "name": "Jessica Jones", "department": "Investigations", "earned_this_period": 29000, "available_ewa": 8700, "status": "active"},
+    {"employee_id": "HC-2024-020", "name": "Luke Cage", "department": "Security", "earned_this_period": 32000, "available_ewa": 9600, "status": "active"},
+    {"employee_id": "HC-2024-021", "name": "Danny Rand", "department": "Finance", "earned_this_period": 41000, "available_ewa": 12300, "status": "active"},
+    {"employee_id": "HC-2024-022", "name": "Wade Wilson", "department": "Marketing", "earned_this_period": 26000, "available_ewa": 7800, "status": "active"},
+    {"employee_id": "HC-2024-023", "name": "Ororo Munroe", "department": "Environmental", "earned_this_period": 36000, "available_ewa": 10800, "status": "active"},
+    {"employee_id": "HC-2024-024", "name": "Jean Grey", "department": "Research", "earned_this_period": 38000, "available_ewa": 11400, "status": "active"},
+    {"employee_id": "HC-2024-025", "name": "Logan Howlett", "department": "Training", "earned_this_period": 33000, "available_ewa": 9900, "status": "active"},
+    {"employee_id": "HC-2024-026", "name": "Raven Darkholme", "department": "Strategic Planning", "earned_this_period": 40000, "available_ewa": 12000, "status": "active"},
+    {"employee_id": "HC-2024-027", "name": "Hank McCoy", "department": "Research", "earned_this_period": 43000, "available_ewa": 12900, "status": "active"},
+    {"employee_id": "HC-2024-028", "name": "Kurt Wagner", "department": "Transportation", "earned_this_period": 28000, "available_ewa": 8400, "status": "active"},
+    {"employee_id": "HC-2024-029", "name": "Kitty Pryde", "department": "IT", "earned_this_period": 30000, "available_ewa": 9000, "status": "active"},
+    {"employee_id": "HC-2024-030", "name": "Bobby Drake", "department": "Facilities", "earned_this_period": 27000, "available_ewa": 8100, "status": "active"},
+    {"employee_id": "HC-2024-031", "name": "Remy LeBeau", "department": "Sales", "earned_this_period": 35000, "available_ewa": 10500, "status": "active"},
+    {"employee_id": "HC-2024-032", "name": "Anna Marie", "department": "Customer Service", "earned_this_period": 29000, "available_ewa": 8700, "status": "active"},
+    {"employee_id": "HC-2024-033", "name": "Victor Stone", "department": "IT", "earned_this_period": 38000, "available_ewa": 11400, "status": "active"},
+    {"employee_id": "HC-2024-034", "name": "Kara Zor-El", "department": "Media Relations", "earned_this_period": 31000, "available_ewa": 9300, "status": "active"},
+    {"employee_id": "HC-2024-035", "name": "Barbara Gordon", "department": "IT Security", "earned_this_period": 39000, "available_ewa": 11700, "status": "active"},
+    {"employee_id": "HC-2024-036", "name": "Dick Grayson", "department": "Operations", "earned_this_period": 34000, "available_ewa": 10200, "status": "active"},
+    {"employee_id": "HC-2024-037", "name": "Jason Todd", "department": "Asset Recovery", "earned_this_period": 30000, "available_ewa": 9000, "status": "active"},
+    {"employee_id": "HC-2024-038", "name": "Tim Drake", "department": "Analytics", "earned_this_period": 32000, "available_ewa": 9600, "status": "active"},
+    {"employee_id": "HC-2024-039", "name": "Damian Wayne", "department": "Executive", "earned_this_period": 28000, "available_ewa": 8400, "status": "active"},
+    {"employee_id": "HC-2024-040", "name": "Cassandra Cain", "department": "Training", "earned_this_period": 29000, "available_ewa": 8700, "status": "active"},
+    {"employee_id": "HC-2024-041", "name": "Bucky Barnes", "department": "Security", "earned_this_period": 33000, "available_ewa": 9900, "status": "active"},
+    {"employee_id": "HC-2024-042", "name": "Sam Wilson", "department": "Operations", "earned_this_period": 31000, "available_ewa": 9300, "status": "active"},
+    {"employee_id": "HC-2024-043", "name": "Monica Rambeau", "department": "Energy Management", "earned_this_period": 37000, "available_ewa": 11100, "status": "active"},
+    {"employee_id": "HC-2024-044", "name": "Kate Bishop", "department": "Marketing", "earned_this_period": 28000, "available_ewa": 8400, "status": "active"},
+    {"employee_id": "HC-2024-045", "name": "Clint Barton", "department": "Security", "earned_this_period": 32000, "available_ewa": 9600, "status": "active"},
+    {"employee_id": "HC-2024-046", "name": "Hope van Dyne", "department": "Engineering", "earned_this_period": 40000, "available_ewa": 12000, "status": "active"},
+    {"employee_id": "HC-2024-047", "name": "Shuri", "department": "Research", "earned_this_period": 45000, "available_ewa": 13500, "status": "active"},
+    {"employee_id": "HC-2024-048", "name": "Nakia", "department": "International Relations", "earned_this_period": 36000, "available_ewa": 10800, "status": "active"},
+    {"employee_id": "HC-2024-049", "name": "Okoye", "department": "Security", "earned_this_period": 35000, "available_ewa": 10500, "status": "active"},
+    {"employee_id": "HC-2024-050", "name": "M'Baku", "department": "Operations", "earned_this_period": 34000, "available_ewa": 10200, "status": "active"},
+]
+
+# Demo profile for the mobile employee view
+DEMO_PROFILE = {
+    "name": "Juan Dela Cruz",
+    "employee_id": "HC-2024-001",
+    "earned_this_period": 8450.00,
+    "available_for_withdrawal": 2500.00,
+    "currency": "PHP",
+    "pay_period": "Dec 1 - Dec 15, 2024",
+    "next_payday": "Dec 16, 2024"
+}
+
+_EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+
+def _scalar(value: Any) -> Any:
+    """Convert a NumPy scalar to the matching Python type."""
+    return value.item() if hasattr(value, "item") else value
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor is malformed or does not match the query."""
+
+
+class StaleSnapshotError(RuntimeError):
+    """Raised when the snapshot a load was diffed against was replaced meanwhile."""
+
+
+def encode_cursor(sort_by: str, descending: bool, key: Any, employee_id: str) -> str:
+    """Encode the position after ``(key, employee_id)`` as an opaque cursor."""
+    raw = json.dumps([sort_by, descending, key, employee_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool) -> Tuple[Any, str]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was issued for a
+            different sort
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_desc, key, employee_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Malformed cursor")
+    if cursor_sort != sort_by or cursor_desc != descending:
+        raise InvalidCursorError("Cursor was issued for a different sort order")
+    return key, str(employee_id)
+
+
+def _typed(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce an employee frame to the store's column types.
+
+    Rows without an employee_id are dropped, and of rows sharing one only
+    the last is kept, so every row is reachable through ``id_index``.
+    """
+    ids = frame["employee_id"]
+    present = ids.notna() & (ids.astype(str).str.strip() != "")
+    if not present.all():
+        frame = frame[present]
+    frame = frame.reset_index(drop=True)
+    frame["employee_id"] = frame["employee_id"].astype(str)
+    duplicated = frame["employee_id"].duplicated(keep="last")
+    if duplicated.any():
+        frame = frame[~duplicated].reset_index(drop=True)
+    frame["name"] = frame["name"].astype(str)
+    frame["department"] = frame["department"].fillna(DEFAULT_DEPARTMENT).astype("category")
+    frame["status"] = frame["status"].fillna(DEFAULT_STATUS).astype("category")
+    if "withdrawn" not in frame.columns:
+        frame["withdrawn"] = 0.0
+    for column in ("earned_this_period", "available_ewa", "salary", "withdrawn"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+    frame["withdrawn"] = frame["withdrawn"].fillna(0.0)
+    frame["hire_date"] = pd.to_datetime(frame["hire_date"], errors="coerce")
+    return frame
+
+
+def payroll_to_employees(chunk: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Map a normalized payroll CSV chunk onto the employee schema.
+
+    Follows the ``sample-payroll.csv`` layout (employee_id, first_name,
+    last_name, department, salary, hire_date); a single ``name`` column is
+    also accepted. Earnings are left empty for the EWA engine to fill in
+    from the monthly salary when the frame is loaded.
+
+    Returns:
+        Employee frame, or None if the chunk has no ``employee_id`` column
+    """
+    if "employee_id" not in chunk.columns:
+        return None
+
+    if "name" in chunk.columns:
+        name = chunk["name"].fillna("")
+    elif "first_name" in chunk.columns or "last_name" in chunk.columns:
+        first = chunk.get("first_name", pd.Series("", index=chunk.index)).fillna("")
+        last = chunk.get("last_name", pd.Series("", index=chunk.index)).fillna("")
+        name = (first.astype(str) + " " + last.astype(str)).str.strip()
+    else:
+        name = chunk["employee_id"]
+
+    salary = pd.to_numeric(chunk.get("salary", pd.Series(np.nan, index=chunk.index)), errors="coerce")
+
+    return pd.DataFrame({
+        "employee_id": chunk["employee_id"],
+        "name": name,
+        "department": chunk.get("department", DEFAULT_DEPARTMENT),
+        "earned_this_period": 0.0,
+        "available_ewa": 0.0,
+        "status": chunk.get("status", DEFAULT_STATUS),
+        "salary": salary,
+        "hire_date": pd.to_datetime(
+            chunk.get("hire_date", pd.Series(pd.NaT, index=chunk.index)),
+            errors="coerce",
+            format="ISO8601"
+        )
+    })
+
+
+class EmployeeSnapshot:
+    """
+    Immutable, indexed view of one employee dataset.
+
+    Sorted indexes and filter masks are built on first use and cached for
+    the snapshot's lifetime.
+
+    Attributes:
+        frame: Typed columnar data, one row per employee
+        ids: employee_id column as a fixed-width string array
+        id_index: employee_id -> row position
+        department_index: department -> sorted row positions
+    """
+
+    def __init__(
+        self,
+        frame: pd.DataFrame,
+        as_of: Optional[date] = None,
+        compute: bool = True,
+        typed: bool = False,
+        ids: Optional[np.ndarray] = None
+    ):
+        # A typed frame (e.g. mapped from a snapshot file) is used as is
+        self.frame = frame if typed else _typed(frame)
+        self.ids = ids if ids is not None else self.frame["employee_id"].to_numpy(dtype=str)
+        self.id_index: Dict[str, int] = dict(zip(self.ids.tolist(), range(len(self.ids))))
+        self.department_index: Dict[str, np.ndarray] = {
+            str(name): positions.astype(np.int64)
+            for name, positions in self.frame.groupby("department", observed=True).indices.items()
+        }
+        self._orders: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._masks: Dict[Tuple[Optional[str], Optional[str]], np.ndarray] = {}
+        self._counts: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self._totals: Optional[Dict[str, Any]] = None
+        self.as_of = as_of or accrual_date()
+        self.period: PayPeriod = get_pay_calendar().period_for(self.as_of)
+        # Row fingerprints of the upload this snapshot came from (see diff.py)
+        self.fingerprints: Optional[pd.Series] = None
+        # Withdrawals applied so far; a replacing load checks it did not miss any
+        self.withdrawals = 0
+        if compute:
+            self.recompute_ewa(self.as_of)
+
+    @classmethod
+    def restore(cls, saved: Snapshot) -> "EmployeeSnapshot":
+        """
+        Serve a snapshot opened from disk (see snapshot.py).
+
+        The mapped columns are used without coercion; EWA is recomputed
+        only when the snapshot was saved for another accrual date.
+        """
+        snapshot = cls(saved.frame, saved.as_of, compute=False, typed=True, ids=saved.ids)
+        if saved.as_of != accrual_date():
+            snapshot.recompute_ewa()
+        snapshot.fingerprints = saved.fingerprints
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _records(self, rows: pd.DataFrame, as_json: bool = False) -> Union[List[Dict[str, Any]], RawJSON]:
+        if as_json:
+            return frame_records(rows[PUBLIC_COLUMNS])
+        with span("to_dict"):
+            return rows[PUBLIC_COLUMNS].to_dict(orient="records")
+
+    def get(self, employee_id: str) -> Optional[Dict[str, Any]]:
+        """Look up one employee by ID in O(1)."""
+        position = self.id_index.get(employee_id)
+        if position is None:
+            return None
+        return self._records(self.frame.iloc[position:position + 1])[0]
+
+    def departments(self) -> List[str]:
+        """Department names present in the dataset."""
+        return sorted(self.department_index)
+
+    def positions(self, employee_ids: Iterable[str]) -> np.ndarray:
+        """Row positions of the given IDs; unknown IDs are skipped."""
+        found = [self.id_index[i] for i in employee_ids if i in self.id_index]
+        return np.asarray(found, dtype=np.int64)
+
+    def recompute_ewa(
+        self,
+        as_of: Optional[date] = None,
+        positions: Optional[np.ndarray] = None
+    ) -> int:
+        """
+        Recompute earned and withdrawable wages with the EWA engine.
+
+        Only rows with a salary are computed; demo rows without one keep
+        their literal figures. Cached sort indexes on the two columns are
+        dropped so the next sorted query rebuilds them. Moving into another
+        pay period clears every withdrawn amount and recomputes all rows;
+        the withdrawal ledger then reloads the new period's withdrawals.
+
+        Args:
+            as_of: Accrual date (default: today, or PAYFLOW_AS_OF)
+            positions: Rows to recompute (default: all)
+
+        Returns:
+            Number of employees recomputed
+        """
+        as_of = as_of or accrual_date()
+        calendar = get_pay_calendar()
+        period = calendar.period_for(as_of)
+        if period.start != self.period.start:
+            self._reset_withdrawn()
+            positions = None
+        self.as_of = as_of
+        self.period = period
+
+        salary = self.frame["salary"].to_numpy()
+        if positions is None:
+            positions = np.flatnonzero(~np.isnan(salary))
+        else:
+            positions = positions[~np.isnan(salary[positions])]
+        if len(positions) == 0:
+            return 0
+
+        earned, available = compute_ewa(
+            salary[positions],
+            self.frame["hire_date"].to_numpy()[positions],
+            self.frame["withdrawn"].to_numpy()[positions],
+            as_of,
+            calendar
+        )
+        if len(positions) == len(self.frame):
+            self.frame["earned_this_period"] = earned
+            self.frame["available_ewa"] = available
+        else:
+            columns = self.frame.columns
+            self.frame.iloc[positions, columns.get_loc("earned_this_period")] = earned
+            self.frame.iloc[positions, columns.get_loc("available_ewa")] = available
+        self._orders.pop("earned_this_period", None)
+        self._orders.pop("available_ewa", None)
+        self._totals = None
+        return len(positions)
+
+    def _reset_withdrawn(self) -> None:
+        """Start a new pay period with nothing withdrawn."""
+        columns = self.frame.columns
+        withdrawn = self.frame["withdrawn"].to_numpy()
+        # Demo rows have no salary to recompute from; give back their literal balance
+        literal = np.flatnonzero(np.isnan(self.frame["salary"].to_numpy()) & (withdrawn > 0))
+        self.frame.iloc[literal, columns.get_loc("available_ewa")] = (
+            self.frame["available_ewa"].to_numpy()[literal] + withdrawn[literal]
+        )
+        self.frame["withdrawn"] = 0.0
+        self._orders.pop("available_ewa", None)
+        self._totals = None
+
+    def inherit(self, previous: "EmployeeSnapshot", diff: PayrollDiff) -> int:
+        """
+        Take over EWA state from the snapshot this one replaces.
+
+        Withdrawals carry over for every employee still present, within
+        the same pay period. Earned and available figures carry over for
+        employees whose rows did not change, when both snapshots accrue to
+        the same date; everyone else is recomputed.
+
+        Args:
+            previous: The snapshot being replaced
+            diff: Incremental diff from ``previous`` to this snapshot
+
+        Returns:
+            Number of employees recomputed
+        """
+        if len(diff.source) == len(self.ids) and len(previous.fingerprints) == len(previous.ids):
+            # No duplicate IDs on either side: fingerprint rows are frame rows
+            source, unchanged = diff.source, diff.same
+        else:
+            lookup = pd.Series(np.arange(len(previous.ids)), index=previous.ids)
+            lookup = lookup[~lookup.index.duplicated(keep="last")]
+            source = lookup.reindex(self.ids).fillna(-1).to_numpy(dtype=np.int64)
+            unchanged = (source >= 0) & ~np.isin(self.ids, diff.delta_ids)
+
+        if previous.period.start != self.period.start:
+            # Last period's withdrawals don't count against this one
+            return self.recompute_ewa(self.as_of)
+        kept = np.flatnonzero(source >= 0)
+        columns = self.frame.columns
+        self.frame.iloc[kept, columns.get_loc("withdrawn")] = (
+            previous.frame["withdrawn"].to_numpy()[source[kept]]
+        )
+        if previous.as_of != self.as_of:
+            return self.recompute_ewa(self.as_of)
+
+        reused = np.flatnonzero(unchanged)
+        for column in ("earned_this_period", "available_ewa"):
+            self.frame.iloc[reused, columns.get_loc(column)] = (
+                previous.frame[column].to_numpy()[source[reused]]
+            )
+        return self.recompute_ewa(self.as_of, np.flatnonzero(~unchanged))
+
+    def carry_withdrawn(self, previous: "EmployeeSnapshot") -> int:
+        """
+        Copy withdrawn amounts from ``previous`` again, for withdrawals
+        applied to it after ``inherit`` took them over. Only employees whose
+        amount differs are recomputed.
+
+        Returns:
+            Number of employees updated
+        """
+        lookup = pd.Series(np.arange(len(previous.ids)), index=previous.ids)
+        lookup = lookup[~lookup.index.duplicated(keep="last")]
+        source = lookup.reindex(self.ids).fillna(-1).to_numpy(dtype=np.int64)
+        kept = np.flatnonzero(source >= 0)
+        amounts = previous.frame["withdrawn"].to_numpy()[source[kept]]
+        changed = amounts != self.frame["withdrawn"].to_numpy()[kept]
+        positions, amounts = kept[changed], amounts[changed]
+        if not len(positions):
+            return 0
+        columns = self.frame.columns
+        # Demo rows have no salary to recompute from; adjust their literal figures
+        delta = amounts - self.frame["withdrawn"].to_numpy()[positions]
+        literal = np.isnan(self.frame["salary"].to_numpy()[positions])
+        self.frame.iloc[positions[literal], columns.get_loc("available_ewa")] = np.maximum(
+            self.frame["available_ewa"].to_numpy()[positions[literal]] - delta[literal], 0.0
+        )
+        self.frame.iloc[positions, columns.get_loc("withdrawn")] = amounts
+        return self.recompute_ewa(self.as_of, positions)
+
+    def sorted_index(self, sort_by: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ascending sort index on ``(sort_by, employee_id)``.
+
+        Returns:
+            (row positions in order, sort keys in order, employee IDs in order)
+        """
+        if sort_by not in self._orders:
+            if sort_by == "employee_id":
+                order = np.argsort(self.ids, kind="stable")
+                keys = self.ids[order]
+            else:
+                values = self.frame[sort_by].to_numpy()
+                order = np.lexsort((self.ids, values))
+                keys = values[order]
+            self._orders[sort_by] = (order, keys, self.ids[order])
+        return self._orders[sort_by]
+
+    def _mask(self, department: Optional[str], status: Optional[str]) -> Optional[np.ndarray]:
+        """Boolean row mask for the filters, or None when unfiltered."""
+        if department is None and status is None:
+            return None
+        key = (department, status)
+        if key in self._masks:
+            return self._masks[key]
+
+        mask = np.ones(len(self.frame), dtype=bool)
+        for column, value in (("department", department), ("status", status)):
+            if value is None:
+                continue
+            categories = self.frame[column].cat.categories
+            if value not in categories:
+                # Unknown values are not cached, so arbitrary input can't grow the cache
+                return np.zeros(len(self.frame), dtype=bool)
+            mask &= self.frame[column].cat.codes.to_numpy() == categories.get_loc(value)
+
+        if len(self._masks) < FILTER_CACHE_SIZE:
+            self._masks[key] = mask
+        return mask
+
+    def count(self, department: Optional[str] = None, status: Optional[str] = None) -> int:
+        """Number of employees matching the filters (cached)."""
+        key = (department, status)
+        if key in self._counts:
+            return self._counts[key]
+
+        mask = self._mask(department, status)
+        total = len(self.frame) if mask is None else int(mask.sum())
+        if mask is None or key in self._masks:
+            self._counts[key] = total
+        return total
+
+    def balance(self, employee_id: str) -> Optional[Dict[str, Any]]:
+        """An employee's withdrawn and available amounts and department."""
+        position = self.id_index.get(employee_id)
+        if position is None:
+            return None
+        frame = self.frame
+        return {
+            "withdrawn": float(frame["withdrawn"].iat[position]),
+            "available": float(frame["available_ewa"].iat[position]),
+            "department": str(frame["department"].iat[position])
+        }
+
+    def apply_withdrawal(self, employee_id: str, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        Move ``amount`` of one employee's available balance to withdrawn.
+
+        The caller (the withdrawal ledger) has already checked the balance.
+
+        Returns:
+            The balance after the withdrawal, or None for an unknown employee
+        """
+        position = self.id_index.get(employee_id)
+        if position is None:
+            return None
+        columns = self.frame.columns
+        withdrawn = self.frame["withdrawn"].iat[position] + amount
+        available = max(self.frame["available_ewa"].iat[position] - amount, 0.0)
+        self.frame.iat[position, columns.get_loc("withdrawn")] = round(withdrawn, 2)
+        self.frame.iat[position, columns.get_loc("available_ewa")] = round(available, 2)
+        self._orders.pop("available_ewa", None)
+        self._totals = None
+        self.withdrawals += 1
+        return self.balance(employee_id)
+
+    def totals(self) -> Dict[str, Any]:
+        """
+        Payroll-wide figures for employer insights (cached until the next
+        EWA recompute).
+
+        Returns:
+            Dictionary with employees, payroll, earned, available and
+            withdrawn totals, and headcount per department
+        """
+        if self._totals is None:
+            frame = self.frame
+            self._totals = {
+                "employees": len(frame),
+                "payroll": round(float(frame["salary"].sum()), 2),
+                "earned": round(float(frame["earned_this_period"].sum()), 2),
+                "available": round(float(frame["available_ewa"].sum()), 2),
+                "withdrawn": round(float(frame["withdrawn"].sum()), 2),
+                "departments": {
+                    name: len(positions) for name, positions in sorted(self.department_index.items())
+                }
+            }
+        return self._totals
+
+    def _seek(self, sort_by: str, descending: bool, key: Any, employee_id: str) -> int:
+        """Index in the (possibly reversed) sort sequence just past a cursor row."""
+        _, keys, ids = self.sorted_index(sort_by)
+        lo = int(np.searchsorted(keys, key, side="left"))
+        hi = int(np.searchsorted(keys, key, side="right"))
+        side = "left" if descending else "right"
+        boundary = lo + int(np.searchsorted(ids[lo:hi], employee_id, side=side))
+        return len(keys) - boundary if descending else boundary
+
+    def query(
+        self,
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        sort_by: str = "employee_id",
+        descending: bool = False,
+        department: Optional[str] = None,
+        status: Optional[str] = None,
+        as_json: bool = False
+    ) -> Tuple[Union[List[Dict[str, Any]], RawJSON], Optional[str]]:
+        """
+        Get one page of employees.
+
+        With a ``cursor`` the page starts right after the cursor row
+        (keyset pagination, ``offset`` is ignored). Without one, ``offset``
+        rows of the filtered, sorted sequence are skipped.
+
+        Args:
+            limit: Page size
+            offset: Rows to skip when no cursor is given
+            cursor: Cursor from a previous page's ``next_cursor``
+            sort_by: One of ``SORT_KEYS``
+            descending: Sort direction
+            department: Only employees in this department
+            status: Only employees with this status
+            as_json: Return the records already encoded as a JSON array
+
+        Returns:
+            (employee records, cursor for the next page or None at the end)
+
+        Raises:
+            InvalidCursorError: If ``cursor`` is malformed or for another sort
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+
+        order = self.sorted_index(sort_by)[0]
+        sequence = order[::-1] if descending else order
+        mask = self._mask(department, status)
+
+        if cursor is not None:
+            key, employee_id = decode_cursor(cursor, sort_by, descending)
+            expected = str if sort_by == "employee_id" else (int, float)
+            if not isinstance(key, expected) or isinstance(key, bool):
+                raise InvalidCursorError("Malformed cursor")
+            start = self._seek(sort_by, descending, key, employee_id)
+        elif mask is None:
+            start = offset
+        else:
+            # Offset paging over a filter has to count the skipped matches
+            sequence = sequence[mask[sequence]]
+            mask = None
+            start = offset
+
+        if mask is None:
+            positions = sequence[start:start + limit + 1]
+        else:
+            # Scan forward in growing windows until the page is full
+            found: List[np.ndarray] = []
+            matched = 0
+            step = max(4 * (limit + 1), 1024)
+            while matched <= limit and start < len(sequence):
+                window = sequence[start:start + step]
+                window = window[mask[window]]
+                found.append(window)
+                matched += len(window)
+                start += step
+                step *= 2
+            positions = np.concatenate(found) if found else _EMPTY_POSITIONS
+
+        has_more = len(positions) > limit
+        positions = positions[:limit]
+        next_cursor = None
+        if has_more and len(positions):
+            last = positions[-1]
+            key = self.ids[last] if sort_by == "employee_id" else self.frame[sort_by].iat[last]
+            next_cursor = encode_cursor(sort_by, descending, _scalar(key), str(self.ids[last]))
+        return self._records(self.frame.iloc[positions], as_json), next_cursor
+
+    def rows(self, department: Optional[str] = None, status: Optional[str] = None) -> pd.DataFrame:
+        """Public columns of every employee matching the filters, for bulk export."""
+        mask = self._mask(department, status)
+        rows = self.frame[PUBLIC_COLUMNS]
+        return rows if mask is None else rows[mask]
+
+
+class EmployeeStore:
+    """
+    Holds the current employee snapshot and swaps in new data.
+
+    Attributes:
+        upload_lock: Held by a payroll upload from diffing through
+            validation, so one upload per tenant replaces the data at a time
+    """
+
+    def __init__(
+        self,
+        frame: Optional[pd.DataFrame] = None,
+        snapshot: Optional[EmployeeSnapshot] = None
+    ):
+        self._snapshot = snapshot if snapshot is not None else EmployeeSnapshot(frame)
+        self.upload_lock = asyncio.Lock()
+        # Orders snapshot swaps against withdrawals applied to the current one
+        self._swap = threading.Lock()
+
+    @property
+    def snapshot(self) -> EmployeeSnapshot:
+        """Current snapshot; hold on to it for the duration of a request."""
+        return self._snapshot
+
+    def load(
+        self,
+        frame: pd.DataFrame,
+        as_of: Optional[date] = None,
+        diff: Optional[PayrollDiff] = None
+    ) -> EmployeeSnapshot:
+        """
+        Replace the dataset with an employee-schema frame.
+
+        With an incremental ``diff`` against the current snapshot, only the
+        added and changed employees are run through the EWA engine, and an
+        identical re-upload keeps the current snapshot. Withdrawals applied
+        while the new snapshot is built are carried over before the swap.
+
+        Raises:
+            StaleSnapshotError: If the snapshot ``diff`` was taken against
+                was replaced while this one was built
+        """
+        previous = self._snapshot
+        withdrawals = previous.withdrawals
+        if diff is not None and diff.incremental and diff.unmodified and (as_of or accrual_date()) == previous.as_of:
+            # Identical re-upload: keep serving the current snapshot
+            previous.fingerprints = diff.fingerprints
+            return previous
+        if diff is not None and diff.incremental:
+            snapshot = EmployeeSnapshot(frame, as_of, compute=False)
+            snapshot.inherit(previous, diff)
+        else:
+            snapshot = EmployeeSnapshot(frame, as_of)
+        if diff is not None:
+            snapshot.fingerprints = diff.fingerprints
+        with self._swap:
+            if self._snapshot is not previous:
+                raise StaleSnapshotError("The payroll was replaced while this upload was loading")
+            if (
+                diff is not None and diff.incremental and previous.withdrawals != withdrawals
+                and previous.period.start == snapshot.period.start
+            ):
+                snapshot.carry_withdrawn(previous)
+            self._snapshot = snapshot
+        return snapshot
+
+    def apply_withdrawal(self, employee_id: str, amount: float) -> Optional[Dict[str, Any]]:
+        """
+        Apply a recorded withdrawal to the current snapshot (see
+        ``EmployeeSnapshot.apply_withdrawal``), never to one being replaced.
+        """
+        with self._swap:
+            return self._snapshot.apply_withdrawal(employee_id, amount)
+
+    def apply_withdrawn(self, withdrawn: Dict[str, float], as_of: Optional[date] = None) -> int:
+        """
+        Set the amount withdrawn this period for the given employees (from
+        the withdrawal ledger) and recompute their EWA figures.
+
+        Returns:
+            Number of employees found in the current snapshot
+        """
+        snapshot = self._snapshot
+        if as_of is not None and get_pay_calendar().period_for(as_of).start != snapshot.period.start:
+            # Enter the period first, so its reset doesn't wipe the amounts set below
+            snapshot.recompute_ewa(as_of)
+        found = [(snapshot.id_index[i], amount) for i, amount in withdrawn.items() if i in snapshot.id_index]
+        if not found:
+            return 0
+        positions = np.array([position for position, _ in found], dtype=np.int64)
+        amounts = np.array([amount for _, amount in found])
+        frame = snapshot.frame
+        columns = frame.columns
+        # Demo rows have no salary to recompute from; adjust their literal figures
+        delta = amounts - frame["withdrawn"].to_numpy()[positions]
+        literal = np.isnan(frame["salary"].to_numpy()[positions])
+        frame.iloc[positions[literal], columns.get_loc("available_ewa")] = np.maximum(
+            frame["available_ewa"].to_numpy()[positions[literal]] - delta[literal], 0.0
+        )
+        frame.iloc[positions, columns.get_loc("withdrawn")] = amounts
+        snapshot.recompute_ewa(as_of or snapshot.as_of, positions)
+        return len(found)
+
+    def recompute_ewa(
+        self,
+        as_of: Optional[date] = None,
+        employee_ids: Optional[Iterable[str]] = None
+    ) -> int:
+        """
+        Recompute EWA figures for everyone, or only for ``employee_ids``.
+
+        Returns:
+            Number of employees recomputed
+        """
+        snapshot = self._snapshot
+        positions = None if employee_ids is None else snapshot.positions(employee_ids)
+        return snapshot.recompute_ewa(as_of, positions)
+
+
+def _seed_frame() -> pd.DataFrame:
+    frame = pd.DataFrame(SEED_EMPLOYEES)
+    frame["salary"] = np.nan
+    frame["hire_date"] = pd.NaT
+    return frame
+
+
+def _create_employee_store(tenant: str) -> EmployeeStore:
+    # Serve the tenant's last uploaded payroll if a snapshot of it exists
+    saved = get_snapshot_store(tenant).open() if SNAPSHOT_ENABLED else None
+    if saved is not None:
+        return EmployeeStore(snapshot=EmployeeSnapshot.restore(saved))
+    return EmployeeStore(_seed_frame())
+
+
+# Instances per tenant
+_employee_stores = TenantScoped(_create_employee_store)
+
+def get_employee_store(tenant: Optional[str] = None) -> EmployeeStore:
+    """Get or create the employee store of a tenant (default: the current one)"""
+    return _employee_stores.get(tenant)
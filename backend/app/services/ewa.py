@@ -0,0 +1,128 @@
+"""
+Earned Wage Access Engine for PayFlow
+
+Computes wages accrued to date and the amount each employee may withdraw
+early, for a whole payroll at once. All inputs are column arrays and the
+computation is pure NumPy, so a payday-morning recompute over a million
+employees takes well under a second, and recomputing a handful of changed
+employees costs only as much as those rows.
+
+Accrual model:
+- Pay periods are semi-monthly (1st-15th, 16th-end of month); payday is
+  the day after the period ends.
+- Each period pays half the monthly salary, accrued per business day
+  worked (Mon-Fri, minus configured holidays), starting at the later of
+  the period start and the hire date.
+- Withdrawable = EWA rate x accrued wages - withdrawals this period.
+
+Environment Variables:
+- PAYFLOW_EWA_RATE: Fraction of accrued wages available early (default 0.30)
+- PAYFLOW_HOLIDAYS: Comma-separated YYYY-MM-DD dates excluded from accrual
+- PAYFLOW_AS_OF: Pin the accrual date (YYYY-MM-DD) for demos; defaults to today
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+import calendar as _calendar
+import os
+
+import numpy as np
+
+EWA_RATE = float(os.getenv("PAYFLOW_EWA_RATE", "0.30"))
+PAY_PERIODS_PER_MONTH = 2
+
+
+class PayPeriod:
+    """One semi-monthly pay period."""
+
+    def __init__(self, start: date, end: date):
+        self.start = start
+        self.end = end
+        self.payday = end + timedelta(days=1)
+
+    def label(self) -> str:
+        """Human-readable period, e.g. ``Dec 1 - Dec 15, 2024``."""
+        return (
+            f"{self.start:%b} {self.start.day} - "
+            f"{self.end:%b} {self.end.day}, {self.end.year}"
+        )
+
+    def payday_label(self) -> str:
+        """Human-readable payday, e.g. ``Dec 16, 2024``."""
+        return f"{self.payday:%b} {self.payday.day}, {self.payday.year}"
+
+
+class PayPeriodCalendar:
+    """Semi-monthly pay calendar with business-day accrual."""
+
+    def __init__(self, holidays: Iterable[str] = ()):
+        self.holidays = np.array(sorted(holidays), dtype="datetime64[D]")
+
+    def period_for(self, day: date) -> PayPeriod:
+        """Pay period containing ``day``."""
+        if day.day <= 15:
+            return PayPeriod(day.replace(day=1), day.replace(day=15))
+        last = _calendar.monthrange(day.year, day.month)[1]
+        return PayPeriod(day.replace(day=16), day.replace(day=last))
+
+    def business_days(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Business days in ``[start, end)``, element-wise; negative spans count as 0."""
+        return np.maximum(np.busday_count(start, end, holidays=self.holidays), 0)
+
+
+def compute_ewa(
+    salary: np.ndarray,
+    hire_date: np.ndarray,
+    withdrawn: np.ndarray,
+    as_of: date,
+    calendar: PayPeriodCalendar,
+    rate: float = EWA_RATE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute accrued and withdrawable wages for a batch of employees.
+
+    Args:
+        salary: Monthly salary per employee
+        hire_date: Hire dates as ``datetime64[D]`` (NaT = employed all period)
+        withdrawn: Amount already withdrawn this period per employee
+        as_of: Accrue through the end of this day
+        calendar: Pay calendar
+        rate: Fraction of accrued wages available early
+
+    Returns:
+        (earned_this_period, available_ewa) arrays, rounded to centavos
+    """
+    period = calendar.period_for(as_of)
+    period_start = np.datetime64(period.start, "D")
+    through = np.datetime64(as_of + timedelta(days=1), "D")
+
+    hire_date = hire_date.astype("datetime64[D]")
+    accrual_start = np.where(
+        np.isnat(hire_date), period_start, np.maximum(hire_date, period_start)
+    )
+    worked = calendar.business_days(accrual_start, np.full(len(salary), through))
+    period_days = max(int(calendar.business_days(
+        np.array([period_start]), np.array([np.datetime64(period.payday, "D")])
+    )[0]), 1)
+
+    earned = np.round(salary / PAY_PERIODS_PER_MONTH * np.minimum(worked, period_days) / period_days, 2)
+    available = np.maximum(np.floor(earned * rate * 100) / 100 - withdrawn, 0.0)
+    return earned, np.round(available, 2)
+
+
+# Singleton instance
+_calendar_instance = None
+
+def get_pay_calendar() -> PayPeriodCalendar:
+    """Get or create the pay calendar configured from the environment"""
+    global _calendar_instance
+    if _calendar_instance is None:
+        holidays = [d.strip() for d in os.getenv("PAYFLOW_HOLIDAYS", "").split(",") if d.strip()]
+        _calendar_instance = PayPeriodCalendar(holidays)
+    return _calendar_instance
+
+
+def accrual_date(override: Optional[str] = None) -> date:
+    """Current accrual date; ``PAYFLOW_AS_OF`` pins it for demos."""
+    value = override or os.getenv("PAYFLOW_AS_OF")
+    return date.fromisoformat(value) if value else date.today()
@@ -0,0 +1,163 @@
+"""
+Job Executor for PayFlow
+
+CPU-bound work such as CSV parsing and validation is submitted here
+instead of running on the uvicorn event loop. The pool kind is chosen by
+configuration, and the number of in-flight jobs is capped so a burst of
+large uploads is rejected with a retryable error instead of queueing
+without bound. Each tenant may also be capped to fewer in-flight jobs
+(``PAYFLOW_TENANT_MAX_JOBS``, see ``tenants.py``), so one employer's
+migration cannot take every slot.
+
+Environment Variables:
+- PAYFLOW_EXECUTOR: "thread" (default), "process", or "inline" (runs on
+  the event loop; only useful as a benchmark baseline)
+- PAYFLOW_EXECUTOR_WORKERS: Pool size (default: CPU count)
+- PAYFLOW_MAX_INFLIGHT_JOBS: Jobs admitted at once (default: 2 x workers)
+- PAYFLOW_EXECUTOR_RETRY_AFTER: Seconds clients should wait when busy (default 2)
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+import asyncio
+import functools
+import multiprocessing
+import os
+
+from app.services.tenants import TENANT_MAX_JOBS, current_tenant
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the in-flight job limit has been reached."""
+
+    def __init__(self, retry_after: int, message: str = "Too many jobs in flight"):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TenantBusyError(ExecutorBusyError):
+    """Raised when the current tenant has its maximum of jobs in flight."""
+
+    def __init__(self, tenant: str, retry_after: int):
+        super().__init__(retry_after, f"Too many jobs in flight for tenant {tenant}")
+        self.tenant = tenant
+
+
+class JobExecutor:
+    """
+    Bounded executor for CPU-bound jobs.
+
+    Admission is checked on the event loop thread, so the in-flight
+    counter needs no lock.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: Optional[int] = None,
+        max_inflight: Optional[int] = None,
+        retry_after: int = 2,
+        max_per_tenant: int = 0
+    ):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or 2 * self.workers
+        self.retry_after = retry_after
+        self.max_per_tenant = max_per_tenant
+        self._pool: Optional[Executor] = None
+        self._inflight = 0
+        self._by_tenant: Dict[str, int] = {}
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_pool(self) -> Executor:
+        # Created lazily so importing the app never forks or spawns
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="payflow-job"
+                )
+        return self._pool
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run ``fn(*args, **kwargs)`` in the pool and await its result.
+
+        In process mode ``fn`` and its arguments must be picklable.
+
+        Raises:
+            TenantBusyError: If the current tenant already has
+                ``max_per_tenant`` jobs running
+            ExecutorBusyError: If ``max_inflight`` jobs are already running
+        """
+        tenant = current_tenant()
+        if self.max_per_tenant and self._by_tenant.get(tenant, 0) >= self.max_per_tenant:
+            self._rejected += 1
+            raise TenantBusyError(tenant, self.retry_after)
+        if self._inflight >= self.max_inflight:
+            self._rejected += 1
+            raise ExecutorBusyError(self.retry_after)
+
+        self._inflight += 1
+        self._by_tenant[tenant] = self._by_tenant.get(tenant, 0) + 1
+        try:
+            if self.kind == "inline":
+                return fn(*args, **kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_pool(), functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._inflight -= 1
+            self._by_tenant[tenant] -= 1
+            if not self._by_tenant[tenant]:
+                del self._by_tenant[tenant]
+            self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and lifetime counters."""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_inflight": self.max_inflight,
+            "inflight": self._inflight,
+            "max_per_tenant": self.max_per_tenant,
+            "inflight_by_tenant": dict(self._by_tenant),
+            "completed": self._completed,
+            "rejected": self._rejected
+        }
+
+    def shutdown(self) -> None:
+        """Stop the pool, waiting for running jobs."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+# Singleton instance
+_executor = None
+
+def get_executor() -> JobExecutor:
+    """Get or create the job executor configured from the environment"""
+    global _executor
+    if _executor is None:
+        max_inflight = os.getenv("PAYFLOW_MAX_INFLIGHT_JOBS")
+        workers = os.getenv("PAYFLOW_EXECUTOR_WORKERS")
+        _executor = JobExecutor(
+            kind=os.getenv("PAYFLOW_EXECUTOR", "thread"),
+            workers=int(workers) if workers else None,
+            max_inflight=int(max_inflight) if max_inflight else None,
+            retry_after=int(os.getenv("PAYFLOW_EXECUTOR_RETRY_AFTER", "2")),
+            max_per_tenant=TENANT_MAX_JOBS
+        )
+    return _executor
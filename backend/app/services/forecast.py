@@ -0,0 +1,339 @@
+"""
+Liquidity Forecasting for PayFlow
+
+Treasury pre-funds EWA payouts, so it needs next week's withdrawal
+demand rather than last week's. Each series (one per employer and
+department) gets a multiplicative seasonal baseline fitted on its daily
+withdrawal amounts:
+
+    amount(day) = level x weekday factor x payday factor
+
+The payday factor depends on the days left until the next payday, since
+withdrawals pile up just before it. The liquidity figure adds a safety
+margin of ``FORECAST_Z`` residual standard deviations to the expected
+demand.
+
+All series are fitted at once as matrix operations, one row per series,
+so a fit costs a few array passes rather than one model per series. Large
+inputs are split into shards by series and fitted on a process pool.
+Forecasts are cached per tenant and accrual date for
+``PAYFLOW_FORECAST_TTL`` seconds and served to
+``AIService.payroll_insights``; the process pool is shared by all tenants.
+
+Environment Variables:
+- PAYFLOW_FORECAST_HORIZON_DAYS: Days forecast ahead (default 7)
+- PAYFLOW_FORECAST_TTL: Seconds a forecast is served before refitting (default 900)
+- PAYFLOW_FORECAST_WORKERS: Process pool size for fitting (default: CPU count)
+- PAYFLOW_FORECAST_SHARD_SERIES: Series per shard; smaller inputs are fitted
+  in-process (default 20000)
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from typing import Callable, Dict, Any, Optional
+import asyncio
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from starlette.concurrency import run_in_threadpool
+
+from app.services.ewa import get_pay_calendar
+from app.services.tenants import current_tenant
+
+HORIZON_DAYS = int(os.getenv("PAYFLOW_FORECAST_HORIZON_DAYS", "7"))
+FORECAST_TTL = float(os.getenv("PAYFLOW_FORECAST_TTL", "900"))
+SHARD_SERIES = int(os.getenv("PAYFLOW_FORECAST_SHARD_SERIES", "20000"))
+# One-sided 95% normal quantile for the liquidity margin
+FORECAST_Z = 1.645
+# Upper edges of the days-to-payday buckets: 1, 2, 3, 4-6, 7+
+PAYDAY_BUCKETS = [2, 3, 4, 7]
+SERIES_KEYS = ("employer_id", "department")
+
+
+def _calendar_features(days: pd.DatetimeIndex) -> np.ndarray:
+    """Weekday and days-to-payday bucket of each day, as a (2, days) array."""
+    calendar = get_pay_calendar()
+    to_payday = [(calendar.period_for(d).payday - d).days for d in days.date]
+    return np.vstack([days.weekday.to_numpy(), np.digitize(to_payday, PAYDAY_BUCKETS)])
+
+
+def _factor_means(values: np.ndarray, groups: np.ndarray, size: int) -> np.ndarray:
+    """Per-row mean of ``values`` within each group; 1.0 for groups with no days."""
+    onehot = np.eye(size)[groups]
+    counts = onehot.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (values @ onehot) / counts
+    means[:, counts == 0] = 1.0
+    return means
+
+
+def fit_series(
+    codes: np.ndarray,
+    positions: np.ndarray,
+    amounts: np.ndarray,
+    count: int,
+    past: np.ndarray,
+    ahead: np.ndarray
+) -> np.ndarray:
+    """
+    Fit ``count`` series at once and forecast them.
+
+    Takes plain arrays so shards are cheap to send to a process pool.
+
+    Args:
+        codes: Series number (0..count-1) of each observation
+        positions: Day of each observation within the history
+        amounts: Amount of each observation
+        count: Number of series
+        past, ahead: ``_calendar_features`` of the history and horizon days
+
+    Returns:
+        (count, 3) array of level, forecast and liquidity needed
+    """
+    # Series x day matrix; days without observations count as zero
+    values = np.zeros((count, past.shape[1]))
+    np.add.at(values, (codes, positions), amounts)
+
+    level = values.mean(axis=1, keepdims=True)
+    safe_level = np.where(level > 0, level, 1.0)
+    weekday = _factor_means(values / safe_level, past[0], 7)
+    # Normalize so the factors average to one over a week
+    scale = weekday.mean(axis=1, keepdims=True)
+    weekday /= np.where(scale > 0, scale, 1.0)
+    seasonal = safe_level * weekday[:, past[0]]
+    deseasoned = np.divide(values, seasonal, out=np.zeros_like(values), where=seasonal > 0)
+    payday = _factor_means(deseasoned, past[1], len(PAYDAY_BUCKETS) + 1)
+
+    fitted = level * weekday[:, past[0]] * payday[:, past[1]]
+    sigma = (values - fitted).std(axis=1)
+    forecast = (level * weekday[:, ahead[0]] * payday[:, ahead[1]]).sum(axis=1)
+    liquidity = forecast + FORECAST_Z * sigma * np.sqrt(ahead.shape[1])
+    return np.column_stack([level[:, 0], forecast, liquidity])
+
+
+class _Observations:
+    """``daily`` flattened into series numbers, day positions and amounts."""
+
+    def __init__(self, daily: pd.DataFrame, as_of: date, history_days: int, horizon_days: int):
+        self.keys = [k for k in SERIES_KEYS if k in daily.columns]
+        end = pd.Timestamp(as_of)
+        history = pd.date_range(end - pd.Timedelta(days=history_days - 1), end)
+        future = pd.date_range(end + pd.Timedelta(days=1), periods=horizon_days)
+        self.past, self.ahead = _calendar_features(history), _calendar_features(future)
+
+        # ngroup without sorting numbers series by first appearance
+        self.series = daily[self.keys].drop_duplicates().reset_index(drop=True)
+        codes = daily.groupby(self.keys, sort=False).ngroup().to_numpy()
+        positions = (pd.to_datetime(daily["day"]) - history[0]).dt.days.to_numpy()
+        inside = (positions >= 0) & (positions < history_days)
+        self.codes = codes[inside]
+        self.positions = positions[inside]
+        self.amounts = daily["amount"].to_numpy(dtype="float64")[inside]
+
+    def result(self, fitted: np.ndarray) -> pd.DataFrame:
+        result = self.series.copy()
+        result["level"] = fitted[:, 0]
+        result["forecast"] = fitted[:, 1].round(2)
+        result["liquidity_needed"] = fitted[:, 2].round(2)
+        return result
+
+
+def fit_forecasts(
+    daily: pd.DataFrame,
+    as_of: date,
+    history_days: int,
+    horizon_days: int = HORIZON_DAYS
+) -> pd.DataFrame:
+    """
+    Fit every series in ``daily`` and forecast the days after ``as_of``.
+
+    Args:
+        daily: One row per series and day with the series keys (any of
+            ``SERIES_KEYS``), day and amount
+        as_of: Last day of history
+        history_days: Days of history fitted, ending at ``as_of``
+        horizon_days: Days forecast
+
+    Returns:
+        One row per series: its keys, level, expected withdrawals over the
+        horizon (forecast) and liquidity needed (forecast plus margin)
+    """
+    observations = _Observations(daily, as_of, history_days, horizon_days)
+    return observations.result(fit_series(
+        observations.codes, observations.positions, observations.amounts,
+        len(observations.series), observations.past, observations.ahead
+    ))
+
+
+class Forecast:
+    """
+    Fitted forecasts for every series.
+
+    Attributes:
+        as_of: Last day of history
+        horizon_days: Days forecast
+        series: Output of ``fit_forecasts``
+        fitted_at: Wall-clock time of the fit
+        seconds: Time the fit took
+        shards: Shards the series were split into
+    """
+
+    def __init__(self, as_of: date, horizon_days: int, series: pd.DataFrame, seconds: float, shards: int):
+        self.as_of = as_of
+        self.horizon_days = horizon_days
+        self.series = series
+        self.fitted_at = time.time()
+        self.seconds = seconds
+        self.shards = shards
+        self._summaries: Dict[Optional[str], Dict[str, Any]] = {}
+
+    def summary(self, employer_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Totals over all series, or one employer's (cached).
+
+        Returns:
+            Dictionary with next_week_withdrawals, liquidity_needed and
+            per-department figures
+        """
+        if employer_id not in self._summaries:
+            self._summaries[employer_id] = self._summarize(employer_id)
+        return self._summaries[employer_id]
+
+    def _summarize(self, employer_id: Optional[str]) -> Dict[str, Any]:
+        series = self.series
+        if employer_id is not None and "employer_id" in series.columns:
+            series = series[series["employer_id"] == employer_id]
+        by_department: Dict[str, Dict[str, float]] = {}
+        if "department" in series.columns:
+            grouped = series.groupby("department")[["forecast", "liquidity_needed"]].sum()
+            by_department = {
+                str(name): {
+                    "forecast": round(float(row["forecast"]), 2),
+                    "liquidity_needed": round(float(row["liquidity_needed"]), 2)
+                }
+                for name, row in grouped.iterrows()
+            }
+        return {
+            "as_of": self.as_of.isoformat(),
+            "horizon_days": self.horizon_days,
+            "next_week_withdrawals": round(float(series["forecast"].sum()), 2),
+            "liquidity_needed": round(float(series["liquidity_needed"].sum()), 2),
+            "by_department": by_department
+        }
+
+
+class ForecastEngine:
+    """Fits all series in one batched job and caches the result per tenant."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        shard_series: int = SHARD_SERIES,
+        ttl: float = FORECAST_TTL,
+        horizon_days: int = HORIZON_DAYS
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_series = shard_series
+        self.ttl = ttl
+        self.horizon_days = horizon_days
+        self._pool: Optional[Executor] = None
+        self._cached: Dict[str, Forecast] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._fits = 0
+
+    def _get_pool(self) -> Executor:
+        # Created lazily so importing the app never spawns
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def fit(self, daily: pd.DataFrame, as_of: date, history_days: int) -> Forecast:
+        """
+        Fit every series, sharded across the process pool when large.
+
+        Series are dealt round-robin to shards (series number modulo the
+        shard count), and each shard is sent as plain arrays.
+        """
+        start = time.perf_counter()
+        observations = _Observations(daily, as_of, history_days, self.horizon_days)
+        count = len(observations.series)
+        shards = min(max(-(-count // self.shard_series), 1), self.workers)
+        if shards == 1:
+            fitted = fit_series(
+                observations.codes, observations.positions, observations.amounts,
+                count, observations.past, observations.ahead
+            )
+        else:
+            pool = self._get_pool()
+            futures = []
+            for shard in range(shards):
+                rows = observations.codes % shards == shard
+                futures.append(pool.submit(
+                    fit_series,
+                    observations.codes[rows] // shards, observations.positions[rows], observations.amounts[rows],
+                    len(range(shard, count, shards)), observations.past, observations.ahead
+                ))
+            fitted = np.empty((count, 3))
+            for shard, future in enumerate(futures):
+                fitted[shard::shards] = future.result()
+        self._fits += 1
+        return Forecast(as_of, self.horizon_days, observations.result(fitted), time.perf_counter() - start, shards)
+
+    async def latest(
+        self,
+        source: Callable[[], pd.DataFrame],
+        as_of: date,
+        history_days: int
+    ) -> Forecast:
+        """
+        Cached forecast of the current tenant for ``as_of``, refitted from
+        ``source()`` once the cache is older than the TTL. Concurrent
+        callers share one fit.
+        """
+        tenant = current_tenant()
+        lock = self._locks.get(tenant)
+        if lock is None:
+            lock = self._locks[tenant] = asyncio.Lock()
+        async with lock:
+            cached = self._cached.get(tenant)
+            if cached is None or cached.as_of != as_of or time.time() - cached.fitted_at > self.ttl:
+                daily = await run_in_threadpool(source)
+                cached = self._cached[tenant] = await run_in_threadpool(self.fit, daily, as_of, history_days)
+            return cached
+
+    def stats(self) -> Dict[str, Any]:
+        """Fit counters and the current tenant's cached forecast's age."""
+        cached = self._cached.get(current_tenant())
+        return {
+            "workers": self.workers,
+            "fits": self._fits,
+            "tenants": len(self._cached),
+            "series": len(cached.series) if cached is not None else 0,
+            "shards": cached.shards if cached is not None else 0,
+            "fit_seconds": round(cached.seconds, 3) if cached is not None else None,
+            "age_seconds": round(time.time() - cached.fitted_at, 1) if cached is not None else None
+        }
+
+    def shutdown(self) -> None:
+        """Stop the process pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+# Singleton instance
+_forecast_engine = None
+
+def get_forecast_engine() -> ForecastEngine:
+    """Get or create the forecast engine configured from the environment"""
+    global _forecast_engine
+    if _forecast_engine is None:
+        workers = os.getenv("PAYFLOW_FORECAST_WORKERS")
+        _forecast_engine = ForecastEngine(workers=int(workers) if workers else None)
+    return _forecast_engine
@@ -0,0 +1,458 @@
+"""
+Payroll Import Jobs for PayFlow
+
+Large migrations from the Migration Studio are too slow for a single
+request/response cycle on serverless hosts. An import job accepts the
+upload, returns a job id right away, and parses the CSV in the background
+on the shared job executor, checking each chunk against the payroll
+validation rules. Each job lives in its own directory:
+
+    <data dir>/imports/<job_id>/
+        source.csv        the upload, kept so a failed job can be retried
+        manifest.json     status, progress counters and result summary
+        summary.json      running CSVSummary, so a resumed job keeps its stats
+        chunk-00000.npz   parsed, normalized rows, one NumPy archive per chunk
+
+Progress is kept in the manifest rather than in memory, so it is visible
+from every worker process and survives restarts. Chunks are cut from the
+source at CSV record boundaries, and the manifest records the byte offset
+after the last completed chunk, so a retried job seeks straight there.
+Page fetches read the stored chunks and never re-parse the CSV. Like
+payroll snapshots, chunks hold plain NumPy columns (text as fixed-width
+strings with a mask of missing values) and are loaded with
+``allow_pickle=False``, so a job directory never executes code when read.
+
+Environment Variables:
+- PAYFLOW_IMPORT_CHUNK_BYTES: Bytes of CSV parsed per chunk (default 8 MiB)
+"""
+
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Any, Optional, Tuple, Union
+import asyncio
+import io
+import json
+import os
+import re
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from app.services.ewa import accrual_date
+from app.services.executor import ExecutorBusyError, get_executor
+from app.services.ingest import CSVSummary, normalize_chunk, read_columns
+from app.services.metrics import span
+from app.services.serialization import RawJSON, frame_records
+from app.services.tenants import TenantScoped, tenant_data_dir
+from app.services.validation import (
+    RECOMMENDED_COLUMNS, REQUIRED_COLUMNS, empty_report, merge_report, validate_payroll
+)
+
+MANIFEST_FILE = "manifest.json"
+SOURCE_FILE = "source.csv"
+SUMMARY_FILE = "summary.json"
+ACTIVE_STATUSES = ("queued", "running")
+IMPORT_CHUNK_BYTES = int(os.getenv("PAYFLOW_IMPORT_CHUNK_BYTES", str(8 * 1024 * 1024)))
+HEADER_BYTES = 64 * 1024
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class ImportNotFoundError(LookupError):
+    """Raised when a job id does not exist."""
+
+
+class ImportStateError(Exception):
+    """Raised when an operation does not apply to the job's current status."""
+
+
+def _chunk_file(index: int) -> str:
+    return f"chunk-{index:05d}.npz"
+
+
+def read_manifest(job_dir: str) -> Dict[str, Any]:
+    """Load a job manifest from disk."""
+    with open(os.path.join(job_dir, MANIFEST_FILE)) as handle:
+        return json.load(handle)
+
+
+def write_manifest(job_dir: str, manifest: Dict[str, Any]) -> None:
+    """Atomically replace a job manifest, so readers never see a partial file."""
+    manifest["updated_at"] = time.time()
+    tmp_path = os.path.join(job_dir, f".{MANIFEST_FILE}.{os.getpid()}")
+    with open(tmp_path, "w") as handle:
+        json.dump(manifest, handle)
+    os.replace(tmp_path, os.path.join(job_dir, MANIFEST_FILE))
+
+
+def _save_chunk(path: str, chunk: pd.DataFrame) -> None:
+    """Write a parsed chunk as NumPy columns, without pickled objects."""
+    arrays = {"columns": np.array([str(column) for column in chunk.columns], dtype=str)}
+    for i, column in enumerate(chunk.columns):
+        values = chunk[column]
+        if values.dtype == object:
+            missing = values.isna()
+            arrays[f"values_{i}"] = values.where(~missing, "").to_numpy(dtype=str)
+            arrays[f"missing_{i}"] = missing.to_numpy()
+        else:
+            arrays[f"values_{i}"] = values.to_numpy()
+    with open(path, "wb") as out:
+        np.savez(out, **arrays)
+
+
+def _read_summary(path: str) -> Optional[CSVSummary]:
+    try:
+        with open(path) as handle:
+            return CSVSummary.from_state(json.load(handle))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_summary(path: str, summary: CSVSummary) -> None:
+    tmp_path = f"{path}.{os.getpid()}"
+    with open(tmp_path, "w") as handle:
+        json.dump(summary.to_state(), handle)
+    os.replace(tmp_path, path)
+
+
+def _record_ends(block: bytes) -> np.ndarray:
+    """
+    Offsets just past each newline in ``block`` that ends a CSV record.
+
+    ``block`` must start at a record boundary. Quotes inside a quoted
+    field are doubled, so a newline is inside quotes exactly when an odd
+    number of quote characters precede it.
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    quoted = np.logical_xor.accumulate(data == ord('"'))
+    return np.flatnonzero((data == ord("\n")) & ~quoted) + 1
+
+
+def _read_records(handle: BinaryIO, offset: int, size: int, first: bool = False) -> bytes:
+    """
+    Read whole CSV records from ``offset``, a record boundary.
+
+    Returns about ``size`` bytes (more if one record is longer), only the
+    first record with ``first``, the rest of the file at its end, and
+    nothing past it.
+    """
+    handle.seek(offset)
+    block = b""
+    while True:
+        more = handle.read(size)
+        if not more:
+            return block
+        block += more
+        ends = _record_ends(block)
+        if len(ends):
+            return block[:ends[0] if first else ends[-1]]
+
+
+def run_import(job_dir: str, chunk_bytes: int = IMPORT_CHUNK_BYTES) -> Dict[str, Any]:
+    """
+    Parse and validate a job's source CSV into chunk files, reporting
+    progress.
+
+    Runs on the job executor, so it only takes picklable arguments and
+    communicates through the job directory. A job that already has
+    completed chunks resumes at the byte offset after them instead of
+    starting over.
+
+    Each chunk's raw text is checked with the csv-validate rules; issues
+    are listed with their row number in the whole file. Duplicate IDs and
+    salary outliers are judged within a chunk.
+
+    Args:
+        job_dir: The job's directory
+        chunk_bytes: Bytes of CSV parsed per chunk (rounded to whole records)
+
+    Returns:
+        The final manifest
+    """
+    manifest = read_manifest(job_dir)
+    source = os.path.join(job_dir, SOURCE_FILE)
+    summary_path = os.path.join(job_dir, SUMMARY_FILE)
+    summary = _read_summary(summary_path) if manifest["rows_processed"] else None
+    if summary is None or summary.total_rows != manifest["rows_processed"]:
+        # No usable checkpoint (or the last one raced a crash): start over,
+        # rewriting the chunk files under a new generation
+        summary = CSVSummary([str(column).strip() for column in read_columns(source)])
+        manifest.update(
+            rows_processed=0,
+            bytes_processed=0,
+            chunks=[],
+            validation=empty_report(),
+            generation=manifest.get("generation", 0) + 1
+        )
+    checked = set(REQUIRED_COLUMNS + RECOMMENDED_COLUMNS)
+    as_of = accrual_date()
+
+    manifest.update(
+        status="running",
+        owner_pid=os.getpid(),
+        started_at=manifest.get("started_at") or time.time(),
+        error=None
+    )
+    write_manifest(job_dir, manifest)
+
+    try:
+        with open(source, "rb") as handle:
+            header = _read_records(handle, 0, HEADER_BYTES, first=True)
+            offset = max(manifest["bytes_processed"], len(header))
+            while True:
+                block = _read_records(handle, offset, chunk_bytes)
+                if not block:
+                    break
+                offset += len(block)
+                with span("read_csv"):
+                    chunk = pd.read_csv(io.BytesIO(header + block), encoding="utf-8")
+                    # Validated as text, like csv-validate, before any typing
+                    raw = pd.read_csv(
+                        io.BytesIO(header + block), dtype=str, skipinitialspace=True, encoding="utf-8",
+                        usecols=lambda c: str(c).strip() in checked
+                    )
+                raw.columns = raw.columns.str.strip()
+                first_row = manifest["rows_processed"] + 1
+                report = validate_payroll(
+                    raw, as_of, sample_rows=0, row_numbers=np.arange(first_row, first_row + len(raw))
+                )
+
+                chunk = normalize_chunk(chunk)
+                name = _chunk_file(len(manifest["chunks"]))
+                _save_chunk(os.path.join(job_dir, name), chunk)
+                summary.update(chunk)
+                _write_summary(summary_path, summary)
+
+                # Folded in only with its chunk, so a crash never counts it twice
+                merge_report(manifest["validation"], report)
+                manifest["chunks"].append({"file": name, "rows": len(chunk)})
+                manifest["rows_processed"] += len(chunk)
+                manifest["bytes_processed"] = offset
+                write_manifest(job_dir, manifest)
+    except Exception as e:
+        manifest.update(status="failed", error=str(e))
+        write_manifest(job_dir, manifest)
+        return manifest
+
+    manifest.update(
+        status="completed",
+        bytes_processed=manifest["bytes_total"],
+        finished_at=time.time(),
+        summary=summary.to_dict()
+    )
+    write_manifest(job_dir, manifest)
+    return manifest
+
+
+@lru_cache(maxsize=8)
+def _load_chunk(path: str, generation: int) -> pd.DataFrame:
+    # A job restarted from scratch rewrites its chunk files, so the
+    # manifest's generation is part of the key; within one a file is final
+    data: Dict[str, Any] = {}
+    with np.load(path, allow_pickle=False) as arrays:
+        for i, column in enumerate(arrays["columns"].tolist()):
+            values = arrays[f"values_{i}"]
+            if f"missing_{i}" in arrays.files:
+                values = values.astype(object)
+                values[arrays[f"missing_{i}"]] = None
+            data[column] = values
+    return pd.DataFrame(data)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ImportManager:
+    """Creates import jobs, schedules them and reads their results."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _job_dir(self, job_id: str) -> str:
+        job_dir = os.path.join(self.root, job_id)
+        if not _JOB_ID.fullmatch(job_id) or not os.path.isdir(job_dir):
+            raise ImportNotFoundError(job_id)
+        return job_dir
+
+    def create(self, filename: str, source_path: str) -> Dict[str, Any]:
+        """
+        Register a new job for an already-spooled upload.
+
+        Args:
+            filename: Original upload name
+            source_path: Spooled CSV; moved into the job directory
+
+        Returns:
+            The initial manifest
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.root, job_id)
+        os.makedirs(job_dir)
+        os.replace(source_path, os.path.join(job_dir, SOURCE_FILE))
+
+        manifest = {
+            "job_id": job_id,
+            "filename": filename,
+            "status": "queued",
+            "owner_pid": os.getpid(),
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "bytes_total": os.path.getsize(os.path.join(job_dir, SOURCE_FILE)),
+            "bytes_processed": 0,
+            "rows_processed": 0,
+            "chunks": [],
+            "generation": 0,
+            "error": None,
+            "validation": None,
+            "summary": None
+        }
+        write_manifest(job_dir, manifest)
+        return manifest
+
+    def start(self, job_id: str) -> None:
+        """Schedule a job on the executor in the background."""
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str) -> None:
+        job_dir = self._job_dir(job_id)
+        executor = get_executor()
+        while True:
+            try:
+                await executor.submit(run_import, job_dir)
+                return
+            except ExecutorBusyError as e:
+                # Background jobs wait their turn instead of failing
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                manifest = read_manifest(job_dir)
+                manifest.update(status="failed", error=f"Worker error: {e}")
+                write_manifest(job_dir, manifest)
+                return
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get a job's status with progress, throughput, ETA and the
+        validation issues found in the chunks parsed so far.
+
+        Jobs whose worker died mid-run are reported as ``interrupted``
+        and can be retried.
+        """
+        manifest = read_manifest(self._job_dir(job_id))
+        status = manifest["status"]
+        if status in ACTIVE_STATUSES and job_id not in self._tasks \
+                and not _pid_alive(manifest.get("owner_pid")):
+            status = "interrupted"
+
+        started_at = manifest["started_at"]
+        elapsed = ((manifest["finished_at"] or time.time()) - started_at) if started_at else 0.0
+        fraction = (
+            manifest["bytes_processed"] / manifest["bytes_total"]
+            if manifest["bytes_total"] else float(status == "completed")
+        )
+        eta = None
+        if status == "running" and 0 < fraction < 1:
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+
+        return {
+            "job_id": job_id,
+            "filename": manifest["filename"],
+            "status": status,
+            "error": manifest["error"],
+            "progress": {
+                "rows_processed": manifest["rows_processed"],
+                "bytes_processed": manifest["bytes_processed"],
+                "bytes_total": manifest["bytes_total"],
+                "percent": round(fraction * 100, 1),
+                "rows_per_second": round(manifest["rows_processed"] / elapsed, 1) if elapsed else 0.0,
+                "elapsed_seconds": round(elapsed, 1),
+                "eta_seconds": eta
+            },
+            "validation": manifest.get("validation"),
+            "result": manifest["summary"]
+        }
+
+    def rows(
+        self,
+        job_id: str,
+        page: int,
+        per_page: int,
+        as_json: bool = False
+    ) -> Tuple[Union[List[Dict[str, Any]], RawJSON], int, bool]:
+        """
+        Read a page of parsed rows from the stored chunks.
+
+        Pages can be fetched while the job is still running; only rows
+        from completed chunks are visible. With ``as_json`` the rows come
+        back already encoded as a JSON array.
+
+        Returns:
+            (rows, rows available so far, whether the job has completed)
+        """
+        job_dir = self._job_dir(job_id)
+        manifest = read_manifest(job_dir)
+        start = (page - 1) * per_page
+        end = start + per_page
+
+        slices: List[pd.DataFrame] = []
+        offset = 0
+        for chunk in manifest["chunks"]:
+            chunk_end = offset + chunk["rows"]
+            if chunk_end > start and offset < end:
+                frame = _load_chunk(os.path.join(job_dir, chunk["file"]), manifest.get("generation", 0))
+                lo = max(start - offset, 0)
+                hi = min(end - offset, chunk["rows"])
+                slices.append(frame.iloc[lo:hi])
+            if chunk_end >= end:
+                break
+            offset = chunk_end
+        if as_json:
+            # Each chunk keeps its own column types, as with per-row dicts
+            encoded = [frame_records(part).data[1:-1] for part in slices if len(part)]
+            rows = RawJSON(b"[" + b",".join(encoded) + b"]")
+        else:
+            rows = []
+            with span("to_dict"):
+                for part in slices:
+                    # Missing values become null; NaN is not valid JSON
+                    part = part.astype(object)
+                    rows.extend(part.where(part.notna(), None).to_dict(orient="records"))
+        return rows, manifest["rows_processed"], manifest["status"] == "completed"
+
+    def retry(self, job_id: str) -> Dict[str, Any]:
+        """
+        Restart a failed or interrupted job from its last completed chunk.
+
+        Raises:
+            ImportStateError: If the job is not in a retryable state
+        """
+        current = self.status(job_id)
+        if current["status"] not in ("failed", "interrupted"):
+            raise ImportStateError(f"Job is {current['status']}")
+
+        job_dir = self._job_dir(job_id)
+        manifest = read_manifest(job_dir)
+        manifest.update(status="queued", owner_pid=os.getpid(), error=None)
+        write_manifest(job_dir, manifest)
+        self.start(job_id)
+        return self.status(job_id)
+
+
+# Instances per tenant
+_import_managers = TenantScoped(lambda tenant: ImportManager(tenant_data_dir(tenant, "imports")))
+
+def get_import_manager(tenant: Optional[str] = None) -> ImportManager:
+    """Get or create the import job manager of a tenant (default: the current one)"""
+    return _import_managers.get(tenant)
@@ -0,0 +1,225 @@
+"""
+Streaming CSV Ingestion for PayFlow
+
+Payroll exports can run to millions of rows, so uploads are never held
+in memory as a whole. The upload body is spooled to a temporary file in
+fixed-size blocks, then parsed with pandas' ``chunksize`` reader while the
+preview, row count and per-column statistics are accumulated chunk by
+chunk. Peak memory is bounded by the chunk size, not the file size.
+
+Environment Variables:
+- PAYFLOW_UPLOAD_CHUNK_BYTES: Bytes read from the upload per block (default 1 MiB)
+- PAYFLOW_CSV_CHUNK_ROWS: Rows parsed per pandas chunk (default 100000)
+"""
+
+from typing import Dict, List, Any, Callable, Optional
+import os
+import tempfile
+
+import pandas as pd
+from fastapi import UploadFile
+
+from app.services.metrics import timed_iter
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("PAYFLOW_UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+CSV_CHUNK_ROWS = int(os.getenv("PAYFLOW_CSV_CHUNK_ROWS", "100000"))
+PREVIEW_ROWS = 5
+
+
+def _scalar(value: Any) -> Any:
+    """Convert a NumPy scalar to the matching Python type."""
+    return value.item() if hasattr(value, "item") else value
+
+
+class ColumnStats:
+    """
+    Running statistics for one CSV column.
+
+    Numeric columns track min, max and mean. A column that parses as
+    text in any chunk is reported as text from then on.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.numeric = True
+        self.minimum: Optional[Any] = None
+        self.maximum: Optional[Any] = None
+        self.total = 0.0
+
+    def update(self, series: pd.Series) -> None:
+        """Fold one chunk of the column into the running totals."""
+        present = int(series.notna().sum())
+        self.count += present
+        self.nulls += len(series) - present
+
+        if not self.numeric or present == 0:
+            return
+        if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+            self.numeric = False
+            return
+
+        chunk_min = _scalar(series.min())
+        chunk_max = _scalar(series.max())
+        self.minimum = chunk_min if self.minimum is None else min(self.minimum, chunk_min)
+        self.maximum = chunk_max if self.maximum is None else max(self.maximum, chunk_max)
+        self.total += float(series.sum())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the statistics for the API response."""
+        if self.count == 0:
+            return {"type": "empty", "count": 0, "nulls": self.nulls}
+        if not self.numeric:
+            return {"type": "text", "count": self.count, "nulls": self.nulls}
+        return {
+            "type": "numeric",
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": self.minimum,
+            "max": self.maximum,
+            "mean": round(self.total / self.count, 4)
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """Running totals as plain JSON values, for checkpointing."""
+        return dict(vars(self))
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ColumnStats":
+        """Rebuild statistics checkpointed with ``to_state``."""
+        stats = cls()
+        vars(stats).update(state)
+        return stats
+
+
+async def spool_upload(file: UploadFile, directory: Optional[str] = None) -> str:
+    """
+    Copy an upload to a temporary file in fixed-size blocks.
+
+    Args:
+        file: Incoming multipart upload
+        directory: Where to create the file (system temp dir by default)
+
+    Returns:
+        Path of the spooled file; the caller is responsible for removing it
+    """
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await file.read(UPLOAD_CHUNK_BYTES)
+                if not block:
+                    break
+                out.write(block)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class CSVSummary:
+    """
+    Incremental summary of a CSV parsed in chunks.
+
+    Collects the preview rows, the row count and per-column statistics.
+    """
+
+    def __init__(self, columns: List[str], preview_rows: int = PREVIEW_ROWS):
+        self.columns = columns
+        self.preview_rows = preview_rows
+        self.preview: List[Dict[str, Any]] = []
+        self.total_rows = 0
+        self.stats = {column: ColumnStats() for column in columns}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one parsed chunk into the summary."""
+        if len(self.preview) < self.preview_rows:
+            self.preview.extend(
+                chunk.head(self.preview_rows - len(self.preview)).to_dict(orient="records")
+            )
+        self.total_rows += len(chunk)
+        for column in self.columns:
+            self.stats[column].update(chunk[column])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the summary for the API response."""
+        return {
+            "total_rows": self.total_rows,
+            "columns": self.columns,
+            "preview": self.preview,
+            "column_stats": {column: self.stats[column].to_dict() for column in self.columns}
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """The running summary as plain JSON values, for checkpointing."""
+        return {
+            "columns": self.columns,
+            "preview_rows": self.preview_rows,
+            "preview": self.preview,
+            "total_rows": self.total_rows,
+            "stats": {column: self.stats[column].to_state() for column in self.columns}
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "CSVSummary":
+        """Rebuild a summary checkpointed with ``to_state``."""
+        summary = cls(state["columns"], state["preview_rows"])
+        summary.preview = state["preview"]
+        summary.total_rows = state["total_rows"]
+        summary.stats = {column: ColumnStats.from_state(stats) for column, stats in state["stats"].items()}
+        return summary
+
+
+def read_columns(path: str) -> List[str]:
+    """Read only the header row of a CSV file."""
+    return pd.read_csv(path, nrows=0, encoding="utf-8").columns.tolist()
+
+
+def normalize_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Trim stray whitespace from column names and text values.
+
+    Spreadsheet exports often leave trailing spaces (e.g. ``2025-01-10 ``)
+    that would otherwise break date parsing and ID matching downstream.
+    """
+    chunk.columns = [str(column).strip() for column in chunk.columns]
+    for column in chunk.columns[(chunk.dtypes == object).values]:
+        chunk[column] = chunk[column].str.strip()
+    return chunk
+
+
+def summarize_csv(
+    path: str,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    preview_rows: int = PREVIEW_ROWS,
+    collect: Optional[Callable[[pd.DataFrame], Optional[pd.DataFrame]]] = None
+) -> Dict[str, Any]:
+    """
+    Parse a CSV file chunk by chunk and summarize it.
+
+    Args:
+        path: CSV file on disk
+        chunk_rows: Rows parsed per chunk
+        preview_rows: Number of leading rows returned as preview
+        collect: Optional projection applied to each normalized chunk;
+            its results are concatenated and returned as ``frame``. Use it
+            to keep only the typed columns a caller needs.
+
+    Returns:
+        Dictionary with total_rows, columns, preview and column_stats,
+        plus ``frame`` (None if ``collect`` returned None) when collecting
+    """
+    summary = CSVSummary(read_columns(path), preview_rows)
+    pieces: List[pd.DataFrame] = []
+    with pd.read_csv(path, chunksize=chunk_rows, encoding="utf-8") as reader:
+        for chunk in timed_iter(reader, "read_csv"):
+            summary.update(chunk)
+            if collect is not None:
+                piece = collect(normalize_chunk(chunk))
+                if piece is not None:
+                    pieces.append(piece)
+
+    result = summary.to_dict()
+    if collect is not None:
+        result["frame"] = pd.concat(pieces, ignore_index=True) if pieces else None
+    return result
@@ -0,0 +1,568 @@
+"""
+EWA Withdrawal Ledger for PayFlow
+
+Every cashout is appended to a ledger before it is confirmed; rows are
+never updated or deleted. Storage is pluggable:
+
+- SQLiteLedger: a local SQLite file in WAL mode (default)
+- MemoryLedger: in-process lists, for demos and benchmarks
+
+Balance checks are serialized per employee, not globally: each employee
+has an asyncio lock that is held from the balance check until the entry
+is durable and the employee's balance has been reduced, so two
+concurrent cashouts can never both spend the same pesos, while cashouts
+of different employees proceed in parallel. A cashout runs to the end
+even if its client disconnects, so an entry that reached the ledger is
+always reflected in the balance. The locks and balances live in the
+worker process, so one worker owns the ledger.
+
+Idempotency keys absorb client retries. A request repeating a key gets
+the original withdrawal back instead of a second one; reusing a key for
+a different employee or amount is rejected. Requests sharing a key are
+serialized like those of one employee, and an entry the storage still
+refuses fails alone, never the rest of its group commit.
+
+Appends are group-committed: withdrawals arriving within a few
+milliseconds of each other share one transaction, and so one fsync,
+through a ``MicroBatcher`` feeding a single writer thread.
+
+Environment Variables:
+- PAYFLOW_LEDGER_BACKEND: "sqlite" (default) or "memory"
+- PAYFLOW_LEDGER_PATH: SQLite file of the default tenant (default <data dir>/ledger/withdrawals.db);
+  other tenants each have one under <data dir>/tenants/<id>/ledger
+- PAYFLOW_LEDGER_COMMIT_BATCH: Most withdrawals per commit (default 256)
+- PAYFLOW_LEDGER_COMMIT_WAIT_MS: How long a commit waits for company (default 2)
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, AsyncIterator, Optional, Set, Tuple
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from app.services.aggregates import WithdrawalAggregates, get_withdrawal_aggregates
+from app.services.batching import MicroBatcher
+from app.services.employees import DEFAULT_DEPARTMENT, EmployeeStore, get_employee_store
+from app.services.ewa import accrual_date, get_pay_calendar
+from app.services.tenants import DEFAULT_TENANT, TenantScoped, tenant_data_dir
+from app.utils import get_data_dir
+
+COMMIT_BATCH = int(os.getenv("PAYFLOW_LEDGER_COMMIT_BATCH", "256"))
+COMMIT_WAIT_MS = float(os.getenv("PAYFLOW_LEDGER_COMMIT_WAIT_MS", "2"))
+# Idempotency results remembered in memory; older keys are looked up in storage
+IDEMPOTENCY_CACHE_SIZE = 100_000
+
+
+class WithdrawalError(Exception):
+    """Base class for rejected withdrawals."""
+
+
+class UnknownEmployeeError(WithdrawalError):
+    """Raised when the employee is not in the current payroll."""
+
+
+class InsufficientBalanceError(WithdrawalError):
+    """Raised when the amount exceeds the employee's available balance."""
+
+    def __init__(self, available: float):
+        super().__init__(f"Only ₱{available:,.2f} is available for withdrawal")
+        self.available = available
+
+
+class IdempotencyConflictError(WithdrawalError):
+    """Raised when an idempotency key is reused for a different withdrawal."""
+
+
+def _duplicate_key() -> IdempotencyConflictError:
+    return IdempotencyConflictError("Idempotency key was already used for a different withdrawal")
+
+
+def _cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+class LedgerBackend:
+    """
+    Append-only storage a ledger backend must implement.
+
+    Entries are dicts with withdrawal_id, idempotency_key (or None),
+    employee_id, amount_cents, day (accrual date, ISO), period_start (ISO)
+    and created_at (epoch seconds). Methods are called from one writer
+    thread at a time.
+    """
+
+    def append(self, entries: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+        """
+        Durably store ``entries`` in one write.
+
+        An entry that cannot be stored (its idempotency key is taken) is
+        skipped without failing the others.
+
+        Returns:
+            One error per entry, None for each entry stored
+        """
+        raise NotImplementedError
+
+    def find(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def period_totals(self, period_start: str) -> Dict[str, int]:
+        """Centavos withdrawn per employee in the period starting ``period_start``."""
+        raise NotImplementedError
+
+    def since(self, day: str) -> List[Dict[str, Any]]:
+        """Entries dated ``day`` (ISO) or later, oldest first."""
+        raise NotImplementedError
+
+    def recent(self, employee_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Newest entries first, optionally for one employee."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryLedger(LedgerBackend):
+    """In-process ledger; contents are lost on restart."""
+
+    def __init__(self):
+        self._entries: List[Dict[str, Any]] = []
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self.commits = 0
+
+    def append(self, entries: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = []
+        for entry in entries:
+            key = entry["idempotency_key"]
+            if key is not None and key in self._keys:
+                errors.append(_duplicate_key())
+                continue
+            self._entries.append(entry)
+            if key is not None:
+                self._keys[key] = entry
+            errors.append(None)
+        self.commits += 1
+        return errors
+
+    def find(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        return self._keys.get(idempotency_key)
+
+    def period_totals(self, period_start: str) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for entry in self._entries:
+            if entry["period_start"] == period_start:
+                totals[entry["employee_id"]] = totals.get(entry["employee_id"], 0) + entry["amount_cents"]
+        return totals
+
+    def since(self, day: str) -> List[Dict[str, Any]]:
+        return [e for e in self._entries if e["day"] >= day]
+
+    def recent(self, employee_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        entries = (e for e in reversed(self._entries) if employee_id in (None, e["employee_id"]))
+        return [e for _, e in zip(range(limit), entries)]
+
+
+class SQLiteLedger(LedgerBackend):
+    """
+    Ledger in a SQLite file.
+
+    WAL mode lets readers run while a commit is in progress, and
+    ``synchronous=FULL`` fsyncs every commit, so a confirmed withdrawal
+    survives a crash; group commit keeps the fsync count low.
+    """
+
+    COLUMNS = ("withdrawal_id", "idempotency_key", "employee_id", "amount_cents", "day", "period_start", "created_at")
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(get_data_dir("ledger"), "withdrawals.db")
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self.commits = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS withdrawals (
+                    id INTEGER PRIMARY KEY,
+                    withdrawal_id TEXT NOT NULL UNIQUE,
+                    idempotency_key TEXT UNIQUE,
+                    employee_id TEXT NOT NULL,
+                    amount_cents INTEGER NOT NULL CHECK (amount_cents > 0),
+                    day TEXT NOT NULL,
+                    period_start TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS withdrawals_period ON withdrawals (period_start, employee_id);
+                CREATE INDEX IF NOT EXISTS withdrawals_employee ON withdrawals (employee_id, id);
+                CREATE INDEX IF NOT EXISTS withdrawals_day ON withdrawals (day);
+            """)
+
+    def _rows(self, sql: str, *params: Any) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def append(self, entries: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+        rows = [tuple(entry[c] for c in self.COLUMNS) for entry in entries]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                errors = self._insert(rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self.commits += 1
+        return errors
+
+    def _insert(self, rows: List[tuple]) -> List[Optional[Exception]]:
+        sql = f"INSERT INTO withdrawals ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})"
+        self._conn.execute("SAVEPOINT batch")
+        try:
+            self._conn.executemany(sql, rows)
+            return [None] * len(rows)
+        except sqlite3.IntegrityError:
+            self._conn.execute("ROLLBACK TO batch")
+        finally:
+            self._conn.execute("RELEASE batch")
+
+        # Some row is bad: insert one by one, so it only loses itself
+        errors: List[Optional[Exception]] = []
+        for row in rows:
+            self._conn.execute("SAVEPOINT entry")
+            try:
+                self._conn.execute(sql, row)
+                errors.append(None)
+            except sqlite3.IntegrityError as e:
+                self._conn.execute("ROLLBACK TO entry")
+                errors.append(_duplicate_key() if "idempotency_key" in str(e) else e)
+            finally:
+                self._conn.execute("RELEASE entry")
+        return errors
+
+    def find(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        rows = self._rows(
+            f"SELECT {', '.join(self.COLUMNS)} FROM withdrawals WHERE idempotency_key = ?", idempotency_key
+        )
+        return rows[0] if rows else None
+
+    def period_totals(self, period_start: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT employee_id, SUM(amount_cents) FROM withdrawals WHERE period_start = ? GROUP BY employee_id",
+                (period_start,)
+            ).fetchall()
+        return dict(rows)
+
+    def since(self, day: str) -> List[Dict[str, Any]]:
+        return self._rows(f"SELECT {', '.join(self.COLUMNS)} FROM withdrawals WHERE day >= ? ORDER BY id", day)
+
+    def recent(self, employee_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        if employee_id is None:
+            return self._rows(f"SELECT {', '.join(self.COLUMNS)} FROM withdrawals ORDER BY id DESC LIMIT ?", limit)
+        return self._rows(
+            f"SELECT {', '.join(self.COLUMNS)} FROM withdrawals WHERE employee_id = ? ORDER BY id DESC LIMIT ?",
+            employee_id, limit
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _KeyedLocks:
+    """One asyncio lock per key, dropped once nobody holds or awaits it."""
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, List[int]]] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        lock, users = self._locks.setdefault(key, (asyncio.Lock(), [0]))
+        users[0] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            users[0] -= 1
+            if not users[0]:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "withdrawal_id": entry["withdrawal_id"],
+        "employee_id": entry["employee_id"],
+        "amount": entry["amount_cents"] / 100,
+        "day": entry["day"],
+        "period_start": entry["period_start"],
+        "created_at": datetime.fromtimestamp(entry["created_at"]).isoformat(timespec="seconds"),
+        "idempotency_key": entry["idempotency_key"]
+    }
+
+
+class WithdrawalLedger:
+    """
+    Checks, records and applies EWA withdrawals.
+
+    Args:
+        backend: Where entries are stored
+        store: Employee store whose balances are checked and reduced
+        aggregates: Rolling insights fed with every withdrawal
+        commit_batch: Most withdrawals per group commit
+        commit_wait_ms: How long a commit waits for more withdrawals
+    """
+
+    def __init__(
+        self,
+        backend: LedgerBackend,
+        store: EmployeeStore,
+        aggregates: Optional[WithdrawalAggregates] = None,
+        commit_batch: int = COMMIT_BATCH,
+        commit_wait_ms: float = COMMIT_WAIT_MS
+    ):
+        self.backend = backend
+        self.store = store
+        self.aggregates = aggregates
+        # One writer thread: appends reach the backend one batch at a time
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payflow-ledger")
+        self._committer: MicroBatcher[Dict[str, Any], Optional[Exception]] = MicroBatcher(
+            self._commit, max_batch_size=commit_batch, max_wait_ms=commit_wait_ms
+        )
+        self._locks = _KeyedLocks()
+        self._key_locks = _KeyedLocks()
+        self._running: Set[asyncio.Task] = set()
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"withdrawals": 0, "replayed": 0, "rejected": 0}
+
+    async def _run(self, fn: Any, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    async def _commit(self, entries: List[Dict[str, Any]]) -> List[Optional[Exception]]:
+        return await self._run(self.backend.append, entries)
+
+    def _remember(self, entry: Dict[str, Any]) -> None:
+        self._results[entry["idempotency_key"]] = entry
+        if len(self._results) > IDEMPOTENCY_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    async def _replay(self, key: str, employee_id: str, cents: int) -> Optional[Dict[str, Any]]:
+        """The withdrawal already recorded under ``key``, if any."""
+        entry = self._results.get(key)
+        if entry is None:
+            entry = await self._run(self.backend.find, key)
+        if entry is None:
+            return None
+        if entry["employee_id"] != employee_id or entry["amount_cents"] != cents:
+            raise _duplicate_key()
+        return entry
+
+    @asynccontextmanager
+    async def _hold(self, employee_id: str, idempotency_key: Optional[str]) -> AsyncIterator[None]:
+        """
+        Lock the idempotency key (if any), then the employee. Requests
+        sharing a key for different employees are serialized too, so the
+        second one finds the first's entry instead of a duplicate key.
+        """
+        if idempotency_key is None:
+            async with self._locks.hold(employee_id):
+                yield
+            return
+        async with self._key_locks.hold(idempotency_key), self._locks.hold(employee_id):
+            yield
+
+    async def withdraw(
+        self,
+        employee_id: str,
+        amount: float,
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Withdraw ``amount`` from an employee's available EWA balance.
+
+        Returns once the withdrawal is durable and applied to the balance.
+        The work runs in its own task: a caller cancelled mid-commit (the
+        client disconnected) stops waiting, but the entry is still applied
+        to the balance before the employee's lock is released.
+
+        Returns:
+            The withdrawal, with the balance after it and ``replayed``
+            set when an earlier request with the same key is returned
+
+        Raises:
+            ValueError: If ``amount`` is not positive
+            UnknownEmployeeError: If the employee is not in the payroll
+            InsufficientBalanceError: If ``amount`` exceeds the balance
+            IdempotencyConflictError: If the key belongs to another withdrawal
+        """
+        cents = _cents(amount)
+        if cents <= 0:
+            raise ValueError("Amount must be positive")
+
+        task = asyncio.ensure_future(self._withdraw(employee_id, cents, idempotency_key))
+        # Hold a reference until done; retrieve the outcome if nobody is left waiting
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _withdraw(self, employee_id: str, cents: int, idempotency_key: Optional[str]) -> Dict[str, Any]:
+        async with self._hold(employee_id, idempotency_key):
+            if idempotency_key is not None:
+                entry = await self._replay(idempotency_key, employee_id, cents)
+                if entry is not None:
+                    self.stats["replayed"] += 1
+                    balance = self.store.snapshot.balance(employee_id) or {}
+                    return {
+                        **_public(entry),
+                        "withdrawn_this_period": balance.get("withdrawn"),
+                        "available_ewa": balance.get("available"),
+                        "replayed": True
+                    }
+
+            balance = self.store.snapshot.balance(employee_id)
+            if balance is None:
+                raise UnknownEmployeeError(f"Employee {employee_id} not found")
+            if cents > _cents(balance["available"]):
+                self.stats["rejected"] += 1
+                raise InsufficientBalanceError(balance["available"])
+
+            day = accrual_date()
+            entry = {
+                "withdrawal_id": uuid.uuid4().hex,
+                "idempotency_key": idempotency_key,
+                "employee_id": employee_id,
+                "amount_cents": cents,
+                "day": day.isoformat(),
+                "period_start": get_pay_calendar().period_for(day).start.isoformat(),
+                "created_at": time.time()
+            }
+            error = await self._committer.submit(entry)
+            if error is not None:
+                self.stats["rejected"] += 1
+                raise error
+            # Durable: reduce the balance of whichever snapshot is now current
+            balance = self.store.apply_withdrawal(employee_id, cents / 100) or balance
+            if idempotency_key is not None:
+                self._remember(entry)
+            self.stats["withdrawals"] += 1
+
+        if self.aggregates is not None:
+            allowance = balance["withdrawn"] + balance["available"]
+            self.aggregates.record(
+                employee_id, balance["department"], cents / 100, day,
+                balance["withdrawn"] / allowance if allowance > 0 else None
+            )
+        return {
+            **_public(entry),
+            "withdrawn_this_period": balance["withdrawn"],
+            "available_ewa": balance["available"],
+            "replayed": False
+        }
+
+    def restore_balances(self, as_of: Optional[date] = None) -> int:
+        """
+        Set each employee's withdrawn amount for the current pay period
+        from the ledger, the record of withdrawals. Needed after a restart
+        and after a payroll load that did not carry balances over.
+
+        Returns:
+            Number of employees whose balance came from the ledger
+        """
+        day = as_of or accrual_date()
+        totals = self.backend.period_totals(get_pay_calendar().period_for(day).start.isoformat())
+        return self.store.apply_withdrawn({k: v / 100 for k, v in totals.items()}, day)
+
+    def recompute_ewa(self, as_of: Optional[date] = None) -> int:
+        """
+        Recompute everyone's EWA figures; when ``as_of`` falls in a new pay
+        period, also reload that period's withdrawals from the ledger.
+
+        Returns:
+            Number of employees recomputed
+        """
+        day = as_of or accrual_date()
+        period = self.store.snapshot.period
+        recomputed = self.store.recompute_ewa(day)
+        if self.store.snapshot.period.start != period.start:
+            self.restore_balances(day)
+        return recomputed
+
+    def restore(self, as_of: Optional[date] = None) -> int:
+        """
+        Re-apply the ledger at startup: balances, then the withdrawals
+        within the insights window to the aggregates.
+
+        Returns:
+            Number of employees whose balance came from the ledger
+        """
+        day = as_of or accrual_date()
+        restored = self.restore_balances(day)
+        if self.aggregates is not None:
+            cutoff = day - timedelta(days=self.aggregates.window_days - 1)
+            snapshot = self.store.snapshot
+            for entry in self.backend.since(cutoff.isoformat()):
+                balance = snapshot.balance(entry["employee_id"])
+                self.aggregates.record(
+                    entry["employee_id"],
+                    balance["department"] if balance else DEFAULT_DEPARTMENT,
+                    entry["amount_cents"] / 100,
+                    date.fromisoformat(entry["day"])
+                )
+        return restored
+
+    async def recent(self, employee_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest withdrawals first, optionally for one employee."""
+        return [_public(e) for e in await self._run(self.backend.recent, employee_id, limit)]
+
+    def report(self) -> Dict[str, Any]:
+        """Withdrawal counters and group-commit statistics."""
+        return {
+            **self.stats,
+            "backend": type(self.backend).__name__,
+            "locked_employees": len(self._locks),
+            "commits": self._committer.report()
+        }
+
+    def close(self) -> None:
+        """Stop the writer thread and close the backend."""
+        self._writer.shutdown(wait=True)
+        self.backend.close()
+
+
+def _create_withdrawal_ledger(tenant: str) -> WithdrawalLedger:
+    kind = os.getenv("PAYFLOW_LEDGER_BACKEND", "sqlite")
+    if kind not in ("sqlite", "memory"):
+        raise ValueError(f"Unknown ledger backend: {kind}")
+    if kind == "sqlite":
+        # PAYFLOW_LEDGER_PATH places the default tenant's file only
+        path = os.getenv("PAYFLOW_LEDGER_PATH") if tenant == DEFAULT_TENANT else None
+        backend = SQLiteLedger(path or os.path.join(tenant_data_dir(tenant, "ledger"), "withdrawals.db"))
+    else:
+        backend = MemoryLedger()
+    ledger = WithdrawalLedger(backend, get_employee_store(tenant), get_withdrawal_aggregates(tenant))
+    ledger.restore()
+    return ledger
+
+
+# Instances per tenant
+_withdrawal_ledgers = TenantScoped(_create_withdrawal_ledger)
+
+def get_withdrawal_ledger(tenant: Optional[str] = None) -> WithdrawalLedger:
+    """Get or create a tenant's withdrawal ledger (default: the current one), re-applied to its employee store"""
+    return _withdrawal_ledgers.get(tenant)
+
+
+def close_withdrawal_ledgers() -> None:
+    """Close the ledgers of every tenant loaded in this worker."""
+    for ledger in _withdrawal_ledgers.loaded().values():
+        ledger.close()
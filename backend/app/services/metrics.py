@@ -0,0 +1,525 @@
+"""
+Metrics for PayFlow
+
+Request latency, timing spans and event loop health, exposed in the
+Prometheus text format on ``GET /metrics``. No client library is needed:
+the registry keeps plain counters behind one lock per metric.
+
+- ``MetricsMiddleware`` records, per route template (``/api/v1/employees/{employee_id}``,
+  never the raw path), request duration by status and response size,
+  plus the number of requests in flight. It is a plain ASGI middleware,
+  so streamed responses pass through unbuffered.
+- ``span("read_csv")`` times a block, ``timed("ai.analyze_spending")``
+  a function and ``timed_iter(reader, "read_csv")`` each step of an
+  iterator (such as pandas' chunked CSV reader); all land in
+  ``payflow_span_seconds``. Spans inside jobs on a process-pool executor
+  are recorded in the worker process and not exported.
+- ``LoopLagMonitor`` sleeps for a fixed interval on the event loop and
+  records how late it wakes up: lag means something blocked the loop.
+- ``RequestProfiler`` runs cProfile over a sample of requests and dumps
+  ``.prof`` files (``python -m pstats``, snakeviz). The profile covers
+  the event loop thread for the request's lifetime, so it includes other
+  requests interleaved with it but not work sent to threads. The sample
+  rate can be changed at runtime through ``/api/v1/system/profiling``.
+  For sampling profilers such as py-spy, attach to the reported pid.
+
+Environment Variables:
+- PAYFLOW_METRICS_ENABLED: Record request metrics (default true)
+- PAYFLOW_LOOP_LAG_INTERVAL_MS: Event loop lag probe interval (default 250)
+- PAYFLOW_PROFILE_SAMPLE: Share of requests profiled at startup (default 0, off)
+- PAYFLOW_PROFILE_KEEP: Profile dumps kept on disk (default 50)
+"""
+
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+import asyncio
+import bisect
+import cProfile
+import functools
+import inspect
+import os
+import random
+import re
+import threading
+import time
+
+from app.utils import get_data_dir
+
+METRICS_ENABLED = os.getenv("PAYFLOW_METRICS_ENABLED", "true").lower() == "true"
+LOOP_LAG_INTERVAL_MS = float(os.getenv("PAYFLOW_LOOP_LAG_INTERVAL_MS", "250"))
+PROFILE_SAMPLE = float(os.getenv("PAYFLOW_PROFILE_SAMPLE", "0"))
+PROFILE_KEEP = int(os.getenv("PAYFLOW_PROFILE_KEEP", "50"))
+# Starlette appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    """Monotonic total per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    Current value per label set, either set directly or read from
+    ``source`` at scrape time.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        source: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, help, labels)
+        self.source = source
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        if self.source is not None:
+            return [f"{self.name} {_number(self.source())}"]
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    """Bucketed observations per label set, with their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float], labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket ..., count above the last bucket, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self, *labels: str) -> Optional[Dict[str, Any]]:
+        """Count, sum and cumulative bucket counts of one label set."""
+        with self._lock:
+            series = self._series.get(labels)
+            series = list(series) if series is not None else None
+        if series is None:
+            return None
+        cumulative, total = [], 0
+        for count in series[:-1]:
+            total += count
+            cumulative.append(total)
+        return {"count": total, "sum": series[-1], "buckets": dict(zip(self.buckets + (float("inf"),), cumulative))}
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        lines = []
+        for key, values in series:
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                total += count
+                bucket = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, bucket)} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics, rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        source: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        return self._register(Gauge(name, help, labels, source))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+        labels: Tuple[str, ...] = ()
+    ) -> Histogram:
+        return self._register(Histogram(name, help, buckets, labels))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+_metrics = None
+
+def get_metrics() -> MetricsRegistry:
+    """Get or create the metrics registry"""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
+
+
+def _span_histogram() -> Histogram:
+    return get_metrics().histogram(
+        "payflow_span_seconds", "Duration of timed sections of request handling", labels=("span",)
+    )
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as span ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _span_histogram().observe(time.perf_counter() - start, name)
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator timing each call as span ``name``. Coroutines are timed
+    until they return and async generators until they are exhausted or
+    closed; closing the wrapper closes the wrapped generator with it.
+    """
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                inner = fn(*args, **kwargs)
+                try:
+                    with span(name):
+                        async for item in inner:
+                            yield item
+                finally:
+                    # A closed wrapper closes the generator now, not when it is collected
+                    await inner.aclose()
+        elif inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def timed_iter(items: Iterable[Any], name: str) -> Iterator[Any]:
+    """Yield from ``items``, timing each step (not the caller's work) as span ``name``."""
+    histogram = _span_histogram()
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            histogram.observe(time.perf_counter() - start, name)
+        yield item
+
+
+class RequestProfiler:
+    """
+    Profiles a sample of requests with cProfile and dumps each profile to
+    ``<data dir>/profiles``. One request is profiled at a time.
+
+    Args:
+        root: Directory for ``.prof`` files
+        sample_rate: Share of requests profiled (0 disables)
+        keep: Dumps kept on disk; older ones are deleted
+    """
+
+    def __init__(self, root: Optional[str] = None, sample_rate: float = PROFILE_SAMPLE, keep: int = PROFILE_KEEP):
+        self.root = root or get_data_dir("profiles")
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.keep = max(keep, 1)
+        self.dumps = 0
+        self._active = threading.Lock()
+
+    def configure(self, sample_rate: float) -> None:
+        """Change the share of requests profiled."""
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Start profiling this request if it is sampled and no other is being profiled."""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) already owns the hook
+            self._active.release()
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, method: str, route: str, seconds: float) -> str:
+        """Stop profiling and dump the profile; returns its file name."""
+        profile.disable()
+        self._active.release()
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        name = f"{time.time_ns()}-{method}-{slug}-{seconds * 1000:.0f}ms.prof"
+        profile.dump_stats(os.path.join(self.root, name))
+        self.dumps += 1
+        self._prune()
+        return name
+
+    def _files(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.root) if name.endswith(".prof"))
+
+    def _prune(self) -> None:
+        for name in self._files()[:-self.keep]:
+            try:
+                os.unlink(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        """Sample rate, dump counters and the newest dumps."""
+        return {
+            "sample_rate": self.sample_rate,
+            "dumps": self.dumps,
+            "directory": self.root,
+            "recent": self._files()[-10:][::-1],
+            "pid": os.getpid()
+        }
+
+
+# Singleton instance
+_request_profiler = None
+
+def get_request_profiler() -> RequestProfiler:
+    """Get or create the request profiler"""
+    global _request_profiler
+    if _request_profiler is None:
+        _request_profiler = RequestProfiler()
+    return _request_profiler
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, response size and in-flight requests."""
+
+    def __init__(self, app: Any, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        registry = registry or get_metrics()
+        self.duration = registry.histogram(
+            "payflow_http_request_duration_seconds", "HTTP request latency",
+            labels=("method", "route", "status")
+        )
+        self.size = registry.histogram(
+            "payflow_http_response_size_bytes", "HTTP response body size",
+            buckets=SIZE_BUCKETS, labels=("method", "route")
+        )
+        self.inflight = registry.gauge("payflow_http_requests_in_flight", "HTTP requests being handled")
+        self.inflight.set(0)
+        self.profiler = get_request_profiler()
+        self._routes: Dict[Any, str] = {}
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        """Path template of the route that handled the request."""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self._routes.get(endpoint)
+        if route is None:
+            route = next(
+                (r.path for r in scope["app"].routes if getattr(r, "endpoint", None) is endpoint),
+                UNMATCHED_ROUTE
+            )
+            self._routes[endpoint] = route
+        return route
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.inflight.inc()
+        profile = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - start
+            self.inflight.inc(amount=-1)
+            route = self._route(scope)
+            if profile is not None:
+                self.profiler.finish(profile, scope["method"], route, seconds)
+            self.duration.observe(seconds, scope["method"], route, str(status))
+            self.size.observe(size, scope["method"], route)
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: how much later than scheduled a periodic
+    sleep wakes up.
+
+    Args:
+        interval_ms: Time between probes
+        registry: Where the lag histogram is recorded
+    """
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, registry: Optional[MetricsRegistry] = None):
+        registry = registry or get_metrics()
+        self.interval = interval_ms / 1000
+        self.lag = registry.histogram(
+            "payflow_event_loop_lag_seconds", "Delay of the event loop in running a scheduled wakeup",
+            buckets=LAG_BUCKETS
+        )
+        self.worst = registry.gauge(
+            "payflow_event_loop_lag_max_seconds", "Largest event loop lag since startup"
+        )
+        self.worst.set(0.0)
+        self._worst = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start probing on the running loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lag.observe(lag)
+            if lag > self._worst:
+                self._worst = lag
+                self.worst.set(lag)
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+_loop_lag_monitor = None
+
+def get_loop_lag_monitor() -> LoopLagMonitor:
+    """Get or create the event loop lag monitor"""
+    global _loop_lag_monitor
+    if _loop_lag_monitor is None:
+        _loop_lag_monitor = LoopLagMonitor()
+    return _loop_lag_monitor
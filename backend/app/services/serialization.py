@@ -0,0 +1,248 @@
+"""
+JSON Serialization for PayFlow
+
+Large responses (employee pages, import rows) spend much of their time
+being encoded. With ``PAYFLOW_FAST_JSON`` enabled:
+
+- ``dumps`` encodes with orjson instead of ``jsonable_encoder`` plus the
+  stdlib ``json``; NaN becomes null, numpy scalars and dates are handled
+  natively. Without the ``orjson`` package it encodes as with the flag
+  off.
+- ``frame_records`` encodes DataFrame rows as a JSON array straight from
+  the columns with pandas' C encoder, so no per-row dicts are built. The
+  result is a ``RawJSON`` that ``dumps`` splices into the payload as is.
+- ``FastJSONResponse`` encodes with ``dumps``; it is the app's default
+  response class.
+
+With the flag off, ``dumps`` produces exactly what FastAPI's default
+JSONResponse would. Either way encoding is timed as the
+``json_serialize`` span.
+
+``encode_frame`` streams DataFrames as NDJSON or Arrow IPC for bulk
+exports; Arrow needs the ``pyarrow`` package.
+
+This module is the default response class of every route, so it never
+imports numpy or pandas itself: a payload can only hold their types once
+a route has loaded them.
+
+Environment Variables:
+- PAYFLOW_FAST_JSON: "true" to use the fast path (default false)
+- PAYFLOW_EXPORT_CHUNK_ROWS: Rows encoded per chunk of a bulk export (default 50000)
+"""
+
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Optional
+import importlib.util
+import io
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.services.metrics import span, timed
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used instead
+    orjson = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FAST_JSON = os.getenv("PAYFLOW_FAST_JSON", "false").lower() == "true"
+EXPORT_CHUNK_ROWS = int(os.getenv("PAYFLOW_EXPORT_CHUNK_ROWS", "50000"))
+# pandas' encoder writes this many decimals at most; enough for centavos
+FRAME_DOUBLE_PRECISION = 10
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+EXPORT_MEDIA_TYPES = ("application/json", NDJSON_MEDIA_TYPE, ARROW_MEDIA_TYPE)
+
+
+class RawJSON:
+    """Already-encoded JSON that ``dumps`` splices into a payload verbatim."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def frame_records(frame: "pd.DataFrame") -> RawJSON:
+    """
+    Encode rows as a JSON array of objects, column by column.
+
+    NaN and NaT become null, datetimes ISO 8601 strings and categories
+    their labels, as the per-row path would produce.
+    """
+    with span("frame_json"):
+        data = frame.to_json(
+            orient="records",
+            date_format="iso",
+            date_unit="s",
+            double_precision=FRAME_DOUBLE_PRECISION,
+            force_ascii=False
+        )
+    return RawJSON(data.encode("utf-8"))
+
+
+def _marker(index: int) -> str:
+    # Control characters are always escaped, so the encoded marker is unambiguous
+    return f"\x00raw{index}\x00"
+
+
+def _default(raw: List[bytes]) -> Callable[[Any], Any]:
+    """Encoder fallback for types neither orjson nor the stdlib handle."""
+    def default(value: Any) -> Any:
+        if isinstance(value, RawJSON):
+            raw.append(value.data)
+            return _marker(len(raw) - 1)
+        if type(value).__module__.startswith(("numpy", "pandas")):
+            # Already loaded, as the payload holds one of their types
+            import numpy as np
+            import pandas as pd
+
+            # NaT is a datetime, so it is checked first
+            if value is pd.NaT:
+                return None
+            if isinstance(value, np.generic):
+                return value.item()
+            if isinstance(value, np.ndarray):
+                return value.tolist()
+        if isinstance(value, (datetime, date, dt_time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (set, frozenset, tuple)):
+            return list(value)
+        return jsonable_encoder(value)
+    return default
+
+
+def _splice(body: bytes, raw: List[bytes]) -> bytes:
+    for index, data in enumerate(raw):
+        marker = json.dumps(_marker(index)).encode()
+        body = body.replace(marker, data, 1)
+    return body
+
+
+@timed("json_serialize")
+def dumps(payload: Any) -> bytes:
+    """Encode a response payload, on the fast path when it is enabled."""
+    raw: List[bytes] = []
+    if FAST_JSON and orjson is not None:
+        body = orjson.dumps(
+            payload,
+            default=_default(raw),
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    else:
+        # What FastAPI's default JSONResponse would send
+        body = json.dumps(
+            jsonable_encoder(payload, custom_encoder={RawJSON: lambda value: value}),
+            default=_default(raw),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+    return _splice(body, raw) if raw else body
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by ``dumps``."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def encode_frame(frame: "pd.DataFrame", media_type: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Encode a DataFrame in chunks for a streamed export.
+
+    Args:
+        frame: Rows to export
+        media_type: One of ``EXPORT_MEDIA_TYPES``
+        chunk_rows: Rows encoded per chunk
+
+    Yields:
+        Body chunks: a JSON array, one JSON object per line, or an Arrow
+        IPC stream with one record batch per chunk
+
+    Raises:
+        ImportError: For Arrow without the ``pyarrow`` package (check
+            ``arrow_available`` before starting a response)
+    """
+    if media_type == ARROW_MEDIA_TYPE:
+        yield from _encode_arrow(frame, chunk_rows)
+        return
+    if media_type == "application/json":
+        yield b"["
+    for start in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        if media_type == NDJSON_MEDIA_TYPE:
+            data = chunk.to_json(
+                orient="records", lines=True, date_format="iso", date_unit="s",
+                double_precision=FRAME_DOUBLE_PRECISION, force_ascii=False
+            )
+            yield data.encode("utf-8") + (b"" if data.endswith("\n") else b"\n")
+        else:
+            data = frame_records(chunk).data
+            yield (b"," if start else b"") + data[1:-1]
+    if media_type == "application/json":
+        yield b"]"
+
+
+def negotiate_export(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick the export format from an Accept header.
+
+    Returns:
+        The acceptable media type the client prefers (NDJSON when it
+        accepts anything), or None when none is supported
+    """
+    choices = []
+    for position, part in enumerate((accept or "*/*").split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            choices.append((-quality, position, media_type.lower()))
+    for _, _, media_type in sorted(choices):
+        if media_type in EXPORT_MEDIA_TYPES:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return NDJSON_MEDIA_TYPE
+    return None
+
+
+def arrow_available() -> bool:
+    """Whether Arrow exports can be served."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _drain(buffer: io.BytesIO) -> bytes:
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def _encode_arrow(frame: "pd.DataFrame", chunk_rows: int) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        for start in range(0, len(frame), chunk_rows):
+            chunk = frame.iloc[start:start + chunk_rows]
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield _drain(buffer)
+    # End-of-stream marker
+    yield _drain(buffer)
@@ -0,0 +1,207 @@
+"""
+Columnar Payroll Snapshots for PayFlow
+
+An upload is parsed from CSV text once. The typed employee frame it
+produces is written as a snapshot, one NumPy ``.npy`` file per column,
+and opening a snapshot memory-maps those files instead of parsing again.
+Numeric, date and category-code columns are used in place
+(copy-on-write), so a restart serves the last upload almost immediately
+and uvicorn workers mapping the same snapshot share its pages through the
+OS page cache. Only the string columns (employee_id, name) are decoded
+into Python objects.
+
+    <data dir>/snapshots/
+        CURRENT                  name of the latest snapshot directory
+        <created>-<pid>/
+            manifest.json        rows, accrual date, column kinds, category labels
+            <column>.npy         column values, or category codes
+            fingerprints.npy     row fingerprints of the upload (see diff.py)
+            fingerprint_ids.npy  their employee IDs, when not the employee_id column
+
+A snapshot directory is complete before CURRENT is switched to it, so
+readers never map a half-written snapshot.
+
+Environment Variables:
+- PAYFLOW_SNAPSHOT_ENABLED: Snapshot uploads and restore the latest at startup (default true)
+- PAYFLOW_SNAPSHOT_KEEP: Snapshot directories kept on disk (default 2)
+"""
+
+from datetime import date
+from typing import Dict, List, Any, Optional
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.tenants import TenantScoped, tenant_data_dir
+from app.utils import get_data_dir
+
+SNAPSHOT_ENABLED = os.getenv("PAYFLOW_SNAPSHOT_ENABLED", "true").lower() == "true"
+SNAPSHOT_KEEP = int(os.getenv("PAYFLOW_SNAPSHOT_KEEP", "2"))
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+
+class Snapshot:
+    """
+    A snapshot opened from disk.
+
+    Attributes:
+        name: Snapshot directory name
+        frame: Employee frame backed by the mapped column files
+        ids: Mapped employee_id column as a fixed-width string array
+        as_of: Accrual date the EWA columns were computed for
+        fingerprints: Row fingerprints of the upload, if it was diffed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        frame: pd.DataFrame,
+        ids: np.ndarray,
+        as_of: date,
+        fingerprints: Optional[pd.Series] = None
+    ):
+        self.name = name
+        self.frame = frame
+        self.ids = ids
+        self.as_of = as_of
+        self.fingerprints = fingerprints
+
+
+class SnapshotStore:
+    """Writes employee frames as columnar snapshots and maps them back."""
+
+    def __init__(self, root: Optional[str] = None, keep: int = SNAPSHOT_KEEP):
+        self.root = root or get_data_dir("snapshots")
+        self.keep = max(keep, 1)
+        self._lock = threading.Lock()
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def save(
+        self,
+        frame: pd.DataFrame,
+        as_of: date,
+        fingerprints: Optional[pd.Series] = None
+    ) -> str:
+        """
+        Write a typed employee frame as the new current snapshot.
+
+        Args:
+            frame: Employee frame as held by ``EmployeeSnapshot``
+            as_of: Accrual date of its EWA columns
+            fingerprints: Row fingerprints of the upload
+
+        Returns:
+            Name of the snapshot directory
+        """
+        name = f"{time.time_ns()}-{os.getpid()}"
+        tmp_dir = self._path(f".{name}")
+        os.makedirs(tmp_dir)
+        columns: List[Dict[str, Any]] = []
+        for column in frame.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                entry = {"kind": "category", "categories": [str(c) for c in values.cat.categories]}
+                array = values.cat.codes.to_numpy()
+            elif values.dtype == object:
+                entry = {"kind": "string"}
+                array = values.to_numpy(dtype=str)
+            else:
+                entry = {"kind": "values"}
+                array = values.to_numpy()
+            np.save(os.path.join(tmp_dir, f"{column}.npy"), array, allow_pickle=False)
+            columns.append({"name": column, **entry})
+        if fingerprints is not None:
+            if len(fingerprints) != len(frame):
+                # Without duplicate IDs the fingerprints follow the employee_id column
+                np.save(os.path.join(tmp_dir, "fingerprint_ids.npy"), fingerprints.index.to_numpy(dtype=str))
+            np.save(os.path.join(tmp_dir, "fingerprints.npy"), fingerprints.to_numpy())
+        manifest = {
+            "version": FORMAT_VERSION,
+            "rows": len(frame),
+            "as_of": as_of.isoformat(),
+            "created_at": time.time(),
+            "columns": columns,
+            "fingerprints": fingerprints is not None,
+            "fingerprint_ids": fingerprints is not None and len(fingerprints) != len(frame)
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as handle:
+            json.dump(manifest, handle)
+
+        with self._lock:
+            os.rename(tmp_dir, self._path(name))
+            tmp_path = self._path(f".{CURRENT_FILE}.{os.getpid()}")
+            with open(tmp_path, "w") as handle:
+                handle.write(name)
+            os.replace(tmp_path, self._path(CURRENT_FILE))
+            self._prune(name)
+        return name
+
+    def _prune(self, current: str) -> None:
+        """Remove all but the newest ``keep`` snapshots."""
+        names = sorted(n for n in os.listdir(self.root) if not n.startswith(".") and n != CURRENT_FILE)
+        for name in names[:-self.keep]:
+            if name != current:
+                # Mapped files stay readable after unlinking on POSIX
+                shutil.rmtree(self._path(name), ignore_errors=True)
+
+    def open(self) -> Optional[Snapshot]:
+        """
+        Map the current snapshot.
+
+        Returns:
+            The snapshot, or None when there is none (or it was written by
+            an incompatible version)
+        """
+        try:
+            with open(self._path(CURRENT_FILE)) as handle:
+                name = handle.read().strip()
+            directory = self._path(name)
+            with open(os.path.join(directory, MANIFEST_FILE)) as handle:
+                manifest = json.load(handle)
+            if manifest.get("version") != FORMAT_VERSION:
+                return None
+
+            data: Dict[str, Any] = {}
+            arrays: Dict[str, np.ndarray] = {}
+            for entry in manifest["columns"]:
+                # Copy-on-write: in-place EWA updates stay private to this process
+                array = np.load(os.path.join(directory, f"{entry['name']}.npy"), mmap_mode="c")
+                arrays[entry["name"]] = array
+                if entry["kind"] == "category":
+                    data[entry["name"]] = pd.Categorical.from_codes(array, categories=entry["categories"])
+                elif entry["kind"] == "string":
+                    data[entry["name"]] = array.astype(object)
+                else:
+                    data[entry["name"]] = array
+            fingerprints = None
+            if manifest["fingerprints"]:
+                if manifest["fingerprint_ids"]:
+                    index = np.load(os.path.join(directory, "fingerprint_ids.npy")).astype(object)
+                else:
+                    index = data["employee_id"]
+                fingerprints = pd.Series(
+                    np.load(os.path.join(directory, "fingerprints.npy"), mmap_mode="r"),
+                    index=pd.Index(index, copy=False)
+                )
+        except FileNotFoundError:
+            # No snapshot yet, or it was pruned while being opened
+            return None
+        frame = pd.DataFrame(data, copy=False)
+        return Snapshot(name, frame, arrays["employee_id"], date.fromisoformat(manifest["as_of"]), fingerprints)
+
+
+# Instances per tenant
+_snapshot_stores = TenantScoped(lambda tenant: SnapshotStore(tenant_data_dir(tenant, "snapshots")))
+
+def get_snapshot_store(tenant: Optional[str] = None) -> SnapshotStore:
+    """Get or create the snapshot store of a tenant (default: the current one)"""
+    return _snapshot_stores.get(tenant)
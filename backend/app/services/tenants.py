@@ -0,0 +1,435 @@
+"""
+Tenant Isolation for PayFlow
+
+Each employer is a tenant, named by the ``X-Employer-ID`` request header;
+requests without one belong to ``PAYFLOW_DEFAULT_TENANT``. The header is
+not authenticated, and every new tenant costs memory and files, so only
+known tenants are served: those listed in ``PAYFLOW_TENANTS`` when it is
+set, else up to ``PAYFLOW_MAX_TENANTS`` tenants, counting those with data
+on disk. Other ids are refused with 403. Per tenant:
+
+- Shards: the employee store, withdrawal ledger, withdrawal aggregates,
+  payroll differ, snapshot store and import jobs are separate instances
+  (``TenantScoped``), created on first use. Their files live under
+  ``<data dir>/tenants/<id>``; the default tenant keeps the data dir
+  root, so single-employer deployments see no change.
+- Caches: response cache entries and invalidation tags, forecasts and
+  chat answers are namespaced by tenant over shared backends.
+- Quotas: a token bucket per tenant limits its request rate (429 with
+  Retry-After), and the job executor caps each tenant's in-flight jobs,
+  so a large migration queues behind its own quota, not everyone's.
+- Worker affinity: with several worker processes listed in
+  ``PAYFLOW_WORKERS``, every tenant is owned by one of them, chosen by
+  rendezvous hashing or pinned with ``PAYFLOW_TENANT_PINS``. Its shards
+  are then loaded, and its caches warm, in that process only, and its
+  ledger has a single writer. Workers with pinned tenants serve only
+  those (unless every worker has some), so a hot employer can be given
+  processes of its own. A router in front sends each request to
+  ``owner(tenant)``; a worker given another worker's tenant answers 421
+  with the owner in ``X-PayFlow-Worker``. Adding or removing a worker
+  only moves the tenants that hash to it.
+
+``TenantMiddleware`` sets the current tenant in a context variable, which
+follows tasks and ``run_in_threadpool`` calls made by the request; code
+outside a request (startup, benchmarks) runs as the default tenant or
+enters one with ``use_tenant``.
+
+Environment Variables:
+- PAYFLOW_TENANT_HEADER: Header naming the tenant (default X-Employer-ID)
+- PAYFLOW_DEFAULT_TENANT: Tenant of requests without the header (default "default")
+- PAYFLOW_TENANTS: Comma-separated tenants served; unset admits new ones up to the cap
+- PAYFLOW_MAX_TENANTS: Most tenants admitted without PAYFLOW_TENANTS; 0 disables (default 1000)
+- PAYFLOW_TENANT_RATE: Requests per second per tenant; 0 disables (default 0)
+- PAYFLOW_TENANT_BURST: Requests a tenant may send at once (default: 2 x rate)
+- PAYFLOW_TENANT_MAX_JOBS: In-flight executor jobs per tenant; 0 disables (default 0)
+- PAYFLOW_WORKERS: Comma-separated names (e.g. host:port) of the workers sharing tenants
+- PAYFLOW_WORKER_ID: This worker's name in PAYFLOW_WORKERS
+- PAYFLOW_TENANT_PINS: Comma-separated tenant=worker pairs overriding the hash
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Callable, Generic, Iterator, Optional, Set, TypeVar
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+
+from starlette.responses import JSONResponse
+
+from app.services.metrics import get_metrics
+from app.utils import get_data_dir
+
+TENANT_HEADER = os.getenv("PAYFLOW_TENANT_HEADER", "X-Employer-ID")
+DEFAULT_TENANT = os.getenv("PAYFLOW_DEFAULT_TENANT", "default")
+TENANT_RATE = float(os.getenv("PAYFLOW_TENANT_RATE", "0"))
+TENANT_BURST = float(os.getenv("PAYFLOW_TENANT_BURST", "0")) or 2 * TENANT_RATE
+TENANT_MAX_JOBS = int(os.getenv("PAYFLOW_TENANT_MAX_JOBS", "0"))
+MAX_TENANTS = int(os.getenv("PAYFLOW_MAX_TENANTS", "1000"))
+WORKER_HEADER = "X-PayFlow-Worker"
+# Tenant ids name directories, so they are restricted to a safe alphabet
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+# Served by any worker without a tenant quota: health, metrics, docs, worker status
+EXEMPT_PATHS = ("/", "/metrics", "/docs", "/redoc", "/openapi.json")
+EXEMPT_PREFIXES = ("/api/v1/system/",)
+
+T = TypeVar("T")
+# Every TenantScoped created, to list the tenants loaded in this worker
+_scopes: List["TenantScoped"] = []
+
+_current_tenant: ContextVar[str] = ContextVar("payflow_tenant", default=DEFAULT_TENANT)
+
+
+def current_tenant() -> str:
+    """Tenant of the request being handled (the default tenant outside requests)."""
+    return _current_tenant.get()
+
+
+@contextmanager
+def use_tenant(tenant: str) -> Iterator[str]:
+    """Act as ``tenant`` inside the block."""
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def valid_tenant(tenant: str) -> bool:
+    """Whether ``tenant`` is a usable tenant id."""
+    return bool(TENANT_PATTERN.match(tenant))
+
+
+def tenant_data_dir(tenant: str, *parts: str) -> str:
+    """
+    Resolve (and create) a directory of a tenant's files.
+
+    Returns:
+        str: ``<data dir>/<parts>`` for the default tenant,
+        ``<data dir>/tenants/<tenant>/<parts>`` for the others
+    """
+    if tenant == DEFAULT_TENANT:
+        return get_data_dir(*parts)
+    return get_data_dir("tenants", tenant, *parts)
+
+
+class TenantScoped(Generic[T]):
+    """
+    One instance per tenant, created by ``factory(tenant)`` on first use.
+
+    Args:
+        factory: Builds the instance of a tenant
+    """
+
+    def __init__(self, factory: Callable[[str], T]):
+        self.factory = factory
+        self._instances: Dict[str, T] = {}
+        # Reentrant, so a factory may look up other tenant-scoped instances
+        self._lock = threading.RLock()
+        _scopes.append(self)
+
+    def get(self, tenant: Optional[str] = None) -> T:
+        """Instance of ``tenant`` (default: the current tenant)."""
+        tenant = tenant or current_tenant()
+        instance = self._instances.get(tenant)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(tenant)
+                if instance is None:
+                    instance = self._instances[tenant] = self.factory(tenant)
+        return instance
+
+    def loaded(self) -> Dict[str, T]:
+        """Instances created so far, by tenant."""
+        return dict(self._instances)
+
+
+def loaded_tenants() -> List[str]:
+    """Tenants with any shard loaded in this worker."""
+    return sorted({tenant for scope in _scopes for tenant in scope.loaded()})
+
+
+class TokenBucket:
+    """Allows ``rate`` events per second on average and ``burst`` at once."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take a token.
+
+        Returns:
+            0 when one was available, else seconds until one will be
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class TenantRateLimiter:
+    """
+    A token bucket per tenant. Used from the event loop thread only, so
+    buckets need no lock.
+    """
+
+    def __init__(self, rate: float = TENANT_RATE, burst: float = TENANT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.throttled: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, tenant: str) -> float:
+        """0 when ``tenant`` may proceed, else seconds it should wait."""
+        if not self.enabled:
+            return 0.0
+        bucket = self._buckets.get(tenant)
+        if bucket is None:
+            bucket = self._buckets[tenant] = TokenBucket(self.rate, self.burst)
+        wait = bucket.take()
+        if wait:
+            self.throttled[tenant] = self.throttled.get(tenant, 0) + 1
+        return wait
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "throttled": dict(sorted(self.throttled.items()))
+        }
+
+
+class TenantRegistry:
+    """
+    Decides which tenant ids are served.
+
+    With ``allowed``, exactly those (and the default tenant); otherwise
+    any id until ``max_tenants`` are known, where tenants with a data
+    directory count as known. Used from the event loop thread only.
+
+    Args:
+        allowed: Tenants served, or None to admit new ones
+        max_tenants: Cap on known tenants without ``allowed``; 0 disables
+    """
+
+    def __init__(self, allowed: Optional[List[str]] = None, max_tenants: int = MAX_TENANTS):
+        self.allowed = None if allowed is None else set(allowed) | {DEFAULT_TENANT}
+        self.max_tenants = max_tenants
+        self._known: Optional[Set[str]] = None
+
+    @classmethod
+    def from_env(cls) -> "TenantRegistry":
+        """Build a registry from PAYFLOW_TENANTS and PAYFLOW_MAX_TENANTS."""
+        value = os.getenv("PAYFLOW_TENANTS", "")
+        allowed = [t.strip() for t in value.split(",") if t.strip()] if value.strip() else None
+        return cls(allowed)
+
+    def _load_known(self) -> Set[str]:
+        root = get_data_dir("tenants")
+        on_disk = {name for name in os.listdir(root) if valid_tenant(name) and os.path.isdir(os.path.join(root, name))}
+        return on_disk | {DEFAULT_TENANT}
+
+    def admit(self, tenant: str) -> bool:
+        """Whether ``tenant`` is served, registering it if it is new and fits."""
+        if self.allowed is not None:
+            return tenant in self.allowed
+        if self._known is None:
+            self._known = self._load_known()
+        if tenant in self._known:
+            return True
+        if self.max_tenants and len(self._known) >= self.max_tenants:
+            return False
+        self._known.add(tenant)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "allowed": None if self.allowed is None else sorted(self.allowed),
+            "known": None if self._known is None else len(self._known),
+            "max_tenants": self.max_tenants
+        }
+
+
+def _parse_pins(value: str) -> Dict[str, str]:
+    pins = {}
+    for pair in filter(None, (item.strip() for item in value.split(","))):
+        tenant, sep, worker = pair.partition("=")
+        if not sep or not tenant.strip() or not worker.strip():
+            raise ValueError(f"PAYFLOW_TENANT_PINS entries must be tenant=worker, got {pair!r}")
+        pins[tenant.strip()] = worker.strip()
+    return pins
+
+
+def rendezvous_owner(tenant: str, workers: List[str]) -> str:
+    """Worker with the highest hash of (worker, tenant)."""
+    return max(workers, key=lambda worker: hashlib.blake2b(
+        f"{worker}|{tenant}".encode(), digest_size=8
+    ).digest())
+
+
+class TenantRouter:
+    """
+    Maps tenants to the worker process that owns them.
+
+    Args:
+        workers: Names of all workers; empty means one worker serves everyone
+        worker_id: This worker's name
+        pins: Tenants assigned to a worker explicitly, e.g. the hot ones
+    """
+
+    def __init__(
+        self,
+        workers: Optional[List[str]] = None,
+        worker_id: Optional[str] = None,
+        pins: Optional[Dict[str, str]] = None
+    ):
+        self.workers = list(workers or [])
+        self.worker_id = worker_id
+        self.pins = dict(pins or {})
+        unknown = sorted(set(self.pins.values()) - set(self.workers))
+        if unknown:
+            raise ValueError(f"Tenants pinned to workers not in PAYFLOW_WORKERS: {', '.join(unknown)}")
+        if self.workers and worker_id is not None and worker_id not in self.workers:
+            raise ValueError(f"PAYFLOW_WORKER_ID {worker_id!r} is not in PAYFLOW_WORKERS")
+        # Unpinned tenants are spread over the workers nobody is pinned to
+        self.shared = [w for w in self.workers if w not in self.pins.values()] or self.workers
+
+    @classmethod
+    def from_env(cls) -> "TenantRouter":
+        """Build a router from PAYFLOW_WORKERS, PAYFLOW_WORKER_ID and PAYFLOW_TENANT_PINS."""
+        workers = [w.strip() for w in os.getenv("PAYFLOW_WORKERS", "").split(",") if w.strip()]
+        return cls(workers, os.getenv("PAYFLOW_WORKER_ID") or None, _parse_pins(os.getenv("PAYFLOW_TENANT_PINS", "")))
+
+    def owner(self, tenant: str) -> Optional[str]:
+        """Worker owning ``tenant``, or None without a worker list."""
+        if not self.workers:
+            return None
+        return self.pins.get(tenant) or rendezvous_owner(tenant, self.shared)
+
+    def is_local(self, tenant: str) -> bool:
+        """Whether this worker serves ``tenant``."""
+        owner = self.owner(tenant)
+        return owner is None or self.worker_id is None or owner == self.worker_id
+
+    def status(self) -> Dict[str, Any]:
+        return {"worker_id": self.worker_id, "workers": self.workers, "shared": self.shared, "pins": self.pins}
+
+
+def _exempt(path: str) -> bool:
+    return path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES)
+
+
+class TenantMiddleware:
+    """
+    ASGI middleware resolving the tenant of each request, refusing
+    unknown tenants and enforcing worker affinity and the tenant's
+    request rate.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        limiter: Optional[TenantRateLimiter] = None,
+        router: Optional[TenantRouter] = None,
+        registry: Optional[TenantRegistry] = None
+    ):
+        self.app = app
+        self.limiter = limiter or get_tenant_rate_limiter()
+        self.router = router or get_tenant_router()
+        self.registry = registry or get_tenant_registry()
+        self.rejected = get_metrics().counter(
+            "payflow_tenant_rejected_total", "Requests turned away by tenant quota, affinity or an unknown id",
+            labels=("tenant", "reason")
+        )
+        self._header = TENANT_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw = next((value for name, value in scope["headers"] if name == self._header), None)
+        tenant = raw.decode("latin-1").strip() if raw else DEFAULT_TENANT
+        if not valid_tenant(tenant):
+            response = JSONResponse(
+                {"detail": f"{TENANT_HEADER} must be 1-64 letters, digits, '.', '_' or '-'"},
+                status_code=400
+            )
+            await response(scope, receive, send)
+            return
+        if not self.registry.admit(tenant):
+            # Not labelled with the id itself, which would be unbounded
+            self.rejected.inc("", "unknown")
+            response = JSONResponse({"detail": "Unknown employer"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        if not _exempt(scope["path"]):
+            if not self.router.is_local(tenant):
+                self.rejected.inc(tenant, "misdirected")
+                response = JSONResponse(
+                    {"detail": "Tenant is served by another worker"},
+                    status_code=421,
+                    headers={WORKER_HEADER: self.router.owner(tenant)}
+                )
+                await response(scope, receive, send)
+                return
+            wait = self.limiter.check(tenant)
+            if wait:
+                self.rejected.inc(tenant, "rate")
+                response = JSONResponse(
+                    {"detail": "Request rate quota exceeded for this employer"},
+                    status_code=429,
+                    headers={"Retry-After": str(max(math.ceil(wait), 1))}
+                )
+                await response(scope, receive, send)
+                return
+
+        with use_tenant(tenant):
+            await self.app(scope, receive, send)
+
+
+# Singleton instance
+_tenant_rate_limiter = None
+
+def get_tenant_rate_limiter() -> TenantRateLimiter:
+    """Get or create the per-tenant rate limiter configured from the environment"""
+    global _tenant_rate_limiter
+    if _tenant_rate_limiter is None:
+        _tenant_rate_limiter = TenantRateLimiter()
+    return _tenant_rate_limiter
+
+
+# Singleton instance
+_tenant_registry = None
+
+def get_tenant_registry() -> TenantRegistry:
+    """Get or create the registry of served tenants configured from the environment"""
+    global _tenant_registry
+    if _tenant_registry is None:
+        _tenant_registry = TenantRegistry.from_env()
+    return _tenant_registry
+
+
+# Singleton instance
+_tenant_router = None
+
+def get_tenant_router() -> TenantRouter:
+    """Get or create the tenant router configured from the environment"""
+    global _tenant_router
+    if _tenant_router is None:
+        _tenant_router = TenantRouter.from_env()
+    return _tenant_router
@@ -0,0 +1,356 @@
+"""
+Payroll Validation Engine for PayFlow
+
+Rule-based checks over a whole payroll at once. Every rule works on
+columns (pandas or Arrow-backed), never row by row, so a million-row
+upload validates in a few seconds:
+
+- Schema: required columns (employee_id, salary, hire_date) are present
+- employee_id: present, and unique (hash-based ``duplicated``)
+- salary: numeric and positive; outliers flagged by z-score or by the
+  interquartile-range fences
+- hire_date: parseable, not in the future, not implausibly old
+
+Only the flagged rows are sampled for the AI layer
+(``AIService.validate_csv``); clean rows never leave this module. Large
+files can be checked chunk by chunk, merging the reports with
+``merge_report``.
+
+Environment Variables:
+- PAYFLOW_VALIDATION_ZSCORE: |z| above which a salary is an outlier (default 3.5)
+- PAYFLOW_VALIDATION_IQR: IQR multiple beyond the quartiles for outliers (default 3.0)
+- PAYFLOW_VALIDATION_MAX_ISSUES: Issues listed per rule; counts are always exact (default 100)
+"""
+
+from datetime import date
+from typing import Dict, List, Any, Optional, Tuple
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.services.ingest import CSV_CHUNK_ROWS
+from app.services.metrics import span, timed_iter
+
+REQUIRED_COLUMNS = ("employee_id", "salary", "hire_date")
+RECOMMENDED_COLUMNS = ("department",)
+EARLIEST_HIRE_DATE = pd.Timestamp("1950-01-01")
+ZSCORE_THRESHOLD = float(os.getenv("PAYFLOW_VALIDATION_ZSCORE", "3.5"))
+IQR_FACTOR = float(os.getenv("PAYFLOW_VALIDATION_IQR", "3.0"))
+MAX_ISSUES = int(os.getenv("PAYFLOW_VALIDATION_MAX_ISSUES", "100"))
+FLAGGED_SAMPLE_ROWS = 50
+
+
+class _Report:
+    """Accumulates issues per rule, listing at most ``max_issues`` of each."""
+
+    def __init__(self, rows: int, max_issues: int, row_numbers: Optional[np.ndarray] = None):
+        self.flagged = np.zeros(rows, dtype=bool)
+        self.row_numbers = row_numbers if row_numbers is not None else np.arange(1, rows + 1)
+        self.max_issues = max_issues
+        self.errors: List[Dict[str, Any]] = []
+        self.warnings: List[Dict[str, Any]] = []
+        self.counts: Dict[str, int] = {}
+
+    def add(
+        self,
+        rule: str,
+        mask: np.ndarray,
+        column: str,
+        message: str,
+        severity: str = "error",
+        values: Optional[pd.Series] = None
+    ) -> None:
+        """
+        Record the rows where ``mask`` is set.
+
+        ``message`` may contain ``{value}``, filled from ``values`` for the
+        listed rows only.
+        """
+        positions = np.flatnonzero(mask)
+        self.counts[rule] = len(positions)
+        if not len(positions):
+            return
+        self.flagged[positions] = True
+        issues = self.errors if severity == "error" else self.warnings
+        for position in positions[:self.max_issues].tolist():
+            value = values.iat[position] if values is not None else None
+            if isinstance(value, pd.Timestamp):
+                value = value.date().isoformat()
+            issues.append({
+                "row": int(self.row_numbers[position]),
+                "column": column,
+                "message": message.format(value=value),
+                "severity": severity
+            })
+
+
+def _sample(report: _Report, frame: pd.DataFrame, limit: int) -> List[Dict[str, Any]]:
+    """Flagged rows as JSON-safe records, each tagged with its row number."""
+    positions = np.flatnonzero(report.flagged)[:limit]
+    sample = frame.iloc[positions].astype(object)
+    sample = sample.where(sample.notna(), None)
+    records = sample.to_dict("records")
+    for position, record in zip(positions.tolist(), records):
+        record["row"] = int(report.row_numbers[position])
+    return records
+
+
+def validate_payroll(
+    frame: pd.DataFrame,
+    as_of: Optional[date] = None,
+    max_issues: int = MAX_ISSUES,
+    sample_rows: int = FLAGGED_SAMPLE_ROWS,
+    row_numbers: Optional[np.ndarray] = None,
+    reference: Optional[pd.DataFrame] = None,
+    repeated: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Validate a payroll frame.
+
+    Args:
+        frame: Parsed payroll CSV (column names already stripped)
+        as_of: Date hire dates may not exceed (default today)
+        max_issues: Issues listed per rule
+        sample_rows: Flagged rows included for AI review
+        row_numbers: Row number reported for each row of ``frame``
+            (default: 1-based data rows, header excluded); lets a subset
+            of an upload report the rows' places in the full file
+        reference: Frame whose salaries define what counts as an outlier
+            (default: ``frame`` itself)
+        repeated: Per row, whether its employee_id occurs more than once
+            in the whole upload (default: checked within ``frame``)
+
+    Returns:
+        Dictionary with is_valid, rows, errors, warnings, suggestions,
+        per-rule counts, flagged_rows and flagged_sample
+    """
+    report = _Report(len(frame), max_issues, row_numbers)
+    suggestions: List[str] = []
+
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    for column in missing:
+        report.errors.append({
+            "row": None,
+            "column": column,
+            "message": f"Required column '{column}' is missing.",
+            "severity": "error"
+        })
+    report.counts["missing_columns"] = len(missing)
+    for column in RECOMMENDED_COLUMNS:
+        if column not in frame.columns:
+            suggestions.append(f"Consider adding '{column}' column for better analytics")
+
+    if "employee_id" in frame.columns:
+        ids = frame["employee_id"]
+        blank = (ids.isna() | (ids == "")).to_numpy(dtype=bool)
+        report.add("missing_employee_id", blank, "employee_id", "Employee ID is missing.")
+        if repeated is None:
+            duplicated = (ids.duplicated(keep=False) & ~blank).to_numpy(dtype=bool)
+        else:
+            duplicated = repeated & ~blank
+        report.add(
+            "duplicate_employee_id", duplicated, "employee_id",
+            "Employee ID {value} appears more than once.", values=ids
+        )
+
+    if "salary" in frame.columns:
+        raw = frame["salary"]
+        salary = pd.to_numeric(raw, errors="coerce")
+        present = raw.notna().to_numpy(dtype=bool)
+        numeric = salary.notna().to_numpy(dtype=bool)
+        report.add("missing_salary", ~present, "salary", "Salary is missing.")
+        report.add(
+            "invalid_salary", present & ~numeric, "salary",
+            "Salary '{value}' is not a number.", values=raw
+        )
+        values = salary.to_numpy(dtype="float64", na_value=np.nan)
+        report.add(
+            "non_positive_salary", numeric & (values <= 0), "salary",
+            "Salary of ₱{value:,.2f} must be greater than zero.", values=salary
+        )
+
+        if reference is not None and "salary" in reference.columns:
+            baseline = pd.to_numeric(reference["salary"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            baseline = values
+        positive = baseline[baseline > 0]
+        report.counts["salary_outlier"] = 0
+        if len(positive) >= 4:
+            mean, std = positive.mean(), positive.std()
+            q1, q3 = np.percentile(positive, [25, 75])
+            low, high = q1 - IQR_FACTOR * (q3 - q1), q3 + IQR_FACTOR * (q3 - q1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                zscore = np.abs(values - mean) / std if std else np.zeros_like(values)
+                outlier = numeric & (values > 0) & ((zscore > ZSCORE_THRESHOLD) | (values < low) | (values > high))
+            report.add(
+                "salary_outlier", outlier, "salary",
+                "Salary of ₱{value:,.2f} is far from the payroll average "
+                f"(₱{mean:,.2f}). Please verify.",
+                severity="warning", values=salary
+            )
+
+    if "hire_date" in frame.columns:
+        raw = frame["hire_date"]
+        hired = pd.to_datetime(raw, errors="coerce", format="ISO8601")
+        present = raw.notna().to_numpy(dtype=bool)
+        parsed = hired.notna().to_numpy(dtype=bool)
+        if (present & ~parsed).any() and not pd.api.types.is_datetime64_any_dtype(raw):
+            # Retry only the failures with padding removed; stripping every value costs more
+            retry = present & ~parsed
+            hired[retry] = pd.to_datetime(
+                raw[retry].astype(str).str.strip(), errors="coerce", format="ISO8601"
+            )
+            parsed = hired.notna().to_numpy(dtype=bool)
+        report.add(
+            "invalid_hire_date", present & ~parsed, "hire_date",
+            "Hire date '{value}' is not a valid date.", values=raw
+        )
+        if (present & ~parsed).any():
+            suggestions.append("Date format should be YYYY-MM-DD for consistency")
+        limit = pd.Timestamp(as_of or date.today())
+        report.add(
+            "future_hire_date", (hired > limit).to_numpy(dtype=bool), "hire_date",
+            "Hire date {value} is in the future.", values=raw
+        )
+        report.add(
+            "early_hire_date", (hired < EARLIEST_HIRE_DATE).to_numpy(dtype=bool), "hire_date",
+            "Hire date {value} is implausibly early.", severity="warning", values=raw
+        )
+
+    error_rules = sum(
+        count for rule, count in report.counts.items()
+        if rule not in ("salary_outlier", "early_hire_date")
+    )
+    return {
+        "is_valid": error_rules == 0,
+        "rows": len(frame),
+        "errors": report.errors,
+        "warnings": report.warnings,
+        "suggestions": suggestions,
+        "counts": report.counts,
+        "flagged_rows": int(report.flagged.sum()),
+        "flagged_sample": _sample(report, frame, sample_rows)
+    }
+
+
+def validate_csv_file(path: str, as_of: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Read a payroll CSV and validate it.
+
+    Module-level so it can run on the job executor, including process
+    pools. All columns are read as text and typed by the rules, so one
+    bad value does not change how the rest of its column is checked.
+    """
+    with span("read_csv"):
+        frame = pd.read_csv(path, dtype=str, skipinitialspace=True)
+    frame.columns = frame.columns.str.strip()
+    return validate_payroll(frame, as_of)
+
+
+def delta_positions(employees: pd.DataFrame, delta_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rows of an upload to validate: the added and changed employees, plus
+    every row with a missing or repeated ID, which the diff cannot show
+    (it keys rows by ID, the last one winning).
+
+    Args:
+        employees: Employee-schema frame of the upload
+        delta_ids: Added and changed employee IDs (see ``PayrollDiff``)
+
+    Returns:
+        (sorted row positions, whether each of those rows has a repeated ID)
+    """
+    ids = employees["employee_id"]
+    text = ids.astype(str)
+    blank = ids.isna() | (text.str.strip() == "")
+    repeated = (ids.duplicated(keep=False) & ~blank).to_numpy()
+    positions = np.flatnonzero(text.isin(delta_ids).to_numpy() | blank.to_numpy() | repeated)
+    return positions, repeated[positions]
+
+
+def validate_delta(
+    path: str,
+    positions: np.ndarray,
+    as_of: Optional[date] = None,
+    repeated: Optional[np.ndarray] = None,
+    salaries: Optional[np.ndarray] = None,
+    chunk_rows: int = CSV_CHUNK_ROWS
+) -> Dict[str, Any]:
+    """
+    Validate only the rows of an uploaded CSV that changed since the last upload.
+
+    The file is read back as text, like ``validate_csv_file``, so a salary
+    or hire date that the employee mapping would coerce to missing is
+    reported as invalid. It is read in chunks of the checked columns and
+    only the selected rows of each chunk are validated, so memory stays
+    bounded even when every row changed.
+
+    Args:
+        path: The uploaded CSV
+        positions: Sorted data row positions to check (see ``delta_positions``)
+        as_of: Date hire dates may not exceed (default today)
+        repeated: Per position, whether its ID occurs more than once in
+            the whole upload (default: checked within each chunk)
+        salaries: Every salary of the upload, defining outliers (default:
+            each chunk's own)
+        chunk_rows: Rows read per chunk
+
+    Returns:
+        Merged ``validate_payroll`` result without the AI sample; row
+        numbers refer to the full upload
+    """
+    checked = set(REQUIRED_COLUMNS + RECOMMENDED_COLUMNS)
+    reference = None if salaries is None else pd.DataFrame({"salary": salaries})
+    total = empty_report()
+    start = 0
+    with pd.read_csv(
+        path, dtype=str, skipinitialspace=True, usecols=lambda c: c.strip() in checked, chunksize=chunk_rows
+    ) as reader:
+        for chunk in timed_iter(reader, "read_csv"):
+            lo, hi = np.searchsorted(positions, (start, start + len(chunk)))
+            # The first chunk is always checked, for the schema rules
+            if hi > lo or not start:
+                chunk.columns = chunk.columns.str.strip()
+                rows = positions[lo:hi]
+                report = validate_payroll(
+                    chunk.iloc[rows - start], as_of,
+                    sample_rows=0,
+                    row_numbers=rows + 1,
+                    reference=chunk if reference is None else reference,
+                    repeated=None if repeated is None else repeated[lo:hi]
+                )
+                merge_report(total, report)
+            start += len(chunk)
+    return total
+
+
+def empty_report() -> Dict[str, Any]:
+    """A passing report over no rows, to ``merge_report`` chunk reports into."""
+    return {
+        "is_valid": True, "rows": 0, "errors": [], "warnings": [], "suggestions": [], "counts": {},
+        "flagged_rows": 0
+    }
+
+
+def merge_report(total: Dict[str, Any], report: Dict[str, Any], max_issues: int = MAX_ISSUES) -> None:
+    """
+    Add one chunk's ``validate_payroll`` report to ``total``.
+
+    Counts add up; at most ``max_issues`` errors and warnings are listed.
+    """
+    for rule, count in report["counts"].items():
+        # Every chunk reports the same missing columns
+        merge = max if rule == "missing_columns" else int.__add__
+        total["counts"][rule] = merge(total["counts"].get(rule, 0), count)
+    for key in ("errors", "warnings"):
+        for issue in report[key]:
+            if len(total[key]) >= max_issues:
+                break
+            if issue["row"] is None and issue in total[key]:
+                continue
+            total[key].append(issue)
+    total["suggestions"].extend(s for s in report["suggestions"] if s not in total["suggestions"])
+    total["rows"] += report["rows"]
+    total["flagged_rows"] += report["flagged_rows"]
+    total["is_valid"] = total["is_valid"] and report["is_valid"]
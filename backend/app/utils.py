@@ -1,8 +1,40 @@
-"""Utility functions for PayFlow backend."""
+"""
+Utility functions for PayFlow backend.
+
+Environment Variables:
+- PAYFLOW_LAN_IP_TTL: Seconds a detected LAN IP is reused (default: 300, 0 to detect every call)
+"""
+from typing import Optional, Tuple
+import os
 import socket
+import tempfile
+import time
+
+LAN_IP_TTL = float(os.getenv("PAYFLOW_LAN_IP_TTL", "300"))
+
+# (expires at, address) of the last successful detection
+_lan_ip: Optional[Tuple[float, str]] = None
 
 
 def get_lan_ip() -> str:
+    """
+    Get the machine's LAN IP address, re-detected every ``LAN_IP_TTL`` seconds.
+    
+    Returns:
+        str: The LAN IP address (e.g., "192.168.1.45")
+    """
+    global _lan_ip
+    now = time.monotonic()
+    if _lan_ip is not None and now < _lan_ip[0]:
+        return _lan_ip[1]
+    lan_ip = detect_lan_ip()
+    # A failed detection falls back to localhost; retry it on the next call
+    if lan_ip != "127.0.0.1":
+        _lan_ip = (now + LAN_IP_TTL, lan_ip)
+    return lan_ip
+
+
+def detect_lan_ip() -> str:
     """
     Detect the machine's true LAN IP address.
     
@@ -26,3 +58,20 @@ def get_lan_ip() -> str:
         # Fallback to localhost if something goes wrong
         print(f"Error detecting LAN IP: {e}")
         return "127.0.0.1"
+
+
+def get_data_dir(*parts: str) -> str:
+    """
+    Resolve (and create) a directory under the PayFlow data root.
+    
+    The root is ``PAYFLOW_DATA_DIR`` or ``<system temp>/payflow``; the
+    temp default keeps serverless deployments, where only /tmp is
+    writable, working without configuration.
+    
+    Returns:
+        str: Absolute path of the directory
+    """
+    root = os.getenv("PAYFLOW_DATA_DIR") or os.path.join(tempfile.gettempdir(), "payflow")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
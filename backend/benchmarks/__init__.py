@@ -0,0 +1,6 @@
+"""
+Benchmarks for the PayFlow backend.
+
+Run modules from ``backend/`` with ``python -m``. ``python -m benchmarks``
+runs a whole suite and compares results between commits.
+"""
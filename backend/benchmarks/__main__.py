@@ -0,0 +1,257 @@
+"""
+Benchmark suite runner.
+
+``run`` executes a suite of benchmark modules, each in a fresh
+interpreter, and writes their results to one JSON file together with the
+git commit and a description of the machine. ``compare`` reads two such
+files (say, from the parent commit and from a branch) and lists every
+timing, latency, throughput and memory figure that moved by more than a
+threshold; it exits with status 1 when any got worse, so it can gate a
+change. Results are only comparable from the same machine, and repeated
+runs of one commit typically differ by 5-15%, hence the 20% default.
+
+Usage:
+    python -m benchmarks run --suite quick --out results/$(git rev-parse --short HEAD).json
+    python -m benchmarks compare results/base.json results/head.json --threshold 0.2
+    python -m benchmarks list
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._util import BACKEND_DIR
+
+# suite -> benchmark module -> arguments; "full" uses each module's defaults
+SUITES: Dict[str, Dict[str, List[str]]] = {
+    "quick": {
+        "bench_upload": ["--rows", "10000,200000"],
+        "bench_validation": ["--rows", "200000"],
+        "bench_ewa": ["--employees", "200000"],
+        "bench_paging": ["--employees", "200000"],
+        "bench_serialization": ["--employees", "200000", "--repeat", "5"],
+        "bench_diff": ["--employees", "200000"],
+        "bench_snapshot": ["--rows", "200000"],
+        "bench_insights": ["--events", "100000", "--employees", "20000"],
+        "bench_forecast": ["--employers", "500", "--workers", "1"],
+        "bench_ledger": ["--employees", "5000", "--withdrawals", "5000"],
+        "bench_chat_cache": [],
+        "bench_batching": ["--requests", "1000"],
+        "bench_ai_client": ["--requests", "200"],
+        "bench_streaming": ["--requests", "50"],
+        "bench_load": ["--rows", "50000", "--seconds", "10"],
+        "bench_importtime": ["--repeat", "3"]
+    },
+    "full": {
+        name: [] for name in (
+            "bench_upload", "bench_validation", "bench_ewa", "bench_paging", "bench_serialization", "bench_diff",
+            "bench_snapshot", "bench_insights", "bench_forecast", "bench_ledger",
+            "bench_chat_cache", "bench_batching", "bench_ai_client", "bench_streaming",
+            "bench_concurrency", "bench_metrics", "bench_load", "bench_tenants", "bench_importtime"
+        )
+    }
+}
+# Suffixes of figures where lower is better / higher is better; others are ignored,
+# as are single worst cases, which are too noisy to compare
+NOISY = ("max_ms",)
+LOWER_IS_BETTER = ("_ms", "_seconds", "_mb", "seconds")
+HIGHER_IS_BETTER = ("per_second", "speedup", "hit_rate")
+# Settings recorded with results, except credentials
+SECRET_SUFFIXES = ("_KEY", "_URL", "_TOKEN", "_SECRET", "_PASSWORD")
+# Fields that name an entry of a result list, e.g. one executor kind or file size
+ENTRY_KEYS = ("benchmark", "mode", "executor", "kind", "endpoint", "per_page", "rows", "employees", "events")
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _cpu_model() -> Optional[str]:
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def environment() -> Dict[str, Any]:
+    """Commit and machine the results were measured on."""
+    import numpy
+    import pandas
+
+    status = _git("status", "--porcelain")
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu": _cpu_model(),
+        "cpus": os.cpu_count(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+        "payflow_env": {
+            k: v for k, v in sorted(os.environ.items())
+            if k.startswith(("PAYFLOW_", "AI_")) and not k.endswith(SECRET_SUFFIXES)
+        }
+    }
+
+
+def run_benchmark(name: str, args: List[str]) -> Dict[str, Any]:
+    """Run one benchmark module in a fresh interpreter and read its ``--out`` file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "result.json")
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-m", f"benchmarks.{name}", *args, "--out", out],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True
+        )
+        seconds = round(time.perf_counter() - start, 1)
+        if completed.returncode != 0:
+            return {"benchmark": name, "args": args, "seconds": seconds, "error": completed.stderr.strip()[-2000:]}
+        with open(out) as handle:
+            return {"benchmark": name, "args": args, "seconds": seconds, "results": json.load(handle)}
+
+
+def run(suite: str, only: Optional[List[str]], out: Optional[str]) -> Dict[str, Any]:
+    benchmarks = {name: args for name, args in SUITES[suite].items() if not only or name in only}
+    report = {"suite": suite, "environment": environment(), "benchmarks": []}
+    for name, args in benchmarks.items():
+        print(f"{name} {' '.join(args)}".rstrip(), file=sys.stderr, flush=True)
+        result = run_benchmark(name, args)
+        report["benchmarks"].append(result)
+        print(f"  {'failed' if 'error' in result else 'done'} in {result['seconds']}s", file=sys.stderr, flush=True)
+        if out:
+            # Written after every benchmark, so an interrupted run keeps what finished
+            os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+            with open(out, "w") as handle:
+                json.dump(report, handle, indent=2)
+    return report
+
+
+def _entry_name(entry: Dict[str, Any], index: int) -> str:
+    for key in ENTRY_KEYS:
+        if key in entry and not isinstance(entry[key], (dict, list)):
+            return f"{key}={entry[key]}"
+    return str(index)
+
+
+def figures(value: Any, path: str = "") -> Iterator[Tuple[str, float]]:
+    """Every numeric leaf of a result, keyed by a readable path."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key not in ("args", "error", "environment"):
+                yield from figures(item, f"{path}.{key}" if path else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            name = _entry_name(item, index) if isinstance(item, dict) else str(index)
+            yield from figures(item, f"{path}[{name}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, float(value)
+
+
+def _direction(path: str) -> int:
+    """-1 when lower is better, 1 when higher is better, 0 when neither."""
+    leaf = path.rsplit(".", 1)[-1]
+    if leaf in NOISY:
+        return 0
+    if leaf.endswith(HIGHER_IS_BETTER):
+        return 1
+    if leaf.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float, floor: float) -> Dict[str, Any]:
+    """
+    Figures that changed by more than ``threshold`` (relative) between
+    two reports. Timings below ``floor`` (in their own unit) in both are
+    skipped as noise.
+    """
+    before = dict(figures(base["benchmarks"]))
+    after = dict(figures(head["benchmarks"]))
+    regressions, improvements = [], []
+    for path in sorted(before.keys() & after.keys()):
+        direction = _direction(path)
+        old, new = before[path], after[path]
+        if direction == 0 or old == new or max(abs(old), abs(new)) < floor:
+            continue
+        change = (new - old) / abs(old) if old else float("inf")
+        if abs(change) <= threshold:
+            continue
+        entry = {"figure": path, "base": old, "head": new, "change": round(change, 3)}
+        (improvements if change * direction > 0 else regressions).append(entry)
+    return {
+        "base": base["environment"].get("commit"),
+        "head": head["environment"].get("commit"),
+        "same_machine": base["environment"].get("cpu") == head["environment"].get("cpu"),
+        "threshold": threshold,
+        "regressions": regressions,
+        "improvements": improvements,
+        "only_in_base": sorted(before.keys() - after.keys()),
+        "only_in_head": sorted(after.keys() - before.keys())
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="PayFlow benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run a suite and write its results")
+    run_parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    run_parser.add_argument("--only", help="Comma-separated benchmark modules to run from the suite")
+    run_parser.add_argument("--out")
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="Relative change reported (default 0.2)")
+    compare_parser.add_argument("--floor", type=float, default=0.5, help="Ignore figures below this in both runs")
+    compare_parser.add_argument("--out")
+    commands.add_parser("list", help="List suites and their benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for suite, benchmarks in SUITES.items():
+            print(f"{suite}:")
+            for name, bench_args in benchmarks.items():
+                print(f"  {name} {' '.join(bench_args)}".rstrip())
+        return
+    if args.command == "run":
+        report = run(args.suite, args.only.split(",") if args.only else None, args.out)
+        failed = [b["benchmark"] for b in report["benchmarks"] if "error" in b]
+        print(json.dumps(report, indent=2))
+        if failed:
+            sys.exit(f"failed: {', '.join(failed)}")
+        return
+
+    with open(args.base) as handle:
+        base = json.load(handle)
+    with open(args.head) as handle:
+        head = json.load(handle)
+    result = compare(base, head, args.threshold, args.floor)
+    payload = json.dumps(result, indent=2)
+    print(payload)
+    if args.out:
+        with open(args.out, "w") as handle:
+            handle.write(payload + "\n")
+    if result["regressions"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Shared helpers for PayFlow benchmarks."""
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process in MiB.
+
+    Prefers ``VmHWM`` from /proc, which starts fresh in every exec'd
+    process; ``ru_maxrss`` carries the parent's peak across fork + exec.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Linux reports KiB, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+
+def rss_breakdown_mb() -> Dict[str, float]:
+    """
+    Current resident memory split into private (anonymous) pages and
+    file-backed pages, in MiB. File-backed pages of a memory-mapped file
+    are shared by every process mapping it. Empty where /proc is missing.
+    """
+    fields = {"RssAnon:": "anon_rss_mb", "RssFile:": "file_rss_mb"}
+    breakdown: Dict[str, float] = {}
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                key = line.split(maxsplit=1)[0] if line.strip() else ""
+                if key in fields:
+                    breakdown[fields[key]] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return breakdown
+
+
+class Timer:
+    """Context manager measuring wall-clock seconds."""
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.seconds = time.perf_counter() - self.start
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (``q`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of a list of latencies, reported in milliseconds."""
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 50) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 95) * 1000, 2),
+        "p99_ms": round(percentile(seconds, 99) * 1000, 2),
+        "max_ms": round(max(seconds, default=0.0) * 1000, 2)
+    }
+
+
+def run_isolated(
+    module: str,
+    *args: str,
+    env: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Run a benchmark worker in a fresh interpreter.
+
+    Peak RSS is per process, so each measurement gets its own process.
+    The worker must print a JSON object as its last line of output.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-m", module, *args],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, **(env or {})}
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def emit(results: List[Dict[str, Any]], out: Optional[str] = None) -> None:
+    """Print results as JSON and optionally write them to a file."""
+    payload = json.dumps(results, indent=2)
+    print(payload)
+    if out:
+        Path(out).write_text(payload + "\n")
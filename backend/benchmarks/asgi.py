@@ -0,0 +1,113 @@
+"""
+Minimal in-process ASGI client.
+
+Drives the FastAPI app directly through the ASGI interface, without a
+socket or an HTTP client library, so benchmarks measure the app itself.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import uuid
+
+
+class Response:
+    """Collected ASGI response."""
+
+    def __init__(self):
+        self.status = 0
+        self.headers: Dict[str, str] = {}
+        self.body = b""
+        self.first_byte_at: Optional[float] = None
+
+
+async def request(
+    app: Any,
+    method: str,
+    path: str,
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Send one HTTP request to ``app`` and collect the full response."""
+    path, _, query = path.partition("?")
+    raw_headers: List[Tuple[bytes, bytes]] = [
+        (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+    ]
+    raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80)
+    }
+    response = Response()
+    loop = asyncio.get_running_loop()
+    sent = False
+    done = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+            response.headers = {
+                name.decode(): value.decode() for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            if response.first_byte_at is None and message.get("body"):
+                response.first_byte_at = loop.time()
+            response.body += message.get("body", b"")
+            if not message.get("more_body"):
+                done.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    return response
+
+
+def multipart(field: str, filename: str, content: bytes) -> Tuple[bytes, str]:
+    """Encode a single-file multipart/form-data body."""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+class Lifespan:
+    """Run the app's startup and shutdown handlers around a block."""
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "Lifespan":
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self._task = asyncio.create_task(
+            self.app(scope, self._inbox.get, self._outbox.put)
+        )
+        await self._inbox.put({"type": "lifespan.startup"})
+        await self._outbox.get()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self._inbox.put({"type": "lifespan.shutdown"})
+        await self._outbox.get()
+        await self._task
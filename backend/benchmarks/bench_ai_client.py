@@ -0,0 +1,102 @@
+"""
+AI provider client benchmark against the local fake provider.
+
+Starts the fake provider in a background thread, then issues concurrent
+chat completions through AIService and reports throughput and latency.
+A second phase makes the provider fail every call to show the circuit
+breaker opening and requests falling back to mock responses.
+
+Usage:
+    python -m benchmarks.bench_ai_client --requests 500 --concurrency 50 --out ai_client.json
+"""
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+from benchmarks._util import emit, latency_summary
+
+PORT = 9765
+
+
+def _start_provider(latency_ms: float) -> Any:
+    import uvicorn
+
+    from benchmarks import fake_provider
+
+    fake_provider.settings.update(latency_ms=latency_ms, jitter_ms=latency_ms / 4, token_ms=0)
+    server = uvicorn.Server(uvicorn.Config(
+        fake_provider.app, host="127.0.0.1", port=PORT, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _phase(service: Any, requests: int, concurrency: int) -> Dict[str, Any]:
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with gate:
+            start = time.perf_counter()
+            await service.chat_completion("How much can I withdraw?", {"available": 2500})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency": latency_summary(latencies),
+        "client": service.client.status()
+    }
+
+
+async def _run(args: argparse.Namespace) -> list:
+    from app.services.ai import AIService
+    from app.services.ai_client import CircuitBreaker, ProviderClient
+    from benchmarks import fake_provider
+
+    client = ProviderClient(
+        base_url=f"http://127.0.0.1:{PORT}/v1",
+        api_key=None,
+        model="fake",
+        timeout=5.0,
+        max_concurrency=args.max_concurrency,
+        max_retries=2,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    )
+    service = AIService(client=client)
+    results = [{"phase": "healthy", **await _phase(service, args.requests, args.concurrency)}]
+
+    fake_provider.settings["error_rate"] = 1.0
+    results.append({"phase": "provider_down", **await _phase(service, args.requests, args.concurrency)})
+    await service.aclose()
+    return results
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="AI provider client benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    # Every request must reach the provider, not the chat answer cache
+    os.environ["AI_CHAT_CACHE_ENABLED"] = "false"
+    server = _start_provider(args.latency_ms)
+    try:
+        emit(asyncio.run(_run(args)), args.out)
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
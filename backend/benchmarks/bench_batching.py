@@ -0,0 +1,104 @@
+"""
+AI request micro-batching benchmark.
+
+Simulates the payday rush on the AI Insights tab: many concurrent
+employees each calling ``AIService.analyze_spending``. The provider is
+simulated with a per-call latency, a small per-employee cost and the same
+concurrency cap ``ProviderClient`` enforces, so the per-request path
+queues behind the cap while the batched path shares round trips.
+Reports throughput, latency percentiles and upstream calls for both.
+
+Usage:
+    python -m benchmarks.bench_batching --requests 5000 --clients 500 --out batching.json
+"""
+from typing import Optional
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks._util import Timer, emit, latency_summary
+
+
+class SimulatedProvider:
+    """Stands in for ProviderClient: capped concurrency, latency per call and per item."""
+
+    def __init__(self, latency_ms: float, item_ms: float, max_concurrency: int):
+        self.latency = latency_ms / 1000
+        self.item = item_ms / 1000
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.calls = 0
+
+    async def chat(self, messages: list, json_mode: bool = False, **options) -> str:
+        from app.services.ai import BATCH_MARKER
+
+        prompt = messages[-1]["content"]
+        count = 1
+        if BATCH_MARKER in prompt:
+            count = len(json.loads(prompt.split(BATCH_MARKER, 1)[1].split("\n", 1)[0]))
+        async with self._semaphore:
+            self.calls += 1
+            await asyncio.sleep(self.latency + self.item * count)
+        analysis = {"insights": [], "score": 80, "savings_potential": 0.0}
+        if BATCH_MARKER in prompt:
+            return json.dumps({"results": [analysis] * count})
+        return json.dumps(analysis)
+
+    async def aclose(self) -> None:
+        pass
+
+
+async def _run(service, requests: int, clients: int) -> tuple:
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client() -> None:
+        for i in remaining:
+            start = time.perf_counter()
+            await service.analyze_spending([], {"employee_id": f"EMP{i:06d}"})
+            latencies.append(time.perf_counter() - start)
+
+    with Timer() as timer:
+        await asyncio.gather(*(client() for _ in range(clients)))
+    return timer.seconds, latencies
+
+
+def _measure(args, batching: bool) -> dict:
+    from app.services.ai import AIService
+
+    provider = SimulatedProvider(args.latency_ms, args.item_ms, args.max_concurrency)
+    service = AIService(client=provider, batching=batching)
+    seconds, latencies = asyncio.run(_run(service, args.requests, args.clients))
+    report = service.batch_report()
+    return {
+        "mode": "batched" if batching else "per_request",
+        "requests": args.requests,
+        "clients": args.clients,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(args.requests / seconds, 1),
+        "upstream_calls": provider.calls,
+        "latency": latency_summary(latencies),
+        "batching": report["analysis"] if report else None
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="AI micro-batching benchmark")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--item-ms", type=float, default=2.0)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=20.0)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    os.environ["AI_BATCH_MAX_SIZE"] = str(args.batch_size)
+    os.environ["AI_BATCH_MAX_WAIT_MS"] = str(args.max_wait_ms)
+    emit([_measure(args, batching=False), _measure(args, batching=True)], args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+AI chat cache benchmark.
+
+Replays a skewed stream of employee questions (a few phrasings of the
+common intents plus a long tail of one-off questions) through
+``AIService.chat_completion`` and reports the cache hit rate, mean lookup
+latency, and how many upstream provider calls the cache absorbed. The
+provider is simulated with a fixed latency so misses cost what a real
+round trip would.
+
+Usage:
+    python -m benchmarks.bench_chat_cache --messages 100000 --semantic --out chat_cache.json
+"""
+from typing import Optional
+import argparse
+import asyncio
+import random
+
+from benchmarks._util import Timer, emit
+
+COMMON = [
+    "How much can I withdraw?",
+    "how much can i withdraw",
+    "Can I cash out today?",
+    "I want to withdraw my salary early",
+    "When is payday?",
+    "when's the next payday??",
+    "How much have I earned so far?",
+    "What is PayFlow?",
+    "what is payflow",
+    "What are the fees?",
+    "what are the fees"
+]
+CONTEXT = {"available": 2500.00, "earned": 8450.00, "next_payday": "2099-12-16"}
+
+
+def _workload(messages: int, tail_fraction: float, seed: int) -> list:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(COMMON))]
+    stream = []
+    for i in range(messages):
+        if rng.random() < tail_fraction:
+            stream.append(f"question number {i} about my account")
+        else:
+            stream.append(rng.choices(COMMON, weights)[0])
+    return stream
+
+
+class SimulatedProvider:
+    """Stands in for ProviderClient: fixed latency, counts calls."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    async def chat(self, messages: list, **options) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return f"answer to: {messages[-1]['content']}"
+
+    async def aclose(self) -> None:
+        pass
+
+
+async def _replay(service, stream: list) -> float:
+    with Timer() as timer:
+        for message in stream:
+            await service.chat_completion(message, CONTEXT)
+    return timer.seconds
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="AI chat cache benchmark")
+    parser.add_argument("--messages", type=int, default=5_000)
+    parser.add_argument("--tail-fraction", type=float, default=0.1)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--semantic", action="store_true")
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services.ai import AIService
+    from app.services.chat_cache import ChatCache
+
+    stream = _workload(args.messages, args.tail_fraction, seed=7)
+    provider = SimulatedProvider(args.latency_ms)
+    service = AIService(client=provider, chat_cache=ChatCache(semantic=args.semantic))
+
+    seconds = asyncio.run(_replay(service, stream))
+    emit([{
+        "messages": args.messages,
+        "semantic": args.semantic,
+        "provider_latency_ms": args.latency_ms,
+        "upstream_calls": provider.calls,
+        "seconds": round(seconds, 3),
+        "uncached_estimate_seconds": round(args.messages * provider.latency, 3),
+        "cache": service.chat_cache.report()
+    }], args.out)
+
+
+if __name__ == "__main__":
+    main()
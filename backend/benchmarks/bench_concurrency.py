@@ -0,0 +1,103 @@
+"""
+Light-endpoint latency while heavy uploads are parsing.
+
+For each executor kind the app is started in a fresh interpreter, a few
+clients upload a large CSV in a loop, and other clients poll the light
+endpoints. Reports p50/p99 latency of the light requests and how many
+uploads completed or were rejected with 503.
+
+Usage:
+    python -m benchmarks.bench_concurrency --rows 200000 --seconds 10 --out concurrency.json
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks._util import emit, latency_summary, run_isolated
+
+KINDS = ("inline", "thread", "process")
+LIGHT_PATHS = ("/", "/api/v1/employee/me", "/api/v1/system/ip")
+
+
+async def _drive(csv_bytes: bytes, seconds: float, uploaders: int, pollers: int) -> Dict[str, Any]:
+    from app.main import app
+    from benchmarks.asgi import Lifespan, multipart, request
+
+    body, content_type = multipart("file", "payroll.csv", csv_bytes)
+    deadline = time.perf_counter() + seconds
+    light: List[float] = []
+    uploads = {"ok": 0, "rejected": 0, "failed": 0}
+
+    async def uploader() -> None:
+        while time.perf_counter() < deadline:
+            response = await request(
+                app, "POST", "/api/v1/upload", body, {"content-type": content_type}
+            )
+            if response.status == 200:
+                uploads["ok"] += 1
+            elif response.status == 503:
+                uploads["rejected"] += 1
+                await asyncio.sleep(0.05)
+            else:
+                uploads["failed"] += 1
+
+    async def poller(index: int) -> None:
+        path = LIGHT_PATHS[index % len(LIGHT_PATHS)]
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await request(app, "GET", path)
+            light.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    async with Lifespan(app):
+        await asyncio.gather(
+            *(uploader() for _ in range(uploaders)),
+            *(poller(i) for i in range(pollers))
+        )
+    return {"light": latency_summary(light), "uploads": uploads}
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Executor concurrency benchmark")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--uploaders", type=int, default=4)
+    parser.add_argument("--pollers", type=int, default=8)
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--out")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        with open(args.path, "rb") as handle:
+            csv_bytes = handle.read()
+        result = asyncio.run(_drive(csv_bytes, args.seconds, args.uploaders, args.pollers))
+        result["executor"] = args.worker
+        print(json.dumps(result))
+        return
+
+    from benchmarks.synthetic import write_payroll_csv
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_payroll_csv(os.path.join(tmp, "payroll.csv"), args.rows)
+        for kind in args.kinds.split(","):
+            results.append(run_isolated(
+                "benchmarks.bench_concurrency",
+                "--worker", kind,
+                "--path", path,
+                "--seconds", str(args.seconds),
+                "--uploaders", str(args.uploaders),
+                "--pollers", str(args.pollers),
+                env={"PAYFLOW_EXECUTOR": kind}
+            ))
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Incremental payroll upload benchmark.
+
+Simulates a pay-period re-upload: the same synthetic payroll with a small
+fraction of employees changed, added and removed. Times fingerprinting
+and diffing, then compares a full store load (EWA for everyone) with an
+incremental one (EWA only for the delta) and an identical re-upload, and
+delta-only validation with validating the whole upload (both read the
+CSV back as text).
+
+Usage:
+    python -m benchmarks.bench_diff --employees 1000000 --churn 0.01 --out diff.json
+"""
+from typing import Optional
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks._util import Timer, emit
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Incremental payroll upload benchmark")
+    parser.add_argument("--employees", type=int, default=1_000_000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services.diff import PayrollDiffer
+    from app.services.employees import EmployeeStore, payroll_to_employees
+    from app.services.validation import delta_positions, validate_csv_file, validate_delta
+    from benchmarks.synthetic import payroll_chunk
+
+    rng = np.random.default_rng(7)
+    churn = max(int(args.employees * args.churn), 1)
+    previous_raw = payroll_chunk(0, args.employees, rng)
+    previous = payroll_to_employees(previous_raw)
+    current_raw = previous_raw.iloc[churn:].copy()
+    salary = current_raw.columns.get_loc("salary")
+    current_raw.iloc[:churn, salary] = pd.to_numeric(current_raw["salary"].iloc[:churn]) + 500
+    current_raw = pd.concat([current_raw, payroll_chunk(args.employees, churn, rng)], ignore_index=True)
+    current = payroll_to_employees(current_raw)
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "current.csv")
+        current_raw.to_csv(path, index=False)
+        differ = PayrollDiffer(root)
+        store = EmployeeStore(previous)
+        store.snapshot.fingerprints = differ.compare(previous).fingerprints
+
+        with Timer() as diffing:
+            diff = differ.compare(current, store.snapshot.fingerprints)
+        full_store = EmployeeStore(previous)
+        with Timer() as full_load:
+            full_store.load(current)
+        with Timer() as incremental_load:
+            store.load(current, diff=diff)
+        with Timer() as reupload:
+            same = differ.compare(current, store.snapshot.fingerprints)
+            store.load(current, diff=same)
+        with Timer() as full_validation:
+            validate_csv_file(path)
+        with Timer() as delta_validation:
+            positions, repeated = delta_positions(current, diff.delta_ids)
+            validate_delta(path, positions, None, repeated, current["salary"].to_numpy())
+
+    emit([{
+        "employees": args.employees,
+        "changes": diff.counts(),
+        "fingerprint_and_diff_seconds": round(diffing.seconds, 3),
+        "full_load_seconds": round(full_load.seconds, 3),
+        "incremental_load_seconds": round(incremental_load.seconds, 3),
+        "identical_reupload_seconds": round(reupload.seconds, 3),
+        "full_validation_seconds": round(full_validation.seconds, 3),
+        "delta_validation_seconds": round(delta_validation.seconds, 3)
+    }], args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+EWA engine benchmark: full payday recompute and incremental recompute.
+
+Builds an employee store from synthetic payroll and times a full
+recompute over every employee, then an incremental recompute of a small
+set of changed employees.
+
+Usage:
+    python -m benchmarks.bench_ewa --employees 1000000 --changed 1000 --out ewa.json
+"""
+from datetime import date
+from typing import Optional
+import argparse
+
+import numpy as np
+
+from benchmarks._util import Timer, emit, peak_rss_mb
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="EWA engine benchmark")
+    parser.add_argument("--employees", type=int, default=1_000_000)
+    parser.add_argument("--changed", type=int, default=1_000)
+    parser.add_argument("--as-of", default="2024-12-11")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services.employees import EmployeeStore, payroll_to_employees
+    from benchmarks.synthetic import payroll_chunk
+
+    rng = np.random.default_rng(7)
+    as_of = date.fromisoformat(args.as_of)
+    frame = payroll_to_employees(payroll_chunk(0, args.employees, rng))
+
+    with Timer() as load:
+        store = EmployeeStore(frame)
+    changed = store.snapshot.ids[rng.choice(args.employees, args.changed, replace=False)].tolist()
+
+    full, incremental = [], []
+    for _ in range(args.repeat):
+        with Timer() as timer:
+            store.recompute_ewa(as_of)
+        full.append(timer.seconds)
+        with Timer() as timer:
+            store.recompute_ewa(as_of, changed)
+        incremental.append(timer.seconds)
+
+    emit([{
+        "employees": args.employees,
+        "changed": args.changed,
+        "load_seconds": round(load.seconds, 3),
+        "full_recompute_ms": round(min(full) * 1000, 2),
+        "incremental_recompute_ms": round(min(incremental) * 1000, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }], args.out)
+
+
+if __name__ == "__main__":
+    main()
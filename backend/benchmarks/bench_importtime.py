@@ -0,0 +1,174 @@
+"""
+Cold start benchmark.
+
+Starts fresh interpreters the way a serverless platform does and times
+importing the app, running its startup hooks and serving the first
+request to ``/``, ``/api/v1/system/ip``, ``/api/v1/ai/chat`` and
+``/api/v1/employees``. Modes:
+
+- eager: every pandas-backed service imported up front and the ledger
+  restored at startup, as ``app.main`` did before the router split
+- lazy: the Vercel entrypoint (``api.index``), which mounts every router
+  but loads services on first use (``PAYFLOW_LAZY_STARTUP``)
+- minimal: the Vercel entrypoint with ``PAYFLOW_ROUTERS=health,system,ai``
+
+Each mode is also run once under ``python -X importtime`` to list the
+heaviest top-level imports and check whether pandas was loaded.
+
+Usage:
+    python -m benchmarks.bench_importtime --repeat 5 --out importtime.json
+"""
+from statistics import median
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._util import BACKEND_DIR, run_isolated, emit
+
+# What the app imported at module level before routers loaded services lazily
+EAGER_SERVICES = (
+    "aggregates", "diff", "employees", "ewa", "forecast", "imports", "ingest", "ledger", "snapshot", "validation"
+)
+MODES: Dict[str, Dict[str, Any]] = {
+    "eager": {
+        "imports": ["app.main"] + [f"app.services.{name}" for name in EAGER_SERVICES],
+        "env": {"PAYFLOW_LAZY_STARTUP": "false"}
+    },
+    "lazy": {"imports": ["api.index"], "env": {}},
+    "minimal": {"imports": ["api.index"], "env": {"PAYFLOW_ROUTERS": "health,system,ai"}}
+}
+ENDPOINTS = {
+    "root_ms": ("GET", "/", b""),
+    "system_ip_ms": ("GET", "/api/v1/system/ip", b""),
+    "ai_chat_ms": ("POST", "/api/v1/ai/chat", b'{"message": "How much can I withdraw?"}'),
+    "employees_ms": ("GET", "/api/v1/employees?per_page=10", b"")
+}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def worker(mode: str) -> None:
+    """Measure one cold start; prints a JSON object."""
+    import importlib
+
+    start = time.perf_counter()
+    for module in MODES[mode]["imports"]:
+        importlib.import_module(module)
+    imported = time.perf_counter()
+    result: Dict[str, Any] = {"import_ms": _ms(imported - start), "pandas_after_import": "pandas" in sys.modules}
+
+    from benchmarks.asgi import Lifespan, request
+    app = sys.modules["app.main"].app
+    paths = {route.path for route in app.routes}
+
+    async def run() -> None:
+        begin = time.perf_counter()
+        async with Lifespan(app):
+            result["startup_ms"] = _ms(time.perf_counter() - begin)
+            first_request: Dict[str, float] = {}
+            for name, (method, path, body) in ENDPOINTS.items():
+                if path.partition("?")[0] not in paths:
+                    continue
+                sent = time.perf_counter()
+                response = await request(app, method, path, body, {"content-type": "application/json"})
+                if response.status != 200:
+                    raise RuntimeError(f"{path} returned {response.status}: {response.body[:200]!r}")
+                first_request[name] = _ms(time.perf_counter() - sent)
+                # pandas should be first loaded by the employee roster, if at all
+                if path == "/api/v1/ai/chat":
+                    result["pandas_before_roster"] = "pandas" in sys.modules
+            result["first_request"] = first_request
+
+    asyncio.run(run())
+    print(json.dumps(result))
+
+
+def import_profile(mode: str, data_dir: str, top: int) -> Dict[str, Any]:
+    """Run the mode's imports under ``-X importtime`` and summarize stderr."""
+    code = "; ".join(f"import {module}" for module in MODES[mode]["imports"])
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, **MODES[mode]["env"], "PAYFLOW_DATA_DIR": data_dir}
+    )
+    top_level: Dict[str, int] = {}
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # Nested imports are indented by two spaces per level after "| "
+        module = name[1:]
+        loaded.add(module.strip())
+        if not module.startswith(" "):
+            top_level[module] = top_level.get(module, 0) + int(cumulative)
+    heaviest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_import_ms": round(sum(top_level.values()) / 1000, 1),
+        "pandas_loaded": "pandas" in loaded,
+        "numpy_loaded": "numpy" in loaded,
+        "heaviest": {module: round(us / 1000, 1) for module, us in heaviest}
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--worker", choices=tuple(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(args.worker)
+        return
+
+    results: List[Dict[str, Any]] = []
+    for mode in args.modes.split(","):
+        runs = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as data_dir:
+                began = time.perf_counter()
+                run = run_isolated(
+                    "benchmarks.bench_importtime", "--worker", mode,
+                    env={**MODES[mode]["env"], "PAYFLOW_DATA_DIR": data_dir}
+                )
+                run["process_ms"] = _ms(time.perf_counter() - began)
+                runs.append(run)
+        with tempfile.TemporaryDirectory() as data_dir:
+            profile = import_profile(mode, data_dir, args.top)
+
+        def middle(key: str, source: List[Dict[str, Any]]) -> float:
+            return round(median(run[key] for run in source), 2)
+
+        first = [run["first_request"] for run in runs]
+        results.append({
+            "mode": mode,
+            "runs": len(runs),
+            "import_ms": middle("import_ms", runs),
+            "startup_ms": middle("startup_ms", runs),
+            "first_request": {name: middle(name, first) for name in first[0]},
+            "process_ms": middle("process_ms", runs),
+            "pandas_after_import": runs[0]["pandas_after_import"],
+            "pandas_before_roster": runs[0].get("pandas_before_roster"),
+            "importtime": profile
+        })
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
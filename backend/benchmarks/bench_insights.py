@@ -0,0 +1,75 @@
+"""
+Employer insights benchmark: running withdrawal aggregates vs recompute.
+
+Streams a synthetic withdrawal history (weekday and payday seasonality)
+into ``WithdrawalAggregates`` one event at a time, then compares reading
+the insights summary with recomputing it from the full history using the
+vectorized path, and checks both give the same result. Reads stay flat as
+the history grows; the recompute grows with it.
+
+Usage:
+    python -m benchmarks.bench_insights --events 100000,1000000,5000000 --out insights.json
+"""
+from datetime import date
+from typing import Optional
+import argparse
+
+import numpy as np
+
+from benchmarks._util import Timer, emit, percentile
+
+AS_OF = date(2025, 6, 30)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Employer insights benchmark")
+    parser.add_argument("--events", default="100000,1000000")
+    parser.add_argument("--employees", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--reads", type=int, default=10_000)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services.aggregates import WithdrawalAggregates, aggregate_withdrawals
+    from benchmarks.synthetic import withdrawal_events
+
+    results = []
+    for count in (int(n) for n in args.events.split(",")):
+        events = withdrawal_events(
+            count, args.employees, np.datetime64(AS_OF), args.days, np.random.default_rng(7)
+        )
+        rows = zip(
+            events["employee_id"].tolist(),
+            events["department"].tolist(),
+            events["amount"].tolist(),
+            events["day"].dt.date.tolist(),
+            events["share"].tolist()
+        )
+        aggregates = WithdrawalAggregates()
+        with Timer() as streaming:
+            for employee_id, department, amount, day, share in rows:
+                aggregates.record(employee_id, department, amount, day, share)
+
+        latencies = []
+        for _ in range(args.reads):
+            with Timer() as read:
+                summary = aggregates.summary(AS_OF)
+            latencies.append(read.seconds)
+        with Timer() as recompute:
+            expected = aggregate_withdrawals(events, AS_OF)
+
+        results.append({
+            "events": count,
+            "record_events_per_second": round(count / streaming.seconds),
+            "record_us_per_event": round(streaming.seconds / count * 1e6, 2),
+            "read_p50_us": round(percentile(latencies, 50) * 1e6, 2),
+            "read_p99_us": round(percentile(latencies, 99) * 1e6, 2),
+            "recompute_seconds": round(recompute.seconds, 3),
+            "matches_recompute": summary == expected,
+            "window_withdrawals": summary["withdrawals"]
+        })
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
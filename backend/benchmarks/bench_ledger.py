@@ -0,0 +1,114 @@
+"""
+EWA withdrawal ledger benchmark.
+
+Simulates the payday rush on withdrawals: many concurrent clients, each
+withdrawing small amounts for random employees, with a share of requests
+retried under the same idempotency key. Runs against a temporary SQLite
+ledger twice, with group commit and with one commit per withdrawal, and
+checks that no employee withdrew more than their starting balance and
+that every key was recorded once. Reports throughput, latency percentiles
+and commit batch sizes.
+
+Usage:
+    python -m benchmarks.bench_ledger --employees 10000 --withdrawals 20000 --clients 200 --out ledger.json
+"""
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks._util import Timer, emit, latency_summary
+
+
+async def _drive(ledger: Any, employee_ids: list, args: argparse.Namespace, seed: int) -> Dict[str, Any]:
+    from app.services.ledger import InsufficientBalanceError
+
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(0, len(employee_ids), args.withdrawals)
+    amounts = rng.integers(1, 20, args.withdrawals) * 10
+    retries = rng.random(args.withdrawals) < args.retry_share
+    queue = iter(range(args.withdrawals))
+    latencies: list = []
+    counts = {"accepted": 0, "insufficient": 0, "replayed": 0}
+
+    async def client() -> None:
+        for i in queue:
+            employee_id, key = employee_ids[targets[i]], f"w-{seed}-{i}"
+            for _ in range(2 if retries[i] else 1):
+                start = time.perf_counter()
+                try:
+                    result = await ledger.withdraw(employee_id, float(amounts[i]), key)
+                    counts["replayed" if result["replayed"] else "accepted"] += 1
+                except InsufficientBalanceError:
+                    counts["insufficient"] += 1
+                latencies.append(time.perf_counter() - start)
+
+    with Timer() as timer:
+        await asyncio.gather(*(client() for _ in range(args.clients)))
+    return {
+        **counts,
+        "requests": len(latencies),
+        "seconds": round(timer.seconds, 3),
+        "requests_per_second": round(len(latencies) / timer.seconds, 1),
+        "latency": latency_summary(latencies)
+    }
+
+
+def _run(label: str, commit_batch: int, args: argparse.Namespace, root: str) -> Dict[str, Any]:
+    from app.services.employees import EmployeeStore, payroll_to_employees
+    from app.services.ledger import SQLiteLedger, WithdrawalLedger
+    from benchmarks.synthetic import payroll_chunk
+
+    store = EmployeeStore(payroll_to_employees(payroll_chunk(0, args.employees, np.random.default_rng(3))))
+    frame = store.snapshot.frame
+    employee_ids = frame["employee_id"].tolist()
+    initial = dict(zip(employee_ids, (frame["available_ewa"].to_numpy() * 100).round().astype(np.int64)))
+
+    path = os.path.join(root, f"{label}.db")
+    ledger = WithdrawalLedger(SQLiteLedger(path), store, commit_batch=commit_batch)
+    result = asyncio.run(_drive(ledger, employee_ids, args, seed=11))
+    commits = ledger.report()["commits"]
+    ledger.close()
+
+    # Verify against the durable record, not the in-memory balances
+    with sqlite3.connect(path) as check:
+        spent = check.execute("SELECT employee_id, SUM(amount_cents) FROM withdrawals GROUP BY employee_id").fetchall()
+        recorded, distinct_keys = check.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT idempotency_key) FROM withdrawals"
+        ).fetchone()
+    overdrawn = sum(1 for employee_id, cents in spent if cents > initial[employee_id])
+    return {
+        "mode": label,
+        "commit_batch": commit_batch,
+        **result,
+        "commits": commits,
+        "recorded": recorded,
+        "no_double_spend": overdrawn == 0 and recorded == distinct_keys == result["accepted"],
+        "overdrawn_employees": overdrawn
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="EWA withdrawal ledger benchmark")
+    parser.add_argument("--employees", type=int, default=10_000)
+    parser.add_argument("--withdrawals", type=int, default=20_000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--retry-share", type=float, default=0.1)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        results = [
+            _run("group_commit", int(os.getenv("PAYFLOW_LEDGER_COMMIT_BATCH", "256")), args, root),
+            _run("commit_per_withdrawal", 1, args, root)
+        ]
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+In-process API load driver.
+
+Drives the app through the ASGI interface (no sockets, see ``asgi.py``):
+loads a synthetic payroll through ``/api/v1/upload``, then concurrent
+clients send a weighted mix of requests for a fixed time. Reports
+throughput, status codes and p50/p95/p99 latency per endpoint and
+overall. Set PAYFLOW_* variables as for the server; the data directory
+defaults to a temporary one so runs start from the same state.
+
+Usage:
+    python -m benchmarks.bench_load --rows 100000 --clients 50 --seconds 20 --out load.json
+    python -m benchmarks.bench_load --endpoints employee_detail,employees_page --seconds 5
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from benchmarks._util import emit, latency_summary
+
+# name -> (weight, method, path, JSON body); {employee_id}, {department}
+# and {page} are filled in per request
+ENDPOINTS: Dict[str, Tuple[int, str, str, Optional[Dict[str, Any]]]] = {
+    "employee_me": (15, "GET", "/api/v1/employee/me", None),
+    "employees_page": (15, "GET", "/api/v1/employees?per_page=20&page={page}", None),
+    "employees_department": (5, "GET", "/api/v1/employees?per_page=20&department={department}", None),
+    "employee_detail": (20, "GET", "/api/v1/employees/{employee_id}", None),
+    "withdrawal": (10, "POST", "/api/v1/ewa/withdrawals", {"employee_id": "{employee_id}", "amount": 10}),
+    "ai_chat": (10, "POST", "/api/v1/ai/chat", {"message": "When is my next payday?"}),
+    "ai_analyze": (5, "POST", "/api/v1/ai/analyze", {}),
+    "ai_recommend": (5, "POST", "/api/v1/ai/recommend", {}),
+    "payroll_insights": (5, "POST", "/api/v1/ai/payroll-insights", {}),
+    "system_ip": (5, "GET", "/api/v1/system/ip", None),
+    "health": (5, "GET", "/", None)
+}
+
+
+def _fill(value: Any, fields: Dict[str, Any]) -> Any:
+    if isinstance(value, str):
+        return value.format(**fields)
+    if isinstance(value, dict):
+        return {key: _fill(item, fields) for key, item in value.items()}
+    return value
+
+
+async def _drive(
+    csv_bytes: bytes,
+    names: List[str],
+    clients: int,
+    seconds: float,
+    seed: int
+) -> Dict[str, Any]:
+    from app.main import app
+    from benchmarks.asgi import Lifespan, multipart, request
+    from benchmarks.synthetic import DEPARTMENTS
+
+    rng = random.Random(seed)
+    weights = [ENDPOINTS[name][0] for name in names]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Counter] = {name: Counter() for name in names}
+
+    async with Lifespan(app):
+        body, content_type = multipart("file", "payroll.csv", csv_bytes)
+        upload = await request(app, "POST", "/api/v1/upload", body, {"content-type": content_type})
+        if upload.status != 200:
+            raise RuntimeError(f"Upload failed with {upload.status}: {upload.body[:200]!r}")
+        rows = json.loads(upload.body)["employees_loaded"]
+        deadline = time.perf_counter() + seconds
+
+        async def client() -> None:
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                _, method, path, payload = ENDPOINTS[name]
+                fields = {
+                    "employee_id": f"HC-2024-{rng.randint(1, rows):07d}",
+                    "department": rng.choice(DEPARTMENTS),
+                    "page": rng.randint(1, max(rows // 20, 1))
+                }
+                headers: Dict[str, str] = {}
+                data = b""
+                if payload is not None:
+                    data = json.dumps(_fill(payload, fields)).encode()
+                    headers = {"content-type": "application/json", "idempotency-key": uuid.uuid4().hex}
+                start = time.perf_counter()
+                response = await request(app, method, _fill(path, fields), data, headers)
+                latencies[name].append(time.perf_counter() - start)
+                statuses[name][response.status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "rows": rows,
+        "clients": clients,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(every) / elapsed, 1),
+        "latency": latency_summary(every),
+        "endpoints": [
+            {
+                "endpoint": name,
+                "requests_per_second": round(len(latencies[name]) / elapsed, 1),
+                "statuses": {str(status): count for status, count in sorted(statuses[name].items())},
+                "latency": latency_summary(latencies[name])
+            }
+            for name in names if latencies[name]
+        ]
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="In-process API load driver")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated subset of the mix")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    names = args.endpoints.split(",")
+    unknown = sorted(set(names) - set(ENDPOINTS))
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    from benchmarks.synthetic import write_payroll_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Read by the app's services when they are first used
+        os.environ.setdefault("PAYFLOW_DATA_DIR", os.path.join(tmp, "data"))
+        path = write_payroll_csv(os.path.join(tmp, "payroll.csv"), args.rows)
+        with open(path, "rb") as handle:
+            csv_bytes = handle.read()
+        result = asyncio.run(_drive(csv_bytes, names, args.clients, args.seconds, args.seed))
+    emit([result], args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Instrumentation overhead benchmark.
+
+Starts the app in a fresh interpreter with request metrics off, on, and on with
+every request profiled, uploads a synthetic payroll, then sends light
+requests from concurrent clients. Reports throughput and latency of the
+light requests per mode, and with metrics on, how long a ``/metrics``
+scrape takes and where upload time went according to the spans.
+
+Usage:
+    python -m benchmarks.bench_metrics --rows 100000 --requests 5000 --out metrics.json
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+
+from benchmarks._util import Timer, emit, latency_summary, run_isolated
+
+MODES = {
+    "off": {"PAYFLOW_METRICS_ENABLED": "false"},
+    "on": {"PAYFLOW_METRICS_ENABLED": "true"},
+    "profiled": {"PAYFLOW_METRICS_ENABLED": "true", "PAYFLOW_PROFILE_SAMPLE": "1"}
+}
+LIGHT_PATHS = ("/", "/api/v1/employees/HC-2024-0000001", "/api/v1/employees?limit=20")
+
+
+def _spans(text: str) -> Dict[str, Dict[str, float]]:
+    """Count and total seconds per span from a /metrics scrape."""
+    spans: Dict[str, Dict[str, float]] = {}
+    for kind, name, value in re.findall(r'^payflow_span_seconds_(sum|count)\{span="([^"]+)"\} (\S+)$', text, re.M):
+        spans.setdefault(name, {})["seconds" if kind == "sum" else "count"] = round(float(value), 4)
+    return spans
+
+
+async def _drive(csv_bytes: bytes, total: int, clients: int) -> Dict[str, Any]:
+    from app.main import app
+    from benchmarks.asgi import Lifespan, multipart, request
+
+    body, content_type = multipart("file", "payroll.csv", csv_bytes)
+    latencies: List[float] = []
+    queue = iter(range(total))
+
+    async def client() -> None:
+        for i in queue:
+            start = time.perf_counter()
+            await request(app, "GET", LIGHT_PATHS[i % len(LIGHT_PATHS)])
+            latencies.append(time.perf_counter() - start)
+
+    async with Lifespan(app):
+        await request(app, "POST", "/api/v1/upload", body, {"content-type": content_type})
+        with Timer() as timer:
+            await asyncio.gather(*(client() for _ in range(clients)))
+        with Timer() as scrape:
+            response = await request(app, "GET", "/metrics")
+    result = {
+        "requests_per_second": round(total / timer.seconds, 1),
+        "latency": latency_summary(latencies)
+    }
+    if response.status == 200:
+        text = response.body.decode()
+        result["scrape"] = {"ms": round(scrape.seconds * 1000, 2), "bytes": len(response.body)}
+        result["spans"] = _spans(text)
+    return result
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Instrumentation overhead benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--out")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        with open(args.path, "rb") as handle:
+            csv_bytes = handle.read()
+        result = asyncio.run(_drive(csv_bytes, args.requests, args.clients))
+        result["mode"] = args.worker
+        print(json.dumps(result))
+        return
+
+    from benchmarks.synthetic import write_payroll_csv
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_payroll_csv(os.path.join(tmp, "payroll.csv"), args.rows)
+        for mode in args.modes.split(","):
+            results.append(run_isolated(
+                "benchmarks.bench_metrics",
+                "--worker", mode,
+                "--path", path,
+                "--requests", str(args.requests),
+                "--clients", str(args.clients),
+                env={**MODES[mode], "PAYFLOW_DATA_DIR": os.path.join(tmp, mode)}
+            ))
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
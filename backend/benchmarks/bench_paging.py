@@ -0,0 +1,79 @@
+"""
+Employee paging benchmark.
+
+Builds an employee store from synthetic payroll and times the queries
+behind ``GET /api/v1/employees``: the first page, a deep page by offset
+and by keyset cursor, a department filter, a sort by available EWA, a
+filtered count and a single-employee lookup. Each is repeated and the
+median reported.
+
+Usage:
+    python -m benchmarks.bench_paging --employees 1000000 --per-page 50 --out paging.json
+"""
+from statistics import median
+from typing import Any, Callable, Dict, Optional
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks._util import Timer, emit
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(median(timings) * 1000, 3)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Employee paging benchmark")
+    parser.add_argument("--employees", type=int, default=1_000_000)
+    parser.add_argument("--per-page", type=int, default=50)
+    parser.add_argument("--depth", type=float, default=0.9, help="Deep page position as a fraction of the roster")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services.employees import EmployeeStore, payroll_to_employees
+    from benchmarks.synthetic import DEPARTMENTS, payroll_chunk
+
+    rng = np.random.default_rng(7)
+    with Timer() as load:
+        store = EmployeeStore(payroll_to_employees(payroll_chunk(0, args.employees, rng)))
+    snapshot = store.snapshot
+    per_page = args.per_page
+    offset = int(args.employees * args.depth) // per_page * per_page
+    # Build the sort indexes up front, as the first request after a load would
+    with Timer() as index:
+        snapshot.sorted_index("employee_id")
+        snapshot.sorted_index("available_ewa")
+
+    # Cursor of the row just before the deep page
+    _, deep_cursor = snapshot.query(per_page, offset=offset - per_page)
+    employee_id = str(snapshot.ids[offset])
+
+    queries: Dict[str, Callable[[], Any]] = {
+        "first_page": lambda: snapshot.query(per_page),
+        "deep_page_offset": lambda: snapshot.query(per_page, offset=offset),
+        "deep_page_cursor": lambda: snapshot.query(per_page, cursor=deep_cursor),
+        "department_page": lambda: snapshot.query(per_page, department=DEPARTMENTS[0]),
+        "sorted_available_desc": lambda: snapshot.query(per_page, sort_by="available_ewa", descending=True),
+        "count_department": lambda: snapshot.count(DEPARTMENTS[0]),
+        "get_employee": lambda: snapshot.get(employee_id)
+    }
+    emit([{
+        "employees": args.employees,
+        "per_page": per_page,
+        "deep_offset": offset,
+        "load_seconds": round(load.seconds, 3),
+        "index_seconds": round(index.seconds, 3),
+        **{f"{name}_ms": _median_ms(fn, args.repeat) for name, fn in queries.items()}
+    }], args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Response serialization benchmark.
+
+Encodes ``/api/v1/employees`` payloads of growing page sizes both ways:
+per-row dicts through ``jsonable_encoder`` and the stdlib ``json`` (the
+default), and column-wise ``frame_records`` spliced into an orjson
+encoded payload (``PAYFLOW_FAST_JSON``). Checks that both decode to the
+same payload, then times a full-roster NDJSON export.
+
+Usage:
+    python -m benchmarks.bench_serialization --employees 1000000 --pages 100,1000,10000 --out serialization.json
+"""
+from statistics import median
+from typing import Any, Callable, Optional
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks._util import Timer, emit
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(median(timings) * 1000, 3)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--employees", type=int, default=1_000_000)
+    parser.add_argument("--pages", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services import serialization
+    from app.services.employees import EmployeeStore, payroll_to_employees
+    from benchmarks.synthetic import payroll_chunk
+
+    snapshot = EmployeeStore(payroll_to_employees(payroll_chunk(0, args.employees, np.random.default_rng(7)))).snapshot
+
+    def encode(per_page: int, fast: bool) -> bytes:
+        serialization.FAST_JSON = fast
+        employees, next_cursor = snapshot.query(per_page, offset=args.employees // 2, as_json=fast)
+        return serialization.dumps({
+            "success": True,
+            "employees": employees,
+            "pagination": {"per_page": per_page, "next_cursor": next_cursor}
+        })
+
+    results = []
+    for per_page in (int(size) for size in args.pages.split(",")):
+        default, fast = encode(per_page, False), encode(per_page, True)
+        default_ms = _median_ms(lambda: encode(per_page, False), args.repeat)
+        fast_ms = _median_ms(lambda: encode(per_page, True), args.repeat)
+        results.append({
+            "per_page": per_page,
+            "orjson": serialization.orjson is not None,
+            "identical": json.loads(default) == json.loads(fast),
+            "bytes": len(fast),
+            "default_ms": default_ms,
+            "fast_ms": fast_ms,
+            "speedup": round(default_ms / fast_ms, 2) if fast_ms else None
+        })
+
+    rows = snapshot.rows()
+    with Timer() as export:
+        size = sum(len(chunk) for chunk in serialization.encode_frame(rows, serialization.NDJSON_MEDIA_TYPE))
+    results.append({
+        "export": "ndjson",
+        "rows": len(rows),
+        "bytes": size,
+        "export_seconds": round(export.seconds, 3),
+        "rows_per_second": round(len(rows) / export.seconds)
+    })
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Cold-start benchmark: re-parsing the payroll CSV vs mapping a snapshot.
+
+A synthetic payroll is uploaded once and saved as a columnar snapshot
+(``app.services.snapshot``). Each mode then builds a serving
+``EmployeeSnapshot`` in a fresh interpreter, as a restarted worker would:
+
+- ``csv``: stream-parse the CSV, map it to the employee schema and
+  compute EWA (what every worker did before snapshots)
+- ``snapshot``: memory-map the snapshot files
+
+Reported per mode: load time, peak RSS, and resident memory split into
+private pages and file-backed pages; the latter are shared between all
+workers mapping the same snapshot.
+
+Usage:
+    python -m benchmarks.bench_snapshot --rows 100000,1000000 --out snapshot.json
+"""
+from typing import Any, Dict, Optional
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks._util import Timer, emit, peak_rss_mb, rss_breakdown_mb, run_isolated
+
+MODES = ("csv", "snapshot")
+AS_OF = "2025-06-13"
+
+
+def _load_csv(path: str) -> Any:
+    from app.services.employees import EmployeeSnapshot, payroll_to_employees
+    from app.services.ingest import summarize_csv
+
+    return EmployeeSnapshot(summarize_csv(path, collect=payroll_to_employees)["frame"])
+
+
+def _load_snapshot(path: str) -> Any:
+    from app.services.employees import EmployeeSnapshot
+    from app.services.snapshot import get_snapshot_store
+
+    return EmployeeSnapshot.restore(get_snapshot_store().open())
+
+
+def run_worker(mode: str, path: str) -> Dict[str, Any]:
+    """Build a serving snapshot once with ``mode`` and report time and memory."""
+    import pandas  # noqa: F401 - keep import time out of the measurement
+
+    baseline = peak_rss_mb()
+    load = _load_csv if mode == "csv" else _load_snapshot
+    with Timer() as timer:
+        snapshot = load(path)
+    # Touch every row the way a full listing or aggregate would
+    snapshot.frame["available_ewa"].sum()
+    return {
+        "mode": mode,
+        "rows": len(snapshot),
+        "seconds": round(timer.seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "baseline_rss_mb": round(baseline, 1),
+        **rss_breakdown_mb()
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Snapshot cold-start benchmark")
+    parser.add_argument("--rows", default="100000,1000000")
+    parser.add_argument("--out")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.path)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Workers find the snapshot under the data dir; pin the accrual
+        # date so the restore never recomputes EWA
+        env = {"PAYFLOW_DATA_DIR": tmp, "PAYFLOW_AS_OF": AS_OF}
+        os.environ.update(env)
+        from app.services.diff import fingerprint
+        from app.services.snapshot import get_snapshot_store
+        from benchmarks.synthetic import write_payroll_csv
+
+        for rows in (int(r) for r in args.rows.split(",")):
+            path = write_payroll_csv(os.path.join(tmp, f"payroll-{rows}.csv"), rows)
+            snapshot = _load_csv(path)
+            with Timer() as save:
+                name = get_snapshot_store().save(
+                    snapshot.frame, snapshot.as_of, fingerprint(snapshot.frame)
+                )
+            del snapshot
+            snapshot_mb = sum(
+                entry.stat().st_size for entry in os.scandir(os.path.join(tmp, "snapshots", name))
+            ) / (1024 * 1024)
+            for mode in MODES:
+                result = run_isolated(
+                    "benchmarks.bench_snapshot", "--worker", mode, "--path", path, env=env
+                )
+                result["csv_mb"] = round(os.path.getsize(path) / (1024 * 1024), 1)
+                result["snapshot_mb"] = round(snapshot_mb, 1)
+                result["snapshot_save_seconds"] = round(save.seconds, 3)
+                results.append(result)
+            os.unlink(path)
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+AI chat streaming benchmark.
+
+Sends concurrent requests to ``POST /api/v1/ai/chat/stream`` through the
+in-process ASGI client and compares time to first byte (the first token
+on the employee's screen) with time to the full answer. By default the
+mock answers are streamed with ``AI_MOCK_STREAM_DELAY_MS`` between words;
+``--provider`` runs against the local fake provider instead and also
+measures the non-streaming ``/api/v1/ai/chat`` endpoint.
+
+Usage:
+    python -m benchmarks.bench_streaming --requests 200 --token-ms 20 --out streaming.json
+    python -m benchmarks.bench_streaming --provider --latency-ms 300
+"""
+from typing import Any, Dict, Optional
+import argparse
+import asyncio
+import json
+import os
+
+from benchmarks._util import emit, latency_summary
+from benchmarks.asgi import Lifespan, request
+
+MESSAGE = json.dumps({"message": "How much can I withdraw?"}).encode()
+HEADERS = {"content-type": "application/json"}
+
+
+async def _phase(app: Any, path: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    gate = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    first_byte, full = [], []
+
+    async def one() -> None:
+        async with gate:
+            start = loop.time()
+            response = await request(app, "POST", path, MESSAGE, HEADERS)
+            end = loop.time()
+            assert response.status == 200, response.status
+            first_byte.append((response.first_byte_at or end) - start)
+            full.append(end - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return {
+        "endpoint": path,
+        "requests": requests,
+        "time_to_first_byte": latency_summary(first_byte),
+        "full_response": latency_summary(full)
+    }
+
+
+async def _run(args: argparse.Namespace) -> list:
+    from app.main import app
+
+    async with Lifespan(app):
+        results = [await _phase(app, "/api/v1/ai/chat/stream", args.requests, args.concurrency)]
+        if args.provider:
+            results.append(await _phase(app, "/api/v1/ai/chat", args.requests, args.concurrency))
+    return results
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="AI chat streaming benchmark")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--provider", action="store_true", help="Use the local fake provider")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    # Every request must reach the model for the comparison to mean anything
+    os.environ["AI_CHAT_CACHE_ENABLED"] = "false"
+    os.environ["AI_MOCK_STREAM_DELAY_MS"] = str(args.token_ms)
+    if args.provider:
+        from benchmarks import fake_provider
+        from benchmarks.bench_ai_client import PORT, _start_provider
+
+        _start_provider(args.latency_ms)
+        fake_provider.settings["token_ms"] = args.token_ms
+        os.environ.update(AI_ENABLED="true", AI_BASE_URL=f"http://127.0.0.1:{PORT}/v1")
+
+    results = asyncio.run(_run(args))
+    for result in results:
+        result["mode"] = "provider" if args.provider else "mock"
+        result["token_ms"] = args.token_ms
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
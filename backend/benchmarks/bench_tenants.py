@@ -0,0 +1,243 @@
+"""
+Multi-worker tenant fairness check.
+
+Starts ``--workers`` uvicorn processes of the app sharing tenants through
+PAYFLOW_WORKERS, each on its own port, with one temporary data directory,
+and sends every request to the worker owning its tenant
+(``TenantRouter.owner``), as a proxy in front would. ``--tenants`` quiet
+employers each load a small payroll, then browse and withdraw at a
+steady pace. The run is repeated while a noisy employer migrates: it
+uploads a large payroll in a loop, starts background imports and floods
+reads from many clients (which back off on 429 as told by Retry-After).
+
+Reports per phase the quiet employers' throughput and latency, Jain's
+fairness index over their throughput (1.0 = all served alike) and the
+noisy employer's status codes; the 429s are its quotas at work. Quotas
+are set with --rate and --max-jobs, and --pin-noisy pins the noisy
+employer to the first worker with PAYFLOW_TENANT_PINS, which then
+serves it alone.
+
+Usage:
+    python -m benchmarks.bench_tenants --workers 2 --tenants 8 --noisy-rows 500000 --seconds 20 --out tenants.json
+    python -m benchmarks.bench_tenants --rate 0 --max-jobs 0   # no quotas, for comparison
+"""
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks._util import BACKEND_DIR, emit, latency_summary
+
+NOISY_TENANT = "noisy"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_workers(count: int, data_dir: str, args: argparse.Namespace) -> Dict[str, subprocess.Popen]:
+    names = [f"127.0.0.1:{_free_port()}" for _ in range(count)]
+    env = {
+        **os.environ,
+        "PAYFLOW_DATA_DIR": data_dir,
+        "PAYFLOW_WORKERS": ",".join(names),
+        "PAYFLOW_TENANT_RATE": str(args.rate),
+        "PAYFLOW_TENANT_MAX_JOBS": str(args.max_jobs)
+    }
+    if args.pin_noisy:
+        env["PAYFLOW_TENANT_PINS"] = f"{NOISY_TENANT}={names[0]}"
+    workers = {}
+    for name in names:
+        workers[name] = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", name.rsplit(":", 1)[1], "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env={**env, "PAYFLOW_WORKER_ID": name}
+        )
+    return workers
+
+
+async def _wait_ready(clients: Dict[str, Any], timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    for client in clients.values():
+        while True:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    break
+            except Exception:
+                pass
+            if time.perf_counter() > deadline:
+                raise RuntimeError("Workers did not start in time")
+            await asyncio.sleep(0.2)
+
+
+def _jain(values: List[float]) -> float:
+    """Jain's fairness index: 1.0 when all values are equal, 1/n when one gets everything."""
+    if not values or not any(values):
+        return 0.0
+    return round(sum(values) ** 2 / (len(values) * sum(v * v for v in values)), 4)
+
+
+async def _phase(
+    mode: str,
+    clients: Dict[str, Any],
+    owner: Any,
+    quiet: Dict[str, int],
+    noisy_csv: Optional[bytes],
+    args: argparse.Namespace
+) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    deadline = time.perf_counter() + args.seconds
+    latencies: Dict[str, List[float]] = {tenant: [] for tenant in quiet}
+    statuses: Dict[str, Counter] = {tenant: Counter() for tenant in [*quiet, NOISY_TENANT]}
+
+    async def send(tenant: str, method: str, path: str, **kwargs: Any) -> Any:
+        headers = {"X-Employer-ID": tenant, **kwargs.pop("headers", {})}
+        response = await clients[owner(tenant)].request(method, path, headers=headers, **kwargs)
+        statuses[tenant][response.status_code] += 1
+        return response
+
+    async def quiet_client(tenant: str) -> None:
+        rows = quiet[tenant]
+        while time.perf_counter() < deadline:
+            employee_id = f"HC-2024-{rng.randint(1, rows):07d}"
+            kind = rng.random()
+            start = time.perf_counter()
+            if kind < 0.4:
+                await send(tenant, "GET", f"/api/v1/employees?per_page=20&page={rng.randint(1, rows // 20)}")
+            elif kind < 0.8:
+                await send(tenant, "GET", f"/api/v1/employee/me?employee_id={employee_id}")
+            else:
+                await send(
+                    tenant, "POST", "/api/v1/ewa/withdrawals",
+                    json={"employee_id": employee_id, "amount": 10},
+                    headers={"Idempotency-Key": f"{tenant}-{rng.getrandbits(64):x}"}
+                )
+            latencies[tenant].append(time.perf_counter() - start)
+            await asyncio.sleep(args.think_ms / 1000)
+
+    async def noisy_client(kind: str) -> None:
+        files = {"file": ("migration.csv", noisy_csv, "text/csv")}
+        while time.perf_counter() < deadline:
+            if kind == "upload":
+                response = await send(NOISY_TENANT, "POST", "/api/v1/upload", files=files)
+            elif kind == "import":
+                response = await send(NOISY_TENANT, "POST", "/api/v1/imports", files=files)
+            else:
+                page = rng.randint(1, args.noisy_rows // 100)
+                response = await send(NOISY_TENANT, "GET", f"/api/v1/employees?per_page=100&page={page}")
+            if response.status_code in (429, 503):
+                await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+    tasks = [quiet_client(tenant) for tenant in quiet for _ in range(args.clients_per_tenant)]
+    if noisy_csv is not None:
+        tasks += [noisy_client("upload"), noisy_client("import")]
+        tasks += [noisy_client("read") for _ in range(args.noisy_clients)]
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    throughput = [len(latencies[tenant]) / elapsed for tenant in quiet]
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "quiet": {
+            "requests_per_second": round(sum(throughput), 1),
+            "fairness": _jain(throughput),
+            "latency": latency_summary([value for values in latencies.values() for value in values]),
+            "worst_tenant_p99_ms": max(latency_summary(latencies[t])["p99_ms"] for t in quiet),
+            "statuses": {
+                str(status): count for status, count in sorted(sum((statuses[t] for t in quiet), Counter()).items())
+            }
+        },
+        "noisy": {
+            "statuses": {str(status): count for status, count in sorted(statuses[NOISY_TENANT].items())}
+        } if noisy_csv is not None else None
+    }
+
+
+async def _run(args: argparse.Namespace, data_dir: str, quiet_csv: bytes, noisy_csv: bytes) -> List[Dict[str, Any]]:
+    import httpx
+
+    from app.services.tenants import TenantRouter
+
+    workers = _start_workers(args.workers, data_dir, args)
+    names = list(workers)
+    router = TenantRouter(names, pins={NOISY_TENANT: names[0]} if args.pin_noisy else None)
+    clients = {name: httpx.AsyncClient(base_url=f"http://{name}", timeout=120) for name in names}
+    try:
+        await _wait_ready(clients)
+        quiet: Dict[str, int] = {}
+        for i in range(args.tenants):
+            tenant = f"employer-{i:03d}"
+            response = await clients[router.owner(tenant)].post(
+                "/api/v1/upload",
+                headers={"X-Employer-ID": tenant},
+                files={"file": ("payroll.csv", quiet_csv, "text/csv")}
+            )
+            response.raise_for_status()
+            quiet[tenant] = response.json()["employees_loaded"]
+
+        results = [await _phase("baseline", clients, router.owner, quiet, None, args)]
+        results.append(await _phase("migration", clients, router.owner, quiet, noisy_csv, args))
+        baseline, migration = results[0]["quiet"]["latency"], results[1]["quiet"]["latency"]
+        results[1]["quiet"]["p99_slowdown"] = round(migration["p99_ms"] / baseline["p99_ms"], 2) if baseline["p99_ms"] else None
+        placement = Counter(router.owner(tenant) for tenant in quiet)
+        for result in results:
+            result.update(
+                workers=args.workers,
+                tenants=args.tenants,
+                rate=args.rate,
+                max_jobs=args.max_jobs,
+                quiet_tenants_per_worker=dict(placement),
+                noisy_worker=router.owner(NOISY_TENANT)
+            )
+        return results
+    finally:
+        for client in clients.values():
+            await client.aclose()
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.wait(timeout=30)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Multi-worker tenant fairness check")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--tenants", type=int, default=8, help="Quiet employers")
+    parser.add_argument("--tenant-rows", type=int, default=2000)
+    parser.add_argument("--clients-per-tenant", type=int, default=2)
+    parser.add_argument("--think-ms", type=float, default=20.0)
+    parser.add_argument("--noisy-rows", type=int, default=500_000)
+    parser.add_argument("--noisy-clients", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=50.0, help="PAYFLOW_TENANT_RATE for the workers")
+    parser.add_argument("--max-jobs", type=int, default=1, help="PAYFLOW_TENANT_MAX_JOBS for the workers")
+    parser.add_argument("--pin-noisy", action="store_true")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from benchmarks.synthetic import write_payroll_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(write_payroll_csv(os.path.join(tmp, "quiet.csv"), args.tenant_rows), "rb") as handle:
+            quiet_csv = handle.read()
+        with open(write_payroll_csv(os.path.join(tmp, "noisy.csv"), args.noisy_rows), "rb") as handle:
+            noisy_csv = handle.read()
+        results = asyncio.run(_run(args, os.path.join(tmp, "data"), quiet_csv, noisy_csv))
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
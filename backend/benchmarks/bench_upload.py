@@ -0,0 +1,99 @@
+"""
+Upload parsing benchmark: eager ``pd.read_csv`` vs streaming ingestion.
+
+Each (rows, mode) pair runs in its own interpreter so peak RSS is not
+shared between measurements. The eager mode reproduces the original
+``upload_csv`` path (read, decode, StringIO, full parse). The streaming
+mode only summarizes the file; the endpoint mode is what ``upload_csv``
+does today: summarize while collecting the employee frame, then build
+the EWA snapshot with ``EmployeeStore.load``.
+
+Usage:
+    python -m benchmarks.bench_upload --rows 10000,1000000,10000000 --out upload.json
+"""
+from io import StringIO
+from typing import Any, Dict, Optional
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks._util import Timer, emit, peak_rss_mb, run_isolated
+
+MODES = ("eager", "streaming", "endpoint")
+
+
+def _parse_eager(path: str) -> int:
+    import pandas as pd
+
+    with open(path, "rb") as handle:
+        contents = handle.read()
+    df = pd.read_csv(StringIO(contents.decode("utf-8")))
+    df.head(5).to_dict(orient="records")
+    return len(df)
+
+
+def _parse_streaming(path: str) -> int:
+    from app.services.ingest import summarize_csv
+
+    return summarize_csv(path)["total_rows"]
+
+
+def _parse_endpoint(path: str) -> int:
+    from app.services.employees import EmployeeStore, _seed_frame, payroll_to_employees
+    from app.services.ingest import summarize_csv
+
+    summary = summarize_csv(path, collect=payroll_to_employees)
+    EmployeeStore(_seed_frame()).load(summary["frame"])
+    return summary["total_rows"]
+
+
+PARSERS = {"eager": _parse_eager, "streaming": _parse_streaming, "endpoint": _parse_endpoint}
+
+
+def run_worker(mode: str, path: str) -> Dict[str, Any]:
+    """Parse ``path`` once with ``mode`` and report time and peak RSS."""
+    baseline = peak_rss_mb()
+    parse = PARSERS[mode]
+    with Timer() as timer:
+        rows = parse(path)
+    return {
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(timer.seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "baseline_rss_mb": round(baseline, 1)
+    }
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Upload parsing benchmark")
+    parser.add_argument("--rows", default="10000,1000000,10000000")
+    parser.add_argument("--out")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.path)))
+        return
+
+    from benchmarks.synthetic import write_payroll_csv
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in (int(r) for r in args.rows.split(",")):
+            path = write_payroll_csv(os.path.join(tmp, f"payroll-{rows}.csv"), rows)
+            file_mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in MODES:
+                result = run_isolated(
+                    "benchmarks.bench_upload", "--worker", mode, "--path", path
+                )
+                result["file_mb"] = round(file_mb, 1)
+                results.append(result)
+            os.unlink(path)
+    emit(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Payroll validation benchmark.
+
+Writes a synthetic payroll CSV with seeded defects (duplicate IDs,
+unparseable and future hire dates, inflated salaries) and times the
+validation engine: CSV read plus rules, and the rules alone on an
+in-memory frame. The target is a million rows in a few seconds; the run
+reports whether it stayed within ``--budget-seconds``.
+
+Usage:
+    python -m benchmarks.bench_validation --rows 1000000 --out validation.json
+"""
+from datetime import date
+from typing import Optional
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks._util import Timer, emit, peak_rss_mb
+
+
+def _payroll_with_defects(rows: int, defect_rate: float, seed: int):
+    from benchmarks.synthetic import payroll_chunk
+
+    rng = np.random.default_rng(seed)
+    frame = payroll_chunk(0, rows, rng, outlier_rate=defect_rate)
+    defects = max(int(rows * defect_rate), 1)
+    picks = rng.choice(rows, size=(3, defects), replace=False)
+    frame.loc[picks[0], "employee_id"] = frame["employee_id"].iloc[0]
+    frame.loc[picks[1], "hire_date"] = "not-a-date"
+    frame.loc[picks[2], "hire_date"] = "2099-01-01"
+    return frame.astype(str)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Payroll validation benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--defect-rate", type=float, default=0.001)
+    parser.add_argument("--budget-seconds", type=float, default=5.0)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    from app.services.validation import validate_csv_file, validate_payroll
+
+    as_of = date(2025, 6, 30)
+    frame = _payroll_with_defects(args.rows, args.defect_rate, seed=7)
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        frame.to_csv(path, index=False)
+        with Timer() as in_memory:
+            report = validate_payroll(frame, as_of)
+        with Timer() as from_csv:
+            validate_csv_file(path, as_of)
+    finally:
+        os.unlink(path)
+
+    emit([{
+        "rows": args.rows,
+        "rules_seconds": round(in_memory.seconds, 3),
+        "rules_rows_per_second": round(args.rows / in_memory.seconds),
+        "csv_and_rules_seconds": round(from_csv.seconds, 3),
+        "within_budget": from_csv.seconds <= args.budget_seconds,
+        "budget_seconds": args.budget_seconds,
+        "flagged_rows": report["flagged_rows"],
+        "counts": report["counts"],
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }], args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Fake OpenAI-compatible provider for offline testing and benchmarks.
+
+Serves ``POST /v1/chat/completions`` with configurable latency and error
+rate, answering with the AIService mock payloads (one per employee for
+batched prompts). Point the backend at it
+with ``AI_ENABLED=true AI_BASE_URL=http://127.0.0.1:9000/v1``.
+
+Usage:
+    uvicorn benchmarks.fake_provider:app --port 9000
+
+Environment Variables:
+- FAKE_PROVIDER_LATENCY_MS: Base response latency (default 200)
+- FAKE_PROVIDER_JITTER_MS: Uniform jitter added to the latency (default 50)
+- FAKE_PROVIDER_ERROR_RATE: Fraction of calls answered with 503 (default 0)
+- FAKE_PROVIDER_TOKEN_MS: Generation time per word of the answer; streamed
+  responses (``"stream": true``) send each word as it is generated,
+  others wait for the whole answer (default 20)
+
+The same knobs can be changed at runtime with ``POST /control``.
+"""
+from typing import Any, Dict
+import asyncio
+import json
+import os
+import random
+import re
+import time
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.services.ai import BATCH_MARKER, AIService
+
+app = FastAPI(title="Fake AI Provider")
+settings = {
+    "latency_ms": float(os.getenv("FAKE_PROVIDER_LATENCY_MS", "200")),
+    "jitter_ms": float(os.getenv("FAKE_PROVIDER_JITTER_MS", "50")),
+    "error_rate": float(os.getenv("FAKE_PROVIDER_ERROR_RATE", "0")),
+    "token_ms": float(os.getenv("FAKE_PROVIDER_TOKEN_MS", "20")),
+}
+counters = {"requests": 0, "errors": 0}
+_mocks = AIService(client=None)
+
+
+def _json_answer(prompt: str) -> Dict[str, Any]:
+    if "Flagged rows:" in prompt:
+        return {"suggestions": ["Verify flagged salaries against signed contracts"]}
+    if "recommendations" in prompt:
+        return {"recommendations": _mocks._mock_recommendations()}
+    analysis = _mocks._mock_spending_analysis()
+    analysis.pop("success", None)
+    return analysis
+
+
+def _answer(payload: Dict[str, Any]) -> str:
+    prompt = payload["messages"][-1]["content"]
+    if payload.get("response_format", {}).get("type") == "json_object":
+        if BATCH_MARKER in prompt:
+            employees = json.loads(prompt.split(BATCH_MARKER, 1)[1].split("\n", 1)[0])
+            return json.dumps({"results": [_json_answer(prompt) for _ in employees]})
+        return json.dumps(_json_answer(prompt))
+    return _mocks._mock_chat_response(prompt)
+
+
+async def _delay() -> None:
+    jitter = random.uniform(0, settings["jitter_ms"])
+    await asyncio.sleep((settings["latency_ms"] + jitter) / 1000)
+
+
+_TOKENS = re.compile(r"\S+\s*")
+
+
+async def _stream(answer: str, model: str):
+    chunk_id = f"chatcmpl-fake-{counters['requests']}"
+    for token in _TOKENS.findall(answer):
+        await asyncio.sleep(settings["token_ms"] / 1000)
+        chunk = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(payload: Dict[str, Any]) -> Any:
+    counters["requests"] += 1
+    await _delay()
+    if random.random() < settings["error_rate"]:
+        counters["errors"] += 1
+        return Response(status_code=503, content="overloaded")
+    if payload.get("stream"):
+        return StreamingResponse(
+            _stream(_answer(payload), payload.get("model", "fake")),
+            media_type="text/event-stream"
+        )
+
+    answer = _answer(payload)
+    await asyncio.sleep(len(_TOKENS.findall(answer)) * settings["token_ms"] / 1000)
+    return {
+        "id": f"chatcmpl-fake-{counters['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": answer},
+            "finish_reason": "stop"
+        }]
+    }
+
+
+@app.post("/control")
+async def control(update: Dict[str, float]) -> Dict[str, Any]:
+    settings.update({k: float(v) for k, v in update.items() if k in settings})
+    return {"settings": settings, "counters": counters}
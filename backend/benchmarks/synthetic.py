@@ -0,0 +1,156 @@
+"""
+Synthetic payroll generator.
+
+Produces CSV files with the same schema as ``sample-payroll.csv``
+(employee_id, first_name, last_name, department, salary, hire_date).
+Rows are generated and written in chunks, so 10M-row files can be
+produced without holding them in memory. ``withdrawal_events`` produces
+EWA withdrawal histories with weekday and payday seasonality.
+
+Usage:
+    python -m benchmarks.synthetic out.csv --rows 1000000
+"""
+from typing import Optional
+import argparse
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = [
+    "Juan", "Maria", "Pedro", "Ana", "Jose", "Sofia", "Miguel", "Elena",
+    "Carlos", "Isabel", "Yuji", "Andres", "Luz", "Ramon", "Teresa", "Paolo"
+]
+LAST_NAMES = [
+    "Dela Cruz", "Santos", "Reyes", "Garcia", "Ramos", "Torres", "Cruz",
+    "Mendoza", "Gonzalez", "Fernandez", "Itadori", "Bautista", "Aquino", "Villanueva"
+]
+DEPARTMENTS = [
+    "Sales", "Marketing", "IT", "HR", "Finance", "Operations", "Security",
+    "Logistics", "Customer Service", "Engineering"
+]
+HIRE_START = np.datetime64("2015-01-01")
+HIRE_END = np.datetime64("2025-06-30")
+
+
+def payroll_chunk(
+    start: int,
+    rows: int,
+    rng: np.random.Generator,
+    outlier_rate: float = 0.001
+) -> pd.DataFrame:
+    """
+    Build one chunk of synthetic payroll rows.
+
+    Args:
+        start: Zero-based index of the first row (keeps IDs unique across chunks)
+        rows: Number of rows in the chunk
+        rng: Random generator
+        outlier_rate: Fraction of salaries inflated 5x to exercise validation
+
+    Returns:
+        DataFrame in the sample-payroll schema
+    """
+    numbers = pd.Series(np.arange(start + 1, start + rows + 1)).astype(str).str.zfill(7)
+    salary = rng.normal(32000, 6000, rows).clip(12000, None).round(-2)
+    outliers = rng.random(rows) < outlier_rate
+    salary[outliers] *= 5
+    hire_days = rng.integers(0, (HIRE_END - HIRE_START).astype(np.int64), rows)
+
+    return pd.DataFrame({
+        "employee_id": "HC-2024-" + numbers,
+        "first_name": np.asarray(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), rows)],
+        "last_name": np.asarray(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), rows)],
+        "department": np.asarray(DEPARTMENTS)[rng.integers(0, len(DEPARTMENTS), rows)],
+        "salary": salary.astype(np.int64),
+        "hire_date": (HIRE_START + hire_days).astype(str)
+    })
+
+
+def withdrawal_seasonality(days: np.ndarray) -> np.ndarray:
+    """
+    Relative withdrawal volume per day: higher midweek and rising toward
+    each payday (the 15th and the last day of the month).
+
+    Args:
+        days: datetime64[D] array
+    """
+    weekday = (days.astype(np.int64) + 3) % 7
+    month = days.astype("datetime64[M]")
+    day_of_month = (days - month).astype(np.int64) + 1
+    month_days = ((month + 1).astype("datetime64[D]") - month).astype(np.int64)
+    to_payday = np.where(day_of_month <= 15, 15 - day_of_month, month_days - day_of_month)
+    return np.array([1.1, 1.2, 1.4, 1.2, 1.0, 0.6, 0.5])[weekday] * (1 + 2.0 / (1 + to_payday))
+
+
+def withdrawal_events(
+    rows: int,
+    employees: int,
+    end: np.datetime64,
+    days: int,
+    rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Build a withdrawal history, oldest first.
+
+    Withdrawals are more likely midweek and in the days before each
+    payday (the 15th and the last day of the month), as in real EWA usage.
+
+    Args:
+        rows: Number of withdrawals
+        employees: Employees drawn from (IDs match ``payroll_chunk``)
+        end: Last day of the history
+        days: Days covered, ending at ``end``
+        rng: Random generator
+
+    Returns:
+        DataFrame with employee_id, department, amount, day and share
+        (fraction of the employee's allowance drawn after the withdrawal)
+    """
+    calendar = np.arange(end - np.timedelta64(days - 1, "D"), end + np.timedelta64(1, "D"))
+    weights = withdrawal_seasonality(calendar)
+    picks = np.sort(rng.choice(len(calendar), size=rows, p=weights / weights.sum()))
+
+    employee = rng.integers(0, employees, rows)
+    numbers = pd.Series(employee + 1).astype(str).str.zfill(7)
+    return pd.DataFrame({
+        "employee_id": "HC-2024-" + numbers,
+        "department": np.asarray(DEPARTMENTS)[employee % len(DEPARTMENTS)],
+        "amount": rng.integers(10, 500, rows) * 10.0,
+        "day": calendar[picks],
+        "share": rng.random(rows)
+    })
+
+
+def write_payroll_csv(
+    path: str,
+    rows: int,
+    seed: int = 7,
+    chunk_rows: int = 500_000,
+    outlier_rate: float = 0.001
+) -> str:
+    """
+    Write a synthetic payroll CSV of ``rows`` rows.
+
+    Returns:
+        The path written
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as out:
+        for start in range(0, max(rows, 1), chunk_rows):
+            count = min(chunk_rows, rows - start)
+            chunk = payroll_chunk(start, max(count, 0), rng, outlier_rate)
+            chunk.to_csv(out, header=start == 0, index=False)
+    return path
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    write_payroll_csv(args.path, args.rows, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
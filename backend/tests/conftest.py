@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the PayFlow backend tests.
+
+App modules read their configuration when imported, so the data
+directory and accrual date are pinned here, before any of them load.
+Tests that go through the app each get a tenant of their own, so their
+uploads, withdrawals and cached responses never meet.
+"""
+
+import os
+import tempfile
+import uuid
+
+os.environ["PAYFLOW_DATA_DIR"] = tempfile.mkdtemp(prefix="payflow-tests-")
+os.environ["PAYFLOW_AS_OF"] = "2024-12-13"
+
+import pytest
+
+from tests.helpers import TenantClient
+
+
+@pytest.fixture
+def tenant() -> str:
+    return f"t-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def client(tenant: str) -> TenantClient:
+    return TenantClient(tenant)
@@ -0,0 +1,51 @@
+"""Helpers for driving the app in tests, through ``benchmarks.asgi``."""
+
+from typing import Dict, Any, Optional
+import json
+
+from benchmarks.asgi import Response, multipart, request
+
+PAYROLL_HEADER = "employee_id,first_name,last_name,department,salary,hire_date"
+
+
+def payroll_csv(*rows: str) -> bytes:
+    """A CSV in the sample-payroll layout with the given data rows."""
+    return "\n".join((PAYROLL_HEADER,) + rows + ("",)).encode()
+
+
+def body(response: Response) -> Any:
+    """Decoded JSON body of a response."""
+    return json.loads(response.body)
+
+
+class TenantClient:
+    """Sends requests to the app as one tenant."""
+
+    def __init__(self, tenant: str):
+        from app.main import app
+        from app.services.tenants import TENANT_HEADER
+
+        self.app = app
+        self.tenant = tenant
+        self.header = TENANT_HEADER
+
+    def _headers(self, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        return {self.header: self.tenant, **(headers or {})}
+
+    async def get(self, path: str) -> Response:
+        return await request(self.app, "GET", path, headers=self._headers())
+
+    async def post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        return await request(
+            self.app, "POST", path, json.dumps(payload).encode(),
+            self._headers({"content-type": "application/json", **(headers or {})})
+        )
+
+    async def upload(self, csv: bytes, path: str = "/api/v1/upload") -> Response:
+        data, content_type = multipart("file", "payroll.csv", csv)
+        return await request(self.app, "POST", path, data, self._headers({"content-type": content_type}))
@@ -0,0 +1,94 @@
+"""Incremental payroll diffs: fingerprint comparison and delta-only loads."""
+
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from app.services.diff import PayrollDiffer
+from app.services.employees import PUBLIC_COLUMNS, EmployeeStore, payroll_to_employees
+from app.services.ewa import accrual_date
+from benchmarks.synthetic import payroll_chunk
+from tests.helpers import body, payroll_csv
+
+
+def _uploads():
+    first = payroll_chunk(0, 200, np.random.default_rng(5))
+    second = first.copy()
+    second.loc[3, "salary"] += 5000
+    second.loc[10, "department"] = "Renamed"
+    second = second.drop(index=[20, 21])
+    second = pd.concat([second, payroll_chunk(500, 3, np.random.default_rng(6))], ignore_index=True)
+    return payroll_to_employees(first), payroll_to_employees(second)
+
+
+def test_compare_finds_added_removed_and_changed(tmp_path):
+    differ = PayrollDiffer(str(tmp_path))
+    first, second = _uploads()
+
+    initial = differ.compare(first)
+    assert not initial.incremental
+    assert initial.counts() == {"added": 200, "removed": 0, "changed": 0, "unchanged": 0}
+
+    diff = differ.compare(second, initial.fingerprints)
+    assert diff.incremental
+    assert diff.counts() == {"added": 3, "removed": 2, "changed": 2, "unchanged": 196}
+    assert set(diff.changed) == {first["employee_id"][3], first["employee_id"][10]}
+    assert set(diff.removed) == {first["employee_id"][20], first["employee_id"][21]}
+    assert differ.compare(second, diff.fingerprints).unmodified
+
+
+def test_compare_stores_nothing_until_saved(tmp_path):
+    differ = PayrollDiffer(str(tmp_path))
+    first, second = _uploads()
+    assert differ.last_diff() is None
+
+    initial = differ.compare(first)
+    assert differ.stored_fingerprints() is None
+    differ.save(initial, "first.csv")
+    differ.compare(second, initial.fingerprints)
+    assert differ.last_diff()["filename"] == "first.csv"
+    assert differ.compare(second).counts()["changed"] == 2
+
+
+def test_incremental_load_matches_a_full_load(tmp_path):
+    differ = PayrollDiffer(str(tmp_path))
+    first, second = _uploads()
+    day = accrual_date()
+    store = EmployeeStore(first.copy())
+    store.load(first.copy(), day, differ.compare(first, None))
+    unchanged = store.snapshot
+
+    diff = differ.compare(second, store.snapshot.fingerprints)
+    assert diff.incremental
+    incremental = store.load(second.copy(), day, diff)
+    full = EmployeeStore(second.copy()).snapshot
+
+    assert incremental is not unchanged
+    pd.testing.assert_frame_equal(
+        incremental.frame[PUBLIC_COLUMNS].reset_index(drop=True),
+        full.frame[PUBLIC_COLUMNS].reset_index(drop=True),
+        check_categorical=False
+    )
+    assert store.load(second.copy(), day, differ.compare(second, incremental.fingerprints)) is incremental
+
+
+def test_upload_endpoint_applies_only_the_delta(client):
+    rows = [f"D{i:02d},First,Last,Ops,{30000 + 100 * i},2020-01-01" for i in range(10)]
+    changed = rows[:2] + ["D02,First,Last,Ops,99000,2020-01-01"] + rows[4:] + ["D99,New,Hire,Ops,25000,2024-01-01"]
+
+    async def scenario():
+        first = await client.upload(payroll_csv(*rows))
+        second = await client.upload(payroll_csv(*changed))
+        again = await client.upload(payroll_csv(*changed))
+        return first, second, again, await client.get("/api/v1/payroll/diff")
+
+    first, second, again, latest = asyncio.run(scenario())
+    assert body(first)["changes"]["incremental"] is False
+    assert body(second)["changes"] == {
+        "incremental": True, "added": 1, "removed": 1, "changed": 1, "unchanged": 8
+    }
+    assert body(again)["changes"] == {
+        "incremental": True, "added": 0, "removed": 0, "changed": 0, "unchanged": 10
+    }
+    assert body(latest)["counts"] == {"added": 0, "removed": 0, "changed": 0, "unchanged": 10}
@@ -0,0 +1,95 @@
+"""Withdrawal ledger: balance checks under concurrency and idempotency keys."""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from app.services.employees import EmployeeStore, payroll_to_employees
+from app.services.ledger import (
+    IdempotencyConflictError, InsufficientBalanceError, MemoryLedger, SQLiteLedger, WithdrawalLedger
+)
+
+EMPLOYEE = "E1"
+
+
+def _ledger(backend):
+    frame = pd.DataFrame({
+        "employee_id": ["E1", "E2"],
+        "first_name": ["Ana", "Ben"],
+        "last_name": ["Cruz", "Diaz"],
+        "department": ["Ops", "Ops"],
+        "salary": [40000, 30000],
+        "hire_date": ["2020-01-01", "2021-06-01"]
+    })
+    store = EmployeeStore(payroll_to_employees(frame))
+    return WithdrawalLedger(backend, store, commit_wait_ms=5)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def ledger(request, tmp_path):
+    backend = MemoryLedger() if request.param == "memory" else SQLiteLedger(str(tmp_path / "ledger.db"))
+    ledger = _ledger(backend)
+    yield ledger
+    ledger.close()
+
+
+def _available(ledger) -> float:
+    return ledger.store.snapshot.balance(EMPLOYEE)["available"]
+
+
+def test_concurrent_withdrawals_never_overdraw(ledger):
+    available = _available(ledger)
+    assert available > 0
+    amount = round(available * 0.4, 2)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(ledger.withdraw(EMPLOYEE, amount) for _ in range(5)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    accepted = [r for r in results if isinstance(r, dict)]
+    rejected = [r for r in results if isinstance(r, InsufficientBalanceError)]
+    assert len(accepted) == 2
+    assert len(rejected) == 3
+    assert _available(ledger) == pytest.approx(available - 2 * amount, abs=0.01)
+    assert len(asyncio.run(ledger.recent(EMPLOYEE))) == 2
+
+
+def test_retried_key_returns_the_original_withdrawal(ledger):
+    available = _available(ledger)
+
+    async def scenario():
+        first = await ledger.withdraw(EMPLOYEE, 100, "key-1")
+        again = await ledger.withdraw(EMPLOYEE, 100, "key-1")
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert not first["replayed"]
+    assert again["replayed"]
+    assert again["withdrawal_id"] == first["withdrawal_id"]
+    assert _available(ledger) == pytest.approx(available - 100, abs=0.01)
+
+
+def test_concurrent_requests_with_one_key_withdraw_once(ledger):
+    available = _available(ledger)
+
+    async def scenario():
+        return await asyncio.gather(*(ledger.withdraw(EMPLOYEE, 50, "key-2") for _ in range(4)))
+
+    results = asyncio.run(scenario())
+    assert len({r["withdrawal_id"] for r in results}) == 1
+    assert sum(not r["replayed"] for r in results) == 1
+    assert _available(ledger) == pytest.approx(available - 50, abs=0.01)
+
+
+def test_key_reused_for_another_withdrawal_is_refused(ledger):
+    async def scenario():
+        await ledger.withdraw(EMPLOYEE, 100, "key-3")
+        with pytest.raises(IdempotencyConflictError):
+            await ledger.withdraw(EMPLOYEE, 200, "key-3")
+        with pytest.raises(IdempotencyConflictError):
+            await ledger.withdraw("E2", 100, "key-3")
+
+    asyncio.run(scenario())
@@ -0,0 +1,75 @@
+"""Keyset (cursor) paging over the employee snapshot and the list endpoint."""
+
+import asyncio
+from urllib.parse import quote
+
+import numpy as np
+import pytest
+
+from app.services.employees import EmployeeStore, InvalidCursorError, payroll_to_employees
+from benchmarks.synthetic import payroll_chunk
+from tests.helpers import body, payroll_csv
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    frame = payroll_chunk(0, 257, np.random.default_rng(11))
+    return EmployeeStore(payroll_to_employees(frame)).snapshot
+
+
+def _walk(snapshot, per_page, **options):
+    pages, cursor = [], None
+    while True:
+        records, cursor = snapshot.query(per_page, cursor=cursor, **options)
+        pages.append([record["employee_id"] for record in records])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort_by", ["employee_id", "earned_this_period", "available_ewa"])
+@pytest.mark.parametrize("descending", [False, True])
+def test_cursor_pages_match_offset_pages(snapshot, sort_by, descending):
+    pages = _walk(snapshot, 20, sort_by=sort_by, descending=descending)
+    everything, _ = snapshot.query(len(snapshot), sort_by=sort_by, descending=descending)
+    ids = [employee_id for page in pages for employee_id in page]
+    assert ids == [record["employee_id"] for record in everything]
+    assert len(set(ids)) == len(snapshot)
+    assert [len(page) for page in pages] == [20] * 12 + [17]
+
+
+def test_cursor_pages_with_a_filter(snapshot):
+    department = snapshot.frame["department"].iloc[0]
+    pages = _walk(snapshot, 7, department=department)
+    ids = [employee_id for page in pages for employee_id in page]
+    expected = snapshot.frame.loc[snapshot.frame["department"] == department, "employee_id"]
+    assert ids == sorted(expected)
+
+
+def test_cursor_is_tied_to_its_sort_order(snapshot):
+    _, cursor = snapshot.query(10, sort_by="available_ewa")
+    with pytest.raises(InvalidCursorError):
+        snapshot.query(10, cursor=cursor, sort_by="employee_id")
+    with pytest.raises(InvalidCursorError):
+        snapshot.query(10, cursor="not-a-cursor")
+
+
+def test_list_endpoint_pages_with_next_cursor(client):
+    rows = [f"P{i:03d},First,Last,Ops,{30000 + i},2020-01-01" for i in range(25)]
+
+    async def scenario():
+        assert (await client.upload(payroll_csv(*rows))).status == 200
+        pages, path = [], "/api/v1/employees?per_page=10&sort_by=employee_id"
+        while True:
+            response = await client.get(path)
+            assert response.status == 200
+            pages.append(body(response))
+            cursor = pages[-1]["pagination"]["next_cursor"]
+            if cursor is None:
+                return pages
+            path = f"/api/v1/employees?per_page=10&sort_by=employee_id&cursor={quote(cursor)}"
+
+    pages = asyncio.run(scenario())
+    assert [len(page["employees"]) for page in pages] == [10, 10, 5]
+    assert [e["employee_id"] for page in pages for e in page["employees"]] == [f"P{i:03d}" for i in range(25)]
+    bad = asyncio.run(client.get("/api/v1/employees?cursor=garbage"))
+    assert bad.status == 400
@@ -0,0 +1,91 @@
+"""Tenant isolation through the app, and worker affinity in the middleware."""
+
+import asyncio
+
+from starlette.responses import JSONResponse
+
+from app.services.tenants import WORKER_HEADER, TenantMiddleware, TenantRegistry, TenantRouter, current_tenant
+from benchmarks.asgi import request
+from tests.helpers import TenantClient, body, payroll_csv
+
+
+def _ids(response):
+    return [employee["employee_id"] for employee in body(response)["employees"]]
+
+
+def test_tenants_never_see_each_others_data(client, tenant):
+    other = TenantClient(f"{tenant}-other")
+
+    async def scenario():
+        uploaded = await client.upload(payroll_csv(
+            "A1,Ana,Cruz,Ops,40000,2020-01-01",
+            "A2,Ben,Diaz,Ops,30000,2020-01-01"
+        ))
+        assert uploaded.status == 200
+        withdrawn = await client.post("/api/v1/ewa/withdrawals", {"employee_id": "A1", "amount": 100})
+        assert withdrawn.status == 201
+        return (
+            await client.get("/api/v1/employees?per_page=100"),
+            await other.get("/api/v1/employees?per_page=100"),
+            await client.get("/api/v1/ewa/withdrawals"),
+            await other.get("/api/v1/ewa/withdrawals"),
+            await other.get("/api/v1/employees/A1")
+        )
+
+    mine, theirs, my_withdrawals, their_withdrawals, lookup = asyncio.run(scenario())
+    assert _ids(mine) == ["A1", "A2"]
+    assert not {"A1", "A2"} & set(_ids(theirs))
+    assert len(body(my_withdrawals)["withdrawals"]) == 1
+    assert body(their_withdrawals)["withdrawals"] == []
+    assert lookup.status == 404
+
+
+async def _echo_tenant(scope, receive, send):
+    await JSONResponse({"tenant": current_tenant()})(scope, receive, send)
+
+
+def _middleware(router):
+    return TenantMiddleware(_echo_tenant, router=router, registry=TenantRegistry(max_tenants=0))
+
+
+def _tenant_owned_by(router, worker):
+    return next(t for t in (f"employer-{i}" for i in range(1000)) if router.owner(t) == worker)
+
+
+def test_misdirected_tenant_gets_421_with_its_owner():
+    router = TenantRouter(["w1", "w2"], "w1")
+    app = _middleware(router)
+    local = _tenant_owned_by(router, "w1")
+    remote = _tenant_owned_by(router, "w2")
+
+    async def scenario():
+        return (
+            await request(app, "GET", "/api/v1/employees", headers={"X-Employer-ID": local}),
+            await request(app, "GET", "/api/v1/employees", headers={"X-Employer-ID": remote}),
+            await request(app, "GET", "/metrics", headers={"X-Employer-ID": remote})
+        )
+
+    served, refused, exempt = asyncio.run(scenario())
+    assert served.status == 200
+    assert body(served)["tenant"] == local
+    assert refused.status == 421
+    assert refused.headers[WORKER_HEADER.lower()] == "w2"
+    assert exempt.status == 200
+
+
+def test_pinned_tenant_is_served_only_by_its_worker():
+    router = TenantRouter(["w1", "w2"], "w1", pins={"hot": "w2"})
+    app = _middleware(router)
+
+    async def scenario():
+        return (
+            await request(app, "GET", "/api/v1/employees", headers={"X-Employer-ID": "hot"}),
+            await request(app, "GET", "/api/v1/employees", headers={"X-Employer-ID": "cold"})
+        )
+
+    hot, cold = asyncio.run(scenario())
+    assert hot.status == 421
+    assert hot.headers[WORKER_HEADER.lower()] == "w2"
+    # Unpinned tenants go to the workers without pins
+    assert router.owner("cold") == "w1"
+    assert cold.status == 200
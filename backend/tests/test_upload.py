@@ -0,0 +1,74 @@
+"""Payroll uploads: invalid files are refused and never replace live data."""
+
+import asyncio
+
+import pandas as pd
+
+from app.services.employees import EmployeeStore, payroll_to_employees
+from app.services.snapshot import get_snapshot_store
+from tests.helpers import body, payroll_csv
+
+GOOD = payroll_csv(
+    "X1,Ana,Cruz,Ops,40000,2020-01-01",
+    "X2,Ben,Diaz,Ops,30000,2020-01-01"
+)
+BAD = payroll_csv(
+    "X1,Ana,Cruz,Ops,40000,2020-01-01",
+    "X1,Ana,Cruz,Ops,41000,2020-01-01",
+    ",No,Id,Ops,30000,2020-01-01",
+    "X3,Cy,Eng,Ops,abc,2020-01-01"
+)
+
+
+def test_invalid_upload_is_refused_and_current_data_kept(client, tenant):
+    async def scenario():
+        good = await client.upload(GOOD)
+        bad = await client.upload(BAD)
+        return good, bad, await client.get("/api/v1/employees?per_page=100"), await client.get("/api/v1/payroll/diff")
+
+    good, bad, roster, latest = asyncio.run(scenario())
+    assert good.status == 200
+    assert body(good)["validation"]["is_valid"]
+
+    assert bad.status == 422
+    report = body(bad)["detail"]["validation"]
+    assert not report["is_valid"]
+    assert report["counts"]["duplicate_employee_id"] >= 1
+    assert report["counts"]["missing_employee_id"] == 1
+    assert report["counts"]["invalid_salary"] == 1
+
+    assert [e["employee_id"] for e in body(roster)["employees"]] == ["X1", "X2"]
+    # Neither the diff baseline nor the saved snapshot moved to the refused file
+    assert body(latest)["counts"] == {"added": 2, "removed": 0, "changed": 0, "unchanged": 0}
+    saved = get_snapshot_store(tenant).open()
+    assert list(saved.frame["employee_id"]) == ["X1", "X2"]
+
+
+def test_refused_upload_does_not_block_the_next_one(client):
+    fixed = payroll_csv(
+        "X1,Ana,Cruz,Ops,41000,2020-01-01",
+        "X3,Cy,Eng,Ops,35000,2020-01-01"
+    )
+
+    async def scenario():
+        await client.upload(GOOD)
+        await client.upload(BAD)
+        return await client.upload(fixed), await client.get("/api/v1/employees?per_page=100")
+
+    accepted, roster = asyncio.run(scenario())
+    assert accepted.status == 200
+    assert body(accepted)["changes"] == {
+        "incremental": True, "added": 1, "removed": 1, "changed": 1, "unchanged": 0
+    }
+    assert [e["employee_id"] for e in body(roster)["employees"]] == ["X1", "X3"]
+
+
+def test_store_drops_blank_ids_and_keeps_the_last_duplicate():
+    frame = payroll_to_employees(pd.DataFrame({
+        "employee_id": ["A", None, " ", "B", "A"],
+        "name": ["first", "blank", "space", "b", "second"],
+        "salary": [10000, 10000, 10000, 10000, 20000]
+    }))
+    snapshot = EmployeeStore(frame).snapshot
+    assert list(snapshot.frame["employee_id"]) == ["B", "A"]
+    assert snapshot.frame.set_index("employee_id").loc["A", "name"] == "second"